@@ -0,0 +1,54 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.core.config import get_settings
+from app.database import Base
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def get_url() -> str:
+    # An explicit -x url=... or sqlalchemy.url wins over the app settings
+    return context.get_x_argument(as_dictionary=True).get("url") or config.get_main_option(
+        "sqlalchemy.url"
+    ) or get_settings().DATABASE_URL
+
+def include_name(name, type_, parent_names):
+    # The search indexes and FTS tables are raw DDL (app/crud/search.py), not model metadata
+    if type_ == "table":
+        return name is None or "_fts" not in name
+    if type_ == "index":
+        return not name.endswith(("_search_trgm", "_search_tsv"))
+    return True
+
+def configure(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        include_name=include_name,
+        compare_type=True,
+        **kwargs
+    )
+
+def run_migrations_offline():
+    configure(url=get_url(), literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    engine = create_engine(get_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        # SQLite cannot ALTER most things in place; batch mode recreates the table
+        configure(connection=connection, render_as_batch=connection.dialect.name == "sqlite")
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,121 @@
+"""Initial schema
+
+The tables as Base.metadata.create_all built them before migrations were introduced.
+Databases created that way are stamped at this revision by `python -m app.commands
+migrate`, so it must not create anything they lack: the device status counters and
+the search indexes come in later revisions.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def timestamps():
+    return [
+        sa.Column("created_date", sa.DateTime(), nullable=False),
+        sa.Column("last_modified_date", sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "device_types",
+        sa.Column("device_type_id", sa.Integer(), primary_key=True),
+        sa.Column("type_name", sa.String(length=50), nullable=False),
+        sa.Column("description", sa.String(length=255), nullable=True),
+        sa.Column("refresh_cycle_months", sa.Integer(), nullable=True),
+        *timestamps(),
+    )
+    op.create_index("ix_device_types_device_type_id", "device_types", ["device_type_id"])
+    op.create_index("ix_device_types_type_name", "device_types", ["type_name"], unique=True)
+
+    op.create_table(
+        "purchases",
+        sa.Column("purchase_id", sa.Integer(), primary_key=True),
+        sa.Column("purchase_order", sa.String(length=50), nullable=True),
+        sa.Column("purchase_date", sa.Date(), nullable=True),
+        sa.Column("vendor", sa.String(length=100), nullable=True),
+        sa.Column("total_amount", sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        *timestamps(),
+    )
+    op.create_index("ix_purchases_purchase_id", "purchases", ["purchase_id"])
+    op.create_index("ix_purchases_purchase_order", "purchases", ["purchase_order"], unique=True)
+
+    op.create_table(
+        "users",
+        sa.Column("user_id", sa.Integer(), primary_key=True),
+        sa.Column("last_name", sa.String(length=100), nullable=False),
+        sa.Column("first_name", sa.String(length=100), nullable=False),
+        sa.Column("username", sa.String(length=50), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=False),
+        sa.Column("password_hash", sa.String(length=255), nullable=True),
+        sa.Column("start_date", sa.Date(), nullable=True),
+        sa.Column("end_date", sa.Date(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("is_admin", sa.Boolean(), nullable=False),
+        *timestamps(),
+        sa.UniqueConstraint("email"),
+    )
+    op.create_index("ix_users_user_id", "users", ["user_id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "devices",
+        sa.Column("device_id", sa.Integer(), primary_key=True),
+        sa.Column("device_type_id", sa.Integer(), sa.ForeignKey("device_types.device_type_id"), nullable=False),
+        sa.Column("serial_number", sa.String(length=50), nullable=False),
+        sa.Column("device_name", sa.String(length=100), nullable=True),
+        sa.Column("atera_link", sa.String(length=255), nullable=True),
+        sa.Column("is_checked_out", sa.Boolean(), nullable=False),
+        sa.Column("purchase_id", sa.Integer(), sa.ForeignKey("purchases.purchase_id"), nullable=True),
+        sa.Column("purchase_date", sa.Date(), nullable=True),
+        sa.Column("refresh_cycle", sa.String(length=50), nullable=True),
+        sa.Column("headset_type", sa.String(length=20), nullable=True),
+        sa.Column("is_retired", sa.Boolean(), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=True),
+        sa.Column("warranty_expiration", sa.Date(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        *timestamps(),
+    )
+    op.create_index("ix_devices_device_id", "devices", ["device_id"])
+    op.create_index("ix_devices_serial_number", "devices", ["serial_number"], unique=True)
+
+    op.create_table(
+        "device_assignments",
+        sa.Column("assignment_id", sa.Integer(), primary_key=True),
+        sa.Column("device_id", sa.Integer(), sa.ForeignKey("devices.device_id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=False),
+        sa.Column("checkout_date", sa.Date(), nullable=False),
+        sa.Column("expected_return_date", sa.Date(), nullable=True),
+        sa.Column("actual_return_date", sa.Date(), nullable=True),
+        sa.Column("checkout_condition", sa.String(length=255), nullable=True),
+        sa.Column("return_condition", sa.String(length=255), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("created_by", sa.Integer(), sa.ForeignKey("users.user_id"), nullable=True),
+        *timestamps(),
+    )
+    op.create_index("ix_device_assignments_assignment_id", "device_assignments", ["assignment_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("device_assignments")
+    op.drop_table("devices")
+    op.drop_table("users")
+    op.drop_table("purchases")
+    op.drop_table("device_types")
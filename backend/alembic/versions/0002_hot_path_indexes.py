@@ -0,0 +1,73 @@
+"""Composite and partial indexes for the hot query shapes
+
+Matches the filters and sort keys in app/crud: open assignments per device and user,
+the assignment, user and purchase listing orders, the device status filters and the
+expiring warranties report. On PostgreSQL the indexes are built CONCURRENTLY so a
+live database keeps taking writes while they build.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPEN_ASSIGNMENT = sa.text("actual_return_date IS NULL")
+NOT_RETIRED = sa.text("is_retired = false")
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ("ix_device_assignments_device_open", "device_assignments", ["device_id"], OPEN_ASSIGNMENT),
+    ("ix_device_assignments_user_open", "device_assignments", ["user_id"], OPEN_ASSIGNMENT),
+    ("ix_device_assignments_checkout", "device_assignments", ["checkout_date", "assignment_id"], None),
+    (
+        "ix_device_assignments_device_checkout",
+        "device_assignments",
+        ["device_id", "checkout_date", "assignment_id"],
+        None,
+    ),
+    (
+        "ix_device_assignments_user_checkout",
+        "device_assignments",
+        ["user_id", "checkout_date", "assignment_id"],
+        None,
+    ),
+    ("ix_devices_status", "devices", ["is_retired", "is_checked_out", "device_type_id"], None),
+    ("ix_devices_warranty_expiration", "devices", ["warranty_expiration"], NOT_RETIRED),
+    ("ix_devices_purchase_id", "devices", ["purchase_id"], None),
+    ("ix_purchases_purchase_date", "purchases", ["purchase_date", "purchase_id"], None),
+    ("ix_users_name", "users", ["last_name", "first_name", "user_id"], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table_name, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table_name,
+                columns,
+                postgresql_where=where,
+                sqlite_where=where,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table_name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
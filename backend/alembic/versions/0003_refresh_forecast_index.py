@@ -0,0 +1,49 @@
+"""Index for the refresh-cycle forecast report
+
+The forecast turns each type's due date test into a purchase date bound, so it reads
+the in-service devices of a type in purchase date order. An expression index on the
+due date itself is not possible: it adds device_types.refresh_cycle_months to
+devices.purchase_date, and an index covers a single table. Built CONCURRENTLY on
+PostgreSQL, like the indexes of 0002.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOT_RETIRED = sa.text("is_retired = false")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_devices_refresh_due",
+            "devices",
+            ["device_type_id", "purchase_date"],
+            postgresql_where=NOT_RETIRED,
+            sqlite_where=NOT_RETIRED,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_devices_refresh_due", table_name="devices", postgresql_concurrently=True, if_exists=True
+        )
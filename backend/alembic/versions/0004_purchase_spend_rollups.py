@@ -0,0 +1,42 @@
+"""Purchase spend rollups
+
+One row per vendor and purchase month with the purchase count, total amount and
+devices bought, kept in step by the purchase and device CRUD writes. The table starts
+empty; `python -m app.commands migrate` fills it from the existing purchases afterwards,
+as it does the device status counters.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "purchase_spend_rollups",
+        sa.Column("vendor", sa.String(length=100), primary_key=True),
+        sa.Column("month", sa.Date(), primary_key=True),
+        sa.Column("purchase_count", sa.Integer(), nullable=False),
+        sa.Column("total_amount", sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column("device_count", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_purchase_spend_rollups_month", "purchase_spend_rollups", ["month"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_purchase_spend_rollups_month", table_name="purchase_spend_rollups")
+    op.drop_table("purchase_spend_rollups")
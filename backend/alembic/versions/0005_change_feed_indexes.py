@@ -0,0 +1,45 @@
+"""Indexes for the change feed
+
+One (last_modified_date, primary key) index per table, matching the order and the
+resume predicate of the change feed (app/crud/changes.py). On PostgreSQL the indexes
+are built CONCURRENTLY so a live database keeps taking writes while they build.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns)
+INDEXES = [
+    ("ix_device_types_last_modified", "device_types", ["last_modified_date", "device_type_id"]),
+    ("ix_purchases_last_modified", "purchases", ["last_modified_date", "purchase_id"]),
+    ("ix_users_last_modified", "users", ["last_modified_date", "user_id"]),
+    ("ix_devices_last_modified", "devices", ["last_modified_date", "device_id"]),
+    ("ix_device_assignments_last_modified", "device_assignments", ["last_modified_date", "assignment_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table_name, columns in INDEXES:
+            op.create_index(name, table_name, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table_name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
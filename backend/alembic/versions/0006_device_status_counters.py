@@ -0,0 +1,43 @@
+"""Device status counters
+
+One row per device type and status with the number of devices, kept in step by the
+device and assignment CRUD writes. Databases built by create_all after the counters
+were introduced already have the table, so it is only created when missing. The
+table starts empty; `python -m app.commands migrate` fills it from the devices
+afterwards.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "device_status_counters",
+        sa.Column(
+            "device_type_id", sa.Integer(), sa.ForeignKey("device_types.device_type_id"), primary_key=True
+        ),
+        sa.Column("is_checked_out", sa.Boolean(), primary_key=True),
+        sa.Column("is_retired", sa.Boolean(), primary_key=True),
+        sa.Column("device_count", sa.Integer(), nullable=False),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("device_status_counters")
@@ -0,0 +1,53 @@
+"""Search indexes
+
+The dialect-specific indexes behind the `search` parameter of the device and user
+listings (app/crud/search.py): trigram and tsvector GIN indexes on PostgreSQL, FTS5
+trigram tables kept in sync by triggers on SQLite. The DDL is idempotent, as
+databases built by create_all after search was introduced already have it, and the
+FTS tables are filled from the existing rows when first created.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.crud.search import (
+    SEARCH_COLUMNS,
+    install_search_indexes,
+    postgresql_search_ddl,
+    postgresql_search_drop_ddl,
+    sqlite_search_drop_ddl,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name == "postgresql":
+        # Through op.execute so that offline (--sql) runs emit the DDL too
+        for table_name in SEARCH_COLUMNS:
+            for statement in postgresql_search_ddl(table_name):
+                op.execute(statement)
+    else:
+        install_search_indexes(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == "postgresql":
+        drop_ddl = postgresql_search_drop_ddl
+    else:
+        drop_ddl = sqlite_search_drop_ddl
+    for table_name in SEARCH_COLUMNS:
+        for statement in drop_ddl(table_name):
+            op.execute(statement)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from .endpoints import device, user, device_type, purchase, assignment, reports
+from .endpoints import device, user, device_type, purchase, assignment, reports, changes, events, diagnostics
 
 api_router = APIRouter()
 
@@ -9,4 +9,7 @@ api_router.include_router(user.router, prefix="/users", tags=["users"])
 api_router.include_router(device.router, prefix="/devices", tags=["devices"])
 api_router.include_router(purchase.router, prefix="/purchases", tags=["purchases"])
 api_router.include_router(assignment.router, prefix="/assignments", tags=["assignments"])
-api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
\ No newline at end of file
+api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(changes.router, prefix="/changes", tags=["changes"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
+api_router.include_router(diagnostics.router, prefix="/diagnostics", tags=["diagnostics"])
\ No newline at end of file
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from app import crud
 from app import schemas
-from app.database import get_db
+from app.database import get_db, get_async_db
+from app.utils.conditional import conditional_get, is_revalidation, page_version, set_validators
+from app.utils.fieldsets import fieldset_model, parse_fields, with_fields
+from app.utils.responses import model_response, rows_response
+from app.utils.export import EXPORT_FORMATS, export_response
 
 router = APIRouter()
 
+# Listings select these columns, or only the requested fields, as plain rows and serialize
+# them without validation
+ASSIGNMENT_FIELDS = list(schemas.DeviceAssignment.model_fields)
+
 @router.post("/", response_model=schemas.DeviceAssignment)
 def create_assignment(assignment: schemas.DeviceAssignmentCreate, db: Session = Depends(get_db)):
     # Check if device exists
@@ -32,32 +42,126 @@ def create_assignment(assignment: schemas.DeviceAssignmentCreate, db: Session =
         raise HTTPException(status_code=400, detail="Cannot assign to inactive user")
     
     # Create assignment and update device status
-    return crud.create_assignment(db=db, assignment=assignment)
+    try:
+        return crud.create_assignment(db=db, assignment=assignment)
+    except crud.AssignmentConflictError as exc:
+        # Another request checked the device out, retired or deleted it since the checks above
+        raise HTTPException(status_code=409, detail=exc.errors[0]["error"])
+
+@router.post("/batch", response_model=List[schemas.DeviceAssignment])
+def create_assignments(checkout: schemas.DeviceBatchCheckout, db: Session = Depends(get_db)):
+    # Check if user exists
+    db_user = crud.get_user(db, user_id=checkout.user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+        
+    # Check if user is active
+    if not db_user.is_active:
+        raise HTTPException(status_code=400, detail="Cannot assign to inactive user")
+    
+    # All devices are checked out together, or none are
+    try:
+        return crud.create_assignments(db=db, checkout=checkout)
+    except crud.AssignmentConflictError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
+
+@router.put("/batch/return", response_model=List[schemas.DeviceAssignment])
+def return_devices(batch: schemas.DeviceBatchReturn, db: Session = Depends(get_db)):
+    # All assignments are closed together, or none are
+    try:
+        return crud.return_devices(db=db, batch=batch)
+    except crud.AssignmentConflictError as exc:
+        raise HTTPException(status_code=400, detail=exc.errors)
 
 @router.get("/", response_model=List[schemas.DeviceAssignment])
-def read_assignments(
+async def read_assignments(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     device_id: Optional[int] = None,
     user_id: Optional[int] = None,
     active_only: bool = False,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    assignments = crud.get_assignments(
-        db, 
-        skip=skip, 
-        limit=limit, 
+    field_names = parse_fields(fields, schemas.DeviceAssignment)
+    page = partial(
+        crud.aio.get_assignments,
+        db,
+        skip=skip,
+        limit=limit,
         device_id=device_id,
         user_id=user_id,
-        active_only=active_only
+        active_only=active_only,
+        cursor=cursor
+    )
+    
+    try:
+        # Revalidations are answered from the keys and timestamps of the page's rows
+        if is_revalidation(request):
+            version = page_version(await page(fields=crud.ASSIGNMENT_VERSION_FIELDS), "assignment_id")
+            not_modified = conditional_get(request, response, "assignments", *version)
+            if not_modified is not None:
+                return not_modified
+        assignments = await page(fields=with_fields(
+            field_names or ASSIGNMENT_FIELDS, crud.ASSIGNMENT_CURSOR_FIELDS + crud.ASSIGNMENT_VERSION_FIELDS
+        ))
+    except crud.InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_validators(request, response, "assignments", *page_version(assignments, "assignment_id"))
+    
+    # A full page may have more rows after it; hand out a cursor for the next one
+    if assignments and len(assignments) == limit:
+        response.headers["X-Next-Cursor"] = crud.get_assignment_cursor(assignments[-1])
+    return rows_response(assignments, response, fields=field_names)
+
+@router.get("/export")
+def export_assignments(
+    format: str = "ndjson",
+    device_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    active_only: bool = False
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Export format must be ndjson or csv")
+    
+    return export_response(
+        lambda db: crud.iter_assignments(
+            db,
+            device_id=device_id,
+            user_id=user_id,
+            active_only=active_only
+        ),
+        format=format,
+        filename="assignments"
     )
-    return assignments
 
 @router.get("/{assignment_id}", response_model=schemas.DeviceAssignmentDetail)
-def read_assignment(assignment_id: int, db: Session = Depends(get_db)):
-    db_assignment = crud.get_assignment(db, assignment_id=assignment_id)
+async def read_assignment(
+    assignment_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    field_names = parse_fields(fields, schemas.DeviceAssignmentDetail)
+    version = await crud.aio.get_assignment_detail_version(db, assignment_id=assignment_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    not_modified = conditional_get(request, response, "assignment", assignment_id, *version)
+    if not_modified is not None:
+        return not_modified
+    
+    db_assignment = await crud.aio.get_assignment_detail(db, assignment_id=assignment_id, fields=field_names)
     if db_assignment is None:
         raise HTTPException(status_code=404, detail="Assignment not found")
+    if field_names:
+        return model_response(
+            fieldset_model(schemas.DeviceAssignmentDetail, tuple(field_names)).model_validate(db_assignment),
+            response
+        )
     return db_assignment
 
 @router.put("/{assignment_id}/return", response_model=schemas.DeviceAssignment)
@@ -72,5 +176,9 @@ def return_device(
         
     if db_assignment.actual_return_date is not None:
         raise HTTPException(status_code=400, detail="Device has already been returned")
-        
-    return crud.return_device(db=db, assignment_id=assignment_id, return_info=return_info)
\ No newline at end of file
+    
+    try:
+        return crud.return_device(db=db, assignment_id=assignment_id, return_info=return_info)
+    except crud.AssignmentConflictError:
+        # Another request returned the device since the check above
+        raise HTTPException(status_code=400, detail="Device has already been returned")
\ No newline at end of file
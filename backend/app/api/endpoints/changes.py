@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app import crud
+from app.database import get_async_db
+from app.utils.responses import content_response
+
+router = APIRouter()
+
+@router.get("/")
+async def read_changes(
+    since: Optional[str] = None,
+    entities: Optional[str] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Rows changed after the since token, per entity; pass back the returned next token to
+    # resume, and call again straight away while has_more is true
+    names = [name.strip() for name in entities.split(",") if name.strip()] if entities else None
+    unknown = [name for name in names or () if name not in crud.CHANGE_FEED_ENTITIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown entities: {', '.join(unknown)}")
+    if not 1 <= limit <= crud.MAX_CHANGES_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {crud.MAX_CHANGES_LIMIT}")
+    
+    try:
+        changes = await crud.aio.get_changes(db, since=since, entities=names, limit=limit)
+    except crud.InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid since token")
+    # Purchase amounts stay exact strings, as in the purchase endpoints
+    return content_response(changes)
@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from functools import partial
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from app import crud
 from app import schemas
-from app.database import get_db
+from app.database import get_db, get_async_db
+from app.utils.bulk_import import SUPPORTED_FORMATS, detect_format, iter_rows
+from app.utils.conditional import conditional_get, is_revalidation, page_version, set_validators
+from app.utils.fieldsets import fieldset_model, parse_fields, with_fields
+from app.utils.responses import content_response, model_response, rows_response
+from app.utils.export import EXPORT_FORMATS, export_response
 
 router = APIRouter()
 
+# Listings select these columns, or only the requested fields, as plain rows and serialize
+# them without validation
+DEVICE_FIELDS = list(schemas.Device.model_fields)
+ASSIGNMENT_FIELDS = list(schemas.DeviceAssignment.model_fields)
+
 @router.post("/", response_model=schemas.Device)
 def create_device(device: schemas.DeviceCreate, db: Session = Depends(get_db)):
     # Check if serial number exists
@@ -24,34 +36,153 @@ def create_device(device: schemas.DeviceCreate, db: Session = Depends(get_db)):
         
     return crud.create_device(db=db, device=device)
 
+@router.post("/bulk", response_model=schemas.BulkImportResult)
+def bulk_create_devices(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    # Use the explicit format if given, otherwise infer it from the upload
+    upload_format = format or detect_format(file.filename, file.content_type)
+    if upload_format not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail="Upload must be CSV or JSONL")
+    
+    return crud.bulk_create_devices(db=db, rows=iter_rows(file.file, upload_format))
+
 @router.get("/", response_model=List[schemas.Device])
-def read_devices(
+async def read_devices(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     device_type_id: Optional[int] = None,
     is_checked_out: Optional[bool] = None,
     is_retired: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    devices = crud.get_devices(
-        db, 
-        skip=skip, 
-        limit=limit, 
+    field_names = parse_fields(fields, schemas.Device)
+    page = partial(
+        crud.aio.get_devices,
+        db,
+        skip=skip,
+        limit=limit,
         device_type_id=device_type_id,
         is_checked_out=is_checked_out,
         is_retired=is_retired,
-        search=search
+        search=search,
+        cursor=cursor
+    )
+    
+    try:
+        # Revalidations are answered from the keys and timestamps of the page's rows
+        if is_revalidation(request):
+            version = page_version(await page(fields=crud.DEVICE_VERSION_FIELDS), "device_id")
+            not_modified = conditional_get(request, response, "devices", *version)
+            if not_modified is not None:
+                return not_modified
+        devices = await page(fields=with_fields(
+            field_names or DEVICE_FIELDS, crud.DEVICE_CURSOR_FIELDS + crud.DEVICE_VERSION_FIELDS
+        ))
+    except crud.InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_validators(request, response, "devices", *page_version(devices, "device_id"))
+    
+    # A full page may have more rows after it; hand out a cursor for the next one.
+    # Relevance-ranked search pages are not in key order, so they get none.
+    if devices and len(devices) == limit and (cursor or not search):
+        response.headers["X-Next-Cursor"] = crud.get_device_cursor(devices[-1])
+    return rows_response(devices, response, fields=field_names)
+
+@router.get("/export")
+def export_devices(
+    format: str = "ndjson",
+    device_type_id: Optional[int] = None,
+    is_checked_out: Optional[bool] = None,
+    is_retired: Optional[bool] = None,
+    search: Optional[str] = None
+):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Export format must be ndjson or csv")
+    
+    return export_response(
+        lambda db: crud.iter_devices(
+            db,
+            device_type_id=device_type_id,
+            is_checked_out=is_checked_out,
+            is_retired=is_retired,
+            search=search
+        ),
+        format=format,
+        filename="devices"
     )
-    return devices
+
+@router.get("/history", response_model=List[schemas.DeviceUsageStats])
+async def read_devices_history(
+    device_type_id: Optional[int] = None,
+    is_retired: Optional[bool] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Usage stats of every matching device from one query, least used first
+    stats = await crud.aio.get_devices_usage_stats(
+        db, device_type_id=device_type_id, is_retired=is_retired, skip=skip, limit=limit
+    )
+    return content_response(stats)
 
 @router.get("/{device_id}", response_model=schemas.DeviceDetail)
-def read_device(device_id: int, db: Session = Depends(get_db)):
-    db_device = crud.get_device(db, device_id=device_id)
+async def read_device(
+    device_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    field_names = parse_fields(fields, schemas.DeviceDetail)
+    version = await crud.aio.get_device_detail_version(db, device_id=device_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Device not found")
+    not_modified = conditional_get(request, response, "device", device_id, *version)
+    if not_modified is not None:
+        return not_modified
+    
+    db_device = await crud.aio.get_device_detail(db, device_id=device_id, fields=field_names)
     if db_device is None:
         raise HTTPException(status_code=404, detail="Device not found")
+    if field_names:
+        return model_response(
+            fieldset_model(schemas.DeviceDetail, tuple(field_names)).model_validate(db_device), response
+        )
     return db_device
 
+@router.get("/{device_id}/history", response_model=schemas.DeviceHistory)
+async def read_device_history(
+    device_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    stats = await crud.aio.get_device_usage_stats(db, device_id=device_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Device not found")
+    
+    # The device's assignments, newest first, paged like GET /assignments/?device_id=
+    try:
+        assignments = await crud.aio.get_assignments(
+            db, skip=skip, limit=limit, device_id=device_id, cursor=cursor, fields=ASSIGNMENT_FIELDS
+        )
+    except crud.InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if assignments and len(assignments) == limit:
+        response.headers["X-Next-Cursor"] = crud.get_assignment_cursor(assignments[-1])
+    return content_response({"stats": stats, "assignments": [row._asdict() for row in assignments]}, response)
+
 @router.put("/{device_id}", response_model=schemas.Device)
 def update_device(device_id: int, device: schemas.DeviceUpdate, db: Session = Depends(get_db)):
     db_device = crud.get_device(db, device_id=device_id)
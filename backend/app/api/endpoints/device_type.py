@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app import crud
 from app import schemas
-from app.database import get_db
+from app.database import get_db, get_async_db
+from app.utils.conditional import conditional_get, is_revalidation, page_version, set_validators
+from app.utils.fieldsets import fieldset_model, parse_fields, with_fields
+from app.utils.responses import model_response, rows_response
 
 router = APIRouter()
 
+# Listings select these columns, or only the requested fields, as plain rows and serialize
+# them without validation
+DEVICE_TYPE_FIELDS = list(schemas.DeviceType.model_fields)
+
 @router.post("/", response_model=schemas.DeviceType)
 def create_device_type(device_type: schemas.DeviceTypeCreate, db: Session = Depends(get_db)):
     db_device_type = crud.get_device_type_by_name(db, name=device_type.type_name)
@@ -15,15 +24,52 @@ def create_device_type(device_type: schemas.DeviceTypeCreate, db: Session = Depe
     return crud.create_device_type(db=db, device_type=device_type)
 
 @router.get("/", response_model=List[schemas.DeviceType])
-def read_device_types(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    device_types = crud.get_device_types(db, skip=skip, limit=limit)
-    return device_types
+async def read_device_types(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    field_names = parse_fields(fields, schemas.DeviceType)
+    page = partial(crud.aio.get_device_types, db, skip=skip, limit=limit)
+    
+    # Revalidations are answered from the keys and timestamps of the page's rows
+    if is_revalidation(request):
+        version = page_version(await page(fields=crud.DEVICE_TYPE_VERSION_FIELDS), "device_type_id")
+        not_modified = conditional_get(request, response, "device-types", *version)
+        if not_modified is not None:
+            return not_modified
+    device_types = await page(fields=with_fields(
+        field_names or DEVICE_TYPE_FIELDS, crud.DEVICE_TYPE_VERSION_FIELDS
+    ))
+    set_validators(request, response, "device-types", *page_version(device_types, "device_type_id"))
+    return rows_response(device_types, response, fields=field_names)
 
 @router.get("/{device_type_id}", response_model=schemas.DeviceType)
-def read_device_type(device_type_id: int, db: Session = Depends(get_db)):
-    db_device_type = crud.get_device_type(db, device_type_id=device_type_id)
+async def read_device_type(
+    device_type_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    field_names = parse_fields(fields, schemas.DeviceType)
+    version = await crud.aio.get_device_type_version(db, device_type_id=device_type_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Device type not found")
+    not_modified = conditional_get(request, response, "device-type", device_type_id, *version)
+    if not_modified is not None:
+        return not_modified
+    
+    db_device_type = await crud.aio.get_device_type(db, device_type_id=device_type_id, fields=field_names)
     if db_device_type is None:
         raise HTTPException(status_code=404, detail="Device type not found")
+    if field_names:
+        return model_response(
+            fieldset_model(schemas.DeviceType, tuple(field_names)).model_validate(db_device_type), response
+        )
     return db_device_type
 
 @router.put("/{device_type_id}", response_model=schemas.DeviceType)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from app import crud
+from app.core.events import get_event_bus
+from app.core.pool import get_pool_stats
+
+router = APIRouter()
+
+@router.get("/db-pool")
+def db_pool_stats():
+    return get_pool_stats()
+
+@router.get("/principal-cache")
+def principal_cache_stats():
+    return crud.get_principal_cache_stats()
+
+@router.get("/report-cache")
+def report_cache_stats():
+    return crud.get_report_cache_stats()
+
+@router.get("/events")
+def event_bus_stats():
+    return get_event_bus().stats()
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.core.config import get_settings
+from app.core.events import EVENT_TYPES, get_event_bus
+from app.utils.responses import dumps
+
+router = APIRouter()
+
+def _sse(event: str, data, event_id: Optional[str] = None) -> bytes:
+    lines = f"id: {event_id}\n" if event_id else ""
+    return f"{lines}event: {event}\n".encode() + b"data: " + dumps(data) + b"\n\n"
+
+def _resume_position(last_event_id: Optional[str], epoch: str) -> Optional[int]:
+    # Event IDs are "<epoch>:<n>"; those of another worker or an earlier process do not resume
+    if not last_event_id:
+        return None
+    event_epoch, _, number = last_event_id.partition(":")
+    if event_epoch != epoch or not number.isdigit():
+        return None
+    return int(number)
+
+@router.get("/")
+async def stream_events(
+    types: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    # Server-sent events of device writes, for dashboards to refresh on instead of polling.
+    # A reset event means events were missed: refetch, or catch up with /changes.
+    wanted = {name.strip() for name in types.split(",") if name.strip()} if types else None
+    unknown = sorted(wanted - set(EVENT_TYPES)) if wanted else []
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown event types: {', '.join(unknown)}")
+    
+    bus = get_event_bus()
+    hub = bus.hub
+    keepalive = get_settings().EVENT_STREAM_KEEPALIVE_SECONDS
+    position = _resume_position(last_event_id, bus.epoch)
+    
+    async def stream():
+        nonlocal position
+        hub.subscribers += 1
+        try:
+            if position is None:
+                if last_event_id:
+                    yield _sse("reset", {"reason": "unknown last event ID"})
+                position = hub.last_id
+            yield b"retry: 5000\n\n"
+            while not hub.closed:
+                events = await hub.wait(position, keepalive)
+                if events is None:
+                    yield _sse("reset", {"reason": "events were missed"})
+                    position = hub.last_id
+                elif not events:
+                    yield b": keepalive\n\n"
+                for event_id, event in events or ():
+                    position = event_id
+                    if wanted is None or event["type"] in wanted:
+                        yield _sse(event["type"], event, f"{bus.epoch}:{event_id}")
+        finally:
+            hub.subscribers -= 1
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app import crud
 from app import schemas
-from app.database import get_db
+from app.database import get_db, get_async_db
+from app.utils.conditional import conditional_get, is_revalidation, page_version, set_validators
+from app.utils.fieldsets import fieldset_model, parse_fields, with_fields
+from app.utils.responses import model_response, rows_response
 
 router = APIRouter()
 
+# Listings select these columns, or only the requested fields, as plain rows and serialize
+# them without validation
+PURCHASE_FIELDS = list(schemas.Purchase.model_fields)
+
 @router.post("/", response_model=schemas.Purchase)
 def create_purchase(purchase: schemas.PurchaseCreate, db: Session = Depends(get_db)):
     if purchase.purchase_order:
@@ -16,15 +25,60 @@ def create_purchase(purchase: schemas.PurchaseCreate, db: Session = Depends(get_
     return crud.create_purchase(db=db, purchase=purchase)
 
 @router.get("/", response_model=List[schemas.Purchase])
-def read_purchases(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    purchases = crud.get_purchases(db, skip=skip, limit=limit)
-    return purchases
+async def read_purchases(
+    request: Request,
+    response: Response,
+    skip: int = 0, 
+    limit: int = 100, 
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    field_names = parse_fields(fields, schemas.Purchase)
+    page = partial(crud.aio.get_purchases, db, skip=skip, limit=limit, cursor=cursor)
+    
+    try:
+        # Revalidations are answered from the keys and timestamps of the page's rows
+        if is_revalidation(request):
+            version = page_version(await page(fields=crud.PURCHASE_VERSION_FIELDS), "purchase_id")
+            not_modified = conditional_get(request, response, "purchases", *version)
+            if not_modified is not None:
+                return not_modified
+        purchases = await page(fields=with_fields(
+            field_names or PURCHASE_FIELDS, crud.PURCHASE_CURSOR_FIELDS + crud.PURCHASE_VERSION_FIELDS
+        ))
+    except crud.InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_validators(request, response, "purchases", *page_version(purchases, "purchase_id"))
+    
+    # A full page may have more rows after it; hand out a cursor for the next one
+    if purchases and len(purchases) == limit:
+        response.headers["X-Next-Cursor"] = crud.get_purchase_cursor(purchases[-1])
+    return rows_response(purchases, response, fields=field_names)
 
 @router.get("/{purchase_id}", response_model=schemas.PurchaseDetail)
-def read_purchase(purchase_id: int, db: Session = Depends(get_db)):
-    db_purchase = crud.get_purchase(db, purchase_id=purchase_id)
+async def read_purchase(
+    purchase_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    field_names = parse_fields(fields, schemas.PurchaseDetail)
+    version = await crud.aio.get_purchase_detail_version(db, purchase_id=purchase_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Purchase not found")
+    not_modified = conditional_get(request, response, "purchase", purchase_id, *version)
+    if not_modified is not None:
+        return not_modified
+    
+    db_purchase = await crud.aio.get_purchase_detail(db, purchase_id=purchase_id, fields=field_names)
     if db_purchase is None:
         raise HTTPException(status_code=404, detail="Purchase not found")
+    if field_names:
+        return model_response(
+            fieldset_model(schemas.PurchaseDetail, tuple(field_names)).model_validate(db_purchase), response
+        )
     return db_purchase
 
 @router.put("/{purchase_id}", response_model=schemas.Purchase)
@@ -1,22 +1,83 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, timedelta
+from typing import Optional
 from app import crud
-from app.database import get_db
+from app.database import get_async_db
+from app.utils.responses import content_response
 
 router = APIRouter()
 
 @router.get("/devices-by-type")
-def devices_by_type_report(db: Session = Depends(get_db)):
-    return crud.get_devices_by_type_report(db)
+async def devices_by_type_report(db: AsyncSession = Depends(get_async_db)):
+    return await crud.aio.get_devices_by_type_report(db)
 
 @router.get("/device-status")
-def device_status_report(db: Session = Depends(get_db)):
-    return crud.get_device_status_report(db)
+async def device_status_report(db: AsyncSession = Depends(get_async_db)):
+    return await crud.aio.get_device_status_report(db)
 
 @router.get("/user-assignments")
-def user_assignments_report(limit: int = 10, db: Session = Depends(get_db)):
-    return crud.get_user_assignments_report(db, limit=limit)
+async def user_assignments_report(limit: int = 10, db: AsyncSession = Depends(get_async_db)):
+    return await crud.aio.get_user_assignments_report(db, limit=limit)
 
 @router.get("/expiring-warranties")
-def expiring_warranties_report(days: int = 90, db: Session = Depends(get_db)):
-    return crud.get_expiring_warranties_report(db, days=days)
\ No newline at end of file
+async def expiring_warranties_report(days: int = 90, db: AsyncSession = Depends(get_async_db)):
+    return await crud.aio.get_expiring_warranties_report(db, days=days)
+
+@router.get("/utilization")
+async def utilization_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    interval: str = "day",
+    device_type_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Devices of each type checked out per day or week; the last two years by default
+    end = end or date.today()
+    start = start or end - timedelta(days=730)
+    if interval not in crud.UTILIZATION_INTERVALS:
+        raise HTTPException(status_code=400, detail="Interval must be day or week")
+    if start > end:
+        raise HTTPException(status_code=400, detail="Start must not be after end")
+    if (end - start).days >= crud.MAX_UTILIZATION_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must be under {crud.MAX_UTILIZATION_DAYS} days")
+    
+    return await crud.aio.get_utilization_report(
+        db, start=start, end=end, interval=interval, device_type_id=device_type_id
+    )
+
+@router.get("/refresh-forecast")
+async def refresh_forecast_report(
+    start: Optional[date] = None,
+    months: int = 12,
+    device_type_id: Optional[int] = None,
+    include_overdue: bool = True,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # In-service devices due for replacement per month, from this month by default
+    if not 1 <= months <= crud.MAX_FORECAST_MONTHS:
+        raise HTTPException(status_code=400, detail=f"Months must be between 1 and {crud.MAX_FORECAST_MONTHS}")
+    start = (start or date.today()).replace(day=1)
+    
+    return await crud.aio.get_refresh_forecast_report(
+        db, start=start, months=months, device_type_id=device_type_id, include_overdue=include_overdue
+    )
+
+@router.get("/spend")
+async def spend_report(
+    by: str = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    vendor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Purchase spend by vendor, month or year, with per-device cost and a grand total
+    if by not in crud.SPEND_GROUPINGS:
+        raise HTTPException(status_code=400, detail="By must be vendor, month or year")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="Start must not be after end")
+    
+    # Money stays exact: the Decimal amounts serialize as strings, as elsewhere in the API
+    return content_response(
+        await crud.aio.get_purchase_spend_report(db, by=by, start=start, end=end, vendor=vendor)
+    )
@@ -1,58 +1,163 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from functools import partial
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from app import crud
 from app import schemas
-from app.database import get_db
+from app.core.security import PasswordHashingBusyError, get_password_hash_async
+from app.database import get_db, get_async_db
+from app.utils.bulk_import import SUPPORTED_FORMATS, detect_format, iter_rows
+from app.utils.conditional import conditional_get, is_revalidation, page_version, set_validators
+from app.utils.fieldsets import fieldset_model, parse_fields, with_fields
+from app.utils.responses import model_response, rows_response
+from app.utils.export import EXPORT_FORMATS, export_response
 
 router = APIRouter()
 
+# Listings select these columns, or only the requested fields, as plain rows and serialize
+# them without validation
+USER_FIELDS = list(schemas.User.model_fields)
+
+async def hash_password_or_503(password: Optional[str]) -> Optional[str]:
+    # Hashing runs in the worker pool; a full queue means back off and retry
+    if not password:
+        return None
+    try:
+        return await get_password_hash_async(password)
+    except PasswordHashingBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password hashing is busy, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
 @router.post("/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user_by_username = crud.get_user_by_username(db, username=user.username)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user_by_username = await crud.aio.get_user_by_username(db, username=user.username)
     if db_user_by_username:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    db_user_by_email = crud.get_user_by_email(db, email=user.email)
+    db_user_by_email = await crud.aio.get_user_by_email(db, email=user.email)
     if db_user_by_email:
         raise HTTPException(status_code=400, detail="Email already registered")
-        
-    return crud.create_user(db=db, user=user)
+    
+    # Release the connection while the password is hashed
+    await db.rollback()
+    password_hash = await hash_password_or_503(user.password)
+    return await crud.aio.create_user(db, user=user, password_hash=password_hash)
+
+@router.post("/bulk", response_model=schemas.UserBulkImportResult)
+def bulk_create_users(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    # Use the explicit format if given, otherwise infer it from the upload
+    upload_format = format or detect_format(file.filename, file.content_type)
+    if upload_format not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail="Upload must be CSV or JSONL")
+    
+    return crud.bulk_create_users(db=db, rows=iter_rows(file.file, upload_format))
 
 @router.get("/", response_model=List[schemas.User])
-def read_users(
+async def read_users(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     is_active: Optional[bool] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    field_names = parse_fields(fields, schemas.User)
+    page = partial(
+        crud.aio.get_users, db, skip=skip, limit=limit, is_active=is_active, search=search, cursor=cursor
+    )
+    
+    try:
+        # Revalidations are answered from the keys and timestamps of the page's rows
+        if is_revalidation(request):
+            version = page_version(await page(fields=crud.USER_VERSION_FIELDS), "user_id")
+            not_modified = conditional_get(request, response, "users", *version)
+            if not_modified is not None:
+                return not_modified
+        users = await page(fields=with_fields(
+            field_names or USER_FIELDS, crud.USER_CURSOR_FIELDS + crud.USER_VERSION_FIELDS
+        ))
+    except crud.InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_validators(request, response, "users", *page_version(users, "user_id"))
+    
+    # A full page may have more rows after it; hand out a cursor for the next one.
+    # Relevance-ranked search pages are not in key order, so they get none.
+    if users and len(users) == limit and (cursor or not search):
+        response.headers["X-Next-Cursor"] = crud.get_user_cursor(users[-1])
+    return rows_response(users, response, fields=field_names)
+
+@router.get("/export")
+def export_users(
+    format: str = "ndjson",
+    is_active: Optional[bool] = None,
+    search: Optional[str] = None
 ):
-    users = crud.get_users(db, skip=skip, limit=limit, is_active=is_active, search=search)
-    return users
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Export format must be ndjson or csv")
+    
+    return export_response(
+        lambda db: crud.iter_users(db, is_active=is_active, search=search),
+        format=format,
+        filename="users"
+    )
 
 @router.get("/{user_id}", response_model=schemas.UserDetail)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+async def read_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    field_names = parse_fields(fields, schemas.UserDetail)
+    version = await crud.aio.get_user_detail_version(db, user_id=user_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    not_modified = conditional_get(request, response, "user", user_id, *version)
+    if not_modified is not None:
+        return not_modified
+    
+    db_user = await crud.aio.get_user_detail(db, user_id=user_id, fields=field_names)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    if field_names:
+        return model_response(
+            fieldset_model(schemas.UserDetail, tuple(field_names)).model_validate(db_user), response
+        )
     return db_user
 
 @router.put("/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+async def update_user(user_id: int, user: schemas.UserUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await crud.aio.get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Check if updated username exists for another user
     if user.username is not None:
-        db_user_by_username = crud.get_user_by_username(db, username=user.username)
+        db_user_by_username = await crud.aio.get_user_by_username(db, username=user.username)
         if db_user_by_username and db_user_by_username.user_id != user_id:
             raise HTTPException(status_code=400, detail="Username already registered")
     
     # Check if updated email exists for another user
     if user.email is not None:
-        db_user_by_email = crud.get_user_by_email(db, email=user.email)
+        db_user_by_email = await crud.aio.get_user_by_email(db, email=user.email)
         if db_user_by_email and db_user_by_email.user_id != user_id:
             raise HTTPException(status_code=400, detail="Email already registered")
-            
-    return crud.update_user(db=db, user_id=user_id, user=user)
\ No newline at end of file
+    
+    password_hash = None
+    if user.password:
+        # Release the connection while the password is hashed
+        await db.rollback()
+        password_hash = await hash_password_or_503(user.password)
+    return await crud.aio.update_user(db, user_id=user_id, user=user, password_hash=password_hash)
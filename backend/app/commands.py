@@ -0,0 +1,94 @@
+import argparse
+import sys
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app import crud
+from app.database import get_engine, get_sessionmaker
+from app.utils.seed import SeedScale, seed_database
+
+# Revision matching the schema that create_all built before migrations were introduced
+BASELINE_REVISION = "0001"
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# Maintenance commands, run with `python -m app.commands <command>`
+def reconcile_counters(args):
+    db = get_sessionmaker()()
+    try:
+        rows = crud.rebuild_device_status_counters(db)
+        rollup_rows = crud.rebuild_purchase_spend_rollups(db)
+    finally:
+        db.close()
+    print(f"Rebuilt device status counters ({rows} rows)")
+    print(f"Rebuilt purchase spend rollups ({rollup_rows} rows)")
+
+def migrate(args):
+    config = Config(str(ALEMBIC_INI))
+    tables = inspect(get_engine()).get_table_names()
+    # A database created by create_all has the tables but no migration history
+    if "alembic_version" not in tables and "devices" in tables:
+        print(f"Existing schema without migration history, stamping revision {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, args.revision)
+    
+    # Seed the status counters and spend rollups on the first start after they were introduced
+    db = get_sessionmaker()()
+    try:
+        crud.ensure_device_status_counters(db)
+        crud.ensure_purchase_spend_rollups(db)
+    finally:
+        db.close()
+
+def seed(args):
+    scale = SeedScale.scaled(args.scale)
+    for name in ("devices", "users", "assignments", "purchases"):
+        if getattr(args, name) is not None:
+            setattr(scale, name, getattr(args, name))
+    print(f"Seeding {scale}")
+    try:
+        counts = seed_database(get_engine(), scale, seed=args.seed, log=print)
+    except ValueError as exc:
+        print(f"Cannot seed: {exc}")
+        return 1
+    print(f"Seeded {counts}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    reconcile_parser = subparsers.add_parser(
+        "reconcile-counters",
+        help="Rebuild device_status_counters and purchase_spend_rollups from the tables they summarize"
+    )
+    reconcile_parser.set_defaults(func=reconcile_counters)
+    
+    migrate_parser = subparsers.add_parser(
+        "migrate",
+        help="Upgrade the database schema, adopting databases created before migrations"
+    )
+    migrate_parser.add_argument("revision", nargs="?", default="head", help="Target revision (default: head)")
+    migrate_parser.set_defaults(func=migrate)
+    
+    seed_parser = subparsers.add_parser(
+        "seed",
+        help="Fill an empty, migrated database with synthetic inventory"
+    )
+    seed_parser.add_argument(
+        "--scale", type=float, default=1.0,
+        help="Multiplier on the default 200k devices, 50k users, 2M assignments and 10k purchases"
+    )
+    seed_parser.add_argument("--devices", type=int, help="Override the number of devices")
+    seed_parser.add_argument("--users", type=int, help="Override the number of users")
+    seed_parser.add_argument("--assignments", type=int, help="Override the number of assignments")
+    seed_parser.add_argument("--purchases", type=int, help="Override the number of purchases")
+    seed_parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    seed_parser.set_defaults(func=seed)
+    
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
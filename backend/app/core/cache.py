@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire after a fixed TTL.
+
+    Entries can belong to a group, whose version is bumped whenever the group is
+    invalidated. A value computed before an invalidation and stored after it would
+    otherwise outlive it; set() drops it when the version read before computing it
+    is no longer current.
+
+    Args:
+        maxsize: Maximum number of entries; the least recently used entry is evicted first
+        ttl: Seconds an entry stays valid; 0 disables caching
+        timer: Monotonic clock, replaceable in tests
+    """
+
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Only groups that were invalidated have an entry; clear() bumps them all
+        self._versions: Dict[Hashable, int] = {}
+        self._clears = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._timer():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def version(self, group: Hashable) -> int:
+        """The group's current version, to pass to set() with a value computed after reading it."""
+        with self._lock:
+            return self._versions.get(group, 0) + self._clears
+
+    def set(self, key: Hashable, value: Any, group: Hashable = None, version: Optional[int] = None):
+        """
+        Stores a value. With a group and the version read before the value was computed,
+        the value is only stored if the group has not been invalidated since.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if version is not None and self._versions.get(group, 0) + self._clears != version:
+                self.stale_sets += 1
+                return
+            self._entries[key] = (self._timer() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any], group: Hashable = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # Read before the factory runs, so an invalidation while it runs is noticed
+            version = self.version(group) if group is not None else None
+            value = factory()
+            self.set(key, value, group=group, version=version)
+        return value
+
+    def _bump(self, groups: Iterable[Hashable]):
+        for group in groups:
+            self._versions[group] = self._versions.get(group, 0) + 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool], groups: Iterable[Hashable] = ()) -> int:
+        """
+        Drops every entry whose key matches the predicate, and bumps the versions of
+        the given groups.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            self._bump(groups)
+            stale = [key for key in self._entries if predicate(key)]
+            return self._drop(stale)
+
+    def invalidate_values(self, predicate: Callable[[Any], bool], groups: Iterable[Hashable] = ()) -> int:
+        """
+        Drops every entry whose value matches the predicate, for caches whose keys
+        do not identify what an entry is derived from, and bumps the versions of the
+        given groups.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            self._bump(groups)
+            stale = [key for key, (_, value) in self._entries.items() if predicate(value)]
+            return self._drop(stale)
+
+    def _drop(self, keys) -> int:
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._clears += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_sets": self.stale_sets,
+            }
@@ -0,0 +1,438 @@
+import abc
+import asyncio
+import importlib
+import itertools
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import orjson
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Device events
+#
+# CRUD writes publish small events after they commit: a device was created, updated,
+# retired, checked out or returned. Events go through a broker, so that with several
+# worker processes each one sees the events of all of them, and every process fans them
+# out to its own stream subscribers through an EventHub.
+#
+# The hub keeps recent events in one ring buffer that all subscribers read, instead of
+# a queue per subscriber: publishing appends once and wakes the waiters, and an idle
+# subscriber costs one pending future. A subscriber that falls further behind than the
+# buffer holds gets None back, and starts again from the newest event. So does one that
+# reads past a gap: a place where the broker was disconnected and the events of other
+# workers may have been lost.
+
+EVENT_TYPES = (
+    "device.created",
+    "device.updated",
+    "device.retired",
+    "device.checked_out",
+    "device.returned",
+    "devices.imported",
+)
+
+Deliver = Callable[[dict], None]
+Missed = Callable[[], None]
+
+# Delays between attempts to (re)connect a broker, doubling up to the maximum
+RETRY_MIN_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+
+class EventHub:
+    """
+    Fans events out to the subscribers of one process. Only used on the event loop.
+
+    Args:
+        buffer_size: Most recent events kept for subscribers that are behind
+    """
+
+    def __init__(self, buffer_size: int):
+        self._events: "deque[Tuple[int, dict]]" = deque(maxlen=buffer_size)
+        self._last_id = 0
+        self._waiter: Optional[asyncio.Future] = None
+        self.published = 0
+        self.gaps = 0
+        self.subscribers = 0
+        self.closed = False
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def _wake(self):
+        # One future per batch of waiters: set it, and the next wait makes a new one
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def publish(self, event: dict):
+        self._last_id += 1
+        self._events.append((self._last_id, event))
+        self.published += 1
+        self._wake()
+
+    def mark_gap(self):
+        # Takes an ID of its own, so subscribers read past it once and then carry on
+        self._last_id += 1
+        self._events.append((self._last_id, None))
+        self.gaps += 1
+        self._wake()
+
+    def close(self):
+        # Ends the streams at shutdown
+        self.closed = True
+        self._wake()
+
+    def since(self, last_id: int) -> Optional[List[Tuple[int, dict]]]:
+        """The events after last_id, or None if some of them have left the buffer or were lost."""
+        if last_id >= self._last_id:
+            return []
+        oldest = self._events[0][0] if self._events else self._last_id + 1
+        if last_id + 1 < oldest:
+            return None
+        # IDs are consecutive, so the position in the buffer follows from the ID
+        events = list(itertools.islice(self._events, last_id + 1 - oldest, None))
+        if any(event is None for _, event in events):
+            return None
+        return events
+
+    async def wait(self, last_id: int, timeout: float) -> Optional[List[Tuple[int, dict]]]:
+        """
+        Returns the events after last_id, waiting up to timeout seconds for the next one.
+
+        Returns:
+            The events, an empty list if none arrived in time, or None if some were missed
+        """
+        events = self.since(last_id)
+        if events == []:
+            if self._waiter is None:
+                self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                # Shielded, so a subscriber timing out does not cancel the shared future
+                await asyncio.wait_for(asyncio.shield(self._waiter), timeout)
+            except asyncio.TimeoutError:
+                return []
+            events = self.since(last_id)
+        return events
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "gaps": self.gaps,
+            "last_id": self._last_id,
+            "buffered": len(self._events),
+            "buffer_size": self._events.maxlen,
+        }
+
+# Brokers
+#
+# A broker carries events between worker processes. start() is given the function
+# that hands an event to this process's hub, and publish() must make sure that every
+# started broker, in this process and the others, passes the event to its own. When
+# events from other workers may have been lost, e.g. while a connection was down, the
+# broker calls the missed function it was started with, so subscribers are told to
+# catch up.
+
+async def retry_with_backoff(attempt: Callable[[], Awaitable[None]], what: str) -> int:
+    """
+    Awaits attempt() until it succeeds, sleeping between failures with a doubling delay.
+
+    Returns:
+        Number of failed attempts
+    """
+    delay = RETRY_MIN_SECONDS
+    failures = 0
+    while True:
+        try:
+            await attempt()
+            return failures
+        except Exception as exc:
+            failures += 1
+            logger.warning("Could not %s, retrying in %.1fs: %r", what, delay, exc)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+class EventBroker(abc.ABC):
+    """Interface of an event broker. Its methods are called on the event loop."""
+
+    @abc.abstractmethod
+    async def start(self, deliver: Deliver, missed: Missed):
+        ...
+
+    @abc.abstractmethod
+    async def publish(self, event: dict):
+        ...
+
+    async def stop(self):
+        pass
+
+    def status(self) -> dict:
+        # Connection state, for /diagnostics/events and /readyz
+        return {"connected": True}
+
+class InMemoryBroker(EventBroker):
+    """Delivers events within the process only: for a single worker, and for tests."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver, missed: Missed):
+        self._deliver = deliver
+
+    async def publish(self, event: dict):
+        if self._deliver is not None:
+            self._deliver(event)
+
+    async def stop(self):
+        self._deliver = None
+
+# Sent by a worker that reconnected, so the others know its events may have been lost
+_GAP_PAYLOAD = '{"gap":true}'
+
+class PostgresNotifyBroker(EventBroker):
+    """
+    Shares events between workers with PostgreSQL LISTEN/NOTIFY, over the database the
+    app already uses. Events are delivered locally first, and a worker skips its own
+    notifications, so while its connections are down a worker still streams its own
+    events. It reconnects with backoff, and then marks a gap both locally and, through a
+    notification, in the other workers, whose events it may have missed and which may
+    have missed its own.
+
+    Args:
+        dsn: PostgreSQL connection string for asyncpg
+        channel: Notification channel
+    """
+
+    def __init__(self, dsn: str, channel: str = "itasset_events"):
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+        self._deliver: Optional[Deliver] = None
+        self._missed: Optional[Missed] = None
+        self._listener = None
+        self._publisher = None
+        self._publisher_pid: Optional[int] = None
+        self._connected = False
+        self._reconnecting: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self, deliver: Deliver, missed: Missed):
+        self._deliver = deliver
+        self._missed = missed
+        try:
+            await self._connect()
+        except Exception as exc:
+            # PostgreSQL may be down at boot; keep serving this worker's events meanwhile
+            self._lost(exc)
+
+    async def _connect(self):
+        import asyncpg
+
+        publisher = listener = None
+        try:
+            publisher = await asyncpg.connect(self.dsn)
+            listener = await asyncpg.connect(self.dsn)
+            listener.add_termination_listener(self._listener_closed)
+            await listener.add_listener(self.channel, self._notified)
+        except BaseException:
+            for connection in (listener, publisher):
+                if connection is not None:
+                    connection.terminate()
+            raise
+        self._publisher, self._listener = publisher, listener
+        self._publisher_pid = publisher.get_server_pid()
+        self._connected = True
+
+    def _listener_closed(self, connection):
+        # Also called when stop() or a reconnect closes the listener on purpose
+        if connection is self._listener and self._deliver is not None:
+            self._lost(ConnectionError("event listener connection closed"))
+
+    def _lost(self, exc: BaseException):
+        self._connected = False
+        self.last_error = repr(exc)
+        if self._reconnecting is None or self._reconnecting.done():
+            logger.warning("Event broker lost PostgreSQL, reconnecting: %r", exc)
+            self._reconnecting = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        async def attempt():
+            await self._close()
+            await self._connect()
+            async with self._lock:
+                await self._publisher.execute("SELECT pg_notify($1, $2)", self.channel, _GAP_PAYLOAD)
+
+        await retry_with_backoff(attempt, "reconnect the event broker to PostgreSQL")
+        self.reconnects += 1
+        logger.info("Event broker reconnected to PostgreSQL")
+        if self._missed is not None:
+            self._missed()
+
+    def _notified(self, connection, pid: int, channel: str, payload: str):
+        if pid == self._publisher_pid or self._deliver is None:
+            return
+        if payload == _GAP_PAYLOAD:
+            self._missed()
+        else:
+            self._deliver(orjson.loads(payload))
+
+    async def publish(self, event: dict):
+        if self._deliver is not None:
+            self._deliver(event)
+        if not self._connected:
+            # Other workers are told about the gap once this one reconnects
+            return
+        try:
+            # NOTIFY payloads are limited to 8000 bytes; device events are a few hundred
+            async with self._lock:
+                await self._publisher.execute(
+                    "SELECT pg_notify($1, $2)", self.channel, orjson.dumps(event).decode()
+                )
+        except Exception as exc:
+            self._lost(exc)
+
+    async def _close(self):
+        self._connected = False
+        listener, publisher = self._listener, self._publisher
+        self._listener = self._publisher = None
+        for connection in (listener, publisher):
+            if connection is not None:
+                try:
+                    await asyncio.wait_for(connection.close(), RETRY_MAX_SECONDS)
+                except Exception:
+                    connection.terminate()
+
+    async def stop(self):
+        self._deliver = self._missed = None
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+        await self._close()
+
+    def status(self) -> dict:
+        return {"connected": self._connected, "reconnects": self.reconnects, "last_error": self.last_error}
+
+def create_broker(name: str) -> EventBroker:
+    """
+    Builds the broker named by the EVENT_BROKER setting: "memory", "postgres", or the
+    "module:Class" path of an EventBroker subclass that takes no arguments. A class that
+    does not implement the interface fails here, when the app starts.
+    """
+    if name == "memory":
+        return InMemoryBroker()
+    if name == "postgres":
+        from sqlalchemy.engine import make_url
+
+        url = make_url(get_settings().DATABASE_URL).set(drivername="postgresql")
+        return PostgresNotifyBroker(url.render_as_string(hide_password=False))
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+# Event bus
+#
+# Ties the broker to this process's hub. CRUD writes run in threadpool threads as well
+# as on the event loop, so publish() hands the event to the loop thread-safely and
+# returns at once. Before start(), e.g. in CLI commands, events are dropped. A broker
+# whose start() fails is retried with backoff, and until it starts this worker's events
+# go straight to its own hub.
+
+class EventBus:
+    def __init__(self, broker: EventBroker, buffer_size: int):
+        self.broker = broker
+        self.hub = EventHub(buffer_size)
+        # Identifies this process's event IDs, which mean nothing to another worker
+        self.epoch = os.urandom(4).hex()
+        self.broker_started = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._starting: Optional[asyncio.Task] = None
+        self._pending = set()
+
+    async def _start_broker(self):
+        await self.broker.start(self.hub.publish, self.hub.mark_gap)
+        self.broker_started = True
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        try:
+            await self._start_broker()
+        except Exception as exc:
+            logger.warning(
+                "Event broker did not start, events stay within this worker until it does: %r", exc
+            )
+            self._starting = self._loop.create_task(self._retry_start())
+
+    async def _retry_start(self):
+        await retry_with_backoff(self._start_broker, "start the event broker")
+        # Other workers' events from before it started were never received
+        self.hub.mark_gap()
+
+    async def stop(self):
+        self._loop = None
+        self.hub.close()
+        if self._starting is not None:
+            self._starting.cancel()
+        if self.broker_started:
+            self.broker_started = False
+            await self.broker.stop()
+
+    @property
+    def connected(self) -> bool:
+        return self.broker_started and self.broker.status().get("connected", True)
+
+    def stats(self) -> dict:
+        broker = {"type": type(self.broker).__name__, "started": self.broker_started, **self.broker.status()}
+        broker["connected"] = self.connected
+        return {**self.hub.stats(), "broker": broker}
+
+    def publish(self, event: dict):
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(self._send, event)
+        except RuntimeError:
+            # The loop closed during shutdown
+            pass
+
+    def _send(self, event: dict):
+        if not self.broker_started:
+            self.hub.publish(event)
+            return
+        task = asyncio.ensure_future(self.broker.publish(event))
+        self._pending.add(task)
+        task.add_done_callback(self._sent)
+
+    def _sent(self, task: asyncio.Task):
+        self._pending.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Could not publish event: %r", task.exception())
+
+_event_bus: Optional[EventBus] = None
+_event_bus_lock = threading.Lock()
+
+def get_event_bus() -> EventBus:
+    global _event_bus
+    with _event_bus_lock:
+        if _event_bus is None:
+            settings = get_settings()
+            _event_bus = EventBus(create_broker(settings.EVENT_BROKER), settings.EVENT_BUFFER_SIZE)
+        return _event_bus
+
+def publish_event(event_type: str, **fields):
+    """
+    Publishes an event to the stream subscribers of every worker. Call it after the
+    write the event describes has committed.
+
+    Args:
+        event_type: One of EVENT_TYPES
+        fields: Event data, e.g. device_id
+    """
+    get_event_bus().publish({"type": event_type, "at": datetime.now(timezone.utc), **fields})
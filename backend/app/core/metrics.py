@@ -0,0 +1,261 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .pool import WAIT_BUCKETS, get_pool_stats
+
+# Request and SQL metrics in the Prometheus text format
+#
+# A pure ASGI middleware times every request per route template (never the raw path,
+# which would explode label cardinality) and counts status codes. Cursor execute events
+# on the engines add each statement's count and time to the request that is current
+# in a context variable, so N+1 patterns and DB-bound routes show up per route.
+# Everything is plain counters behind one lock; nothing is exported unless scraped.
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the statements-per-request histogram buckets
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# Label for requests that matched no route, e.g. 404s on random paths
+UNMATCHED_ROUTE = "unmatched"
+
+class Histogram:
+    """Cumulative-on-render bucket counts, sum and count. Not thread-safe on its own."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestTally:
+    """SQL work done on behalf of one request."""
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.statuses: Dict[int, int] = {}
+
+class RequestMetrics:
+    """Per-route request statistics, keyed by (method, route template)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        # Statements run outside any request (startup, commands, background work)
+        self.background_queries = 0
+        self.background_db_seconds = 0.0
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, tally: RequestTally):
+        with self._lock:
+            stats = self.routes.get((method, route))
+            if stats is None:
+                stats = self.routes[(method, route)] = RouteStats()
+            stats.latency.observe(seconds)
+            stats.queries.observe(tally.queries)
+            stats.db_seconds += tally.db_seconds
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def record_background_query(self, seconds: float):
+        with self._lock:
+            self.background_queries += 1
+            self.background_db_seconds += seconds
+
+    def reset(self):
+        with self._lock:
+            self.routes.clear()
+            self.background_queries = 0
+            self.background_db_seconds = 0.0
+
+REQUEST_METRICS = RequestMetrics()
+
+_current_request: ContextVar[Optional[RequestTally]] = ContextVar("current_request", default=None)
+
+def _route_template(scope) -> str:
+    # Newer FastAPI versions keep included routes unprefixed and record the full
+    # template on the effective route context; older ones flatten the prefix into route.path
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    if path is None:
+        return UNMATCHED_ROUTE
+    return path
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and SQL work per route.
+
+    The clock stops when the last body chunk is sent, so streamed responses are
+    measured in full.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = REQUEST_METRICS, exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.metrics = metrics
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        tally = RequestTally()
+        token = _current_request.set(tally)
+        start = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if not recorded:
+                recorded = True
+                self.metrics.record_request(
+                    scope["method"], _route_template(scope), status, time.perf_counter() - start, tally
+                )
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Covers exceptions and clients that disconnect mid-stream
+            record()
+            _current_request.reset(token)
+
+def instrument_queries(engine: Engine, metrics: RequestMetrics = REQUEST_METRICS):
+    """Attributes the statement count and time of a (sync) engine to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        tally = _current_request.get()
+        if tally is None:
+            metrics.record_background_query(seconds)
+        else:
+            tally.queries += 1
+            tally.db_seconds += seconds
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # after_cursor_execute does not fire for failed statements
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+def _histogram_lines(name: str, buckets, counts, total, count, **labels) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip([str(bound) for bound in buckets] + ["+Inf"], counts):
+        cumulative += bucket_count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {count}")
+    return lines
+
+def render_metrics(metrics: RequestMetrics = REQUEST_METRICS) -> str:
+    """Renders the request, SQL and connection pool metrics in the Prometheus text format."""
+    with metrics._lock:
+        routes = [
+            (method, route, stats.statuses.copy(), list(stats.latency.counts), stats.latency.sum,
+             stats.latency.count, list(stats.queries.counts), stats.queries.sum, stats.db_seconds)
+            for (method, route), stats in sorted(metrics.routes.items())
+        ]
+        background_queries = metrics.background_queries
+        background_db_seconds = metrics.background_db_seconds
+
+    requests = [
+        "# HELP http_requests_total Requests handled, by route template and status code.",
+        "# TYPE http_requests_total counter",
+    ]
+    latency = [
+        "# HELP http_request_duration_seconds Time from request start to the last response byte.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    queries = [
+        "# HELP http_request_db_queries SQL statements executed per request.",
+        "# TYPE http_request_db_queries histogram",
+    ]
+    db_time = [
+        "# HELP http_request_db_seconds_total Time spent executing SQL statements, by route.",
+        "# TYPE http_request_db_seconds_total counter",
+    ]
+    for method, route, statuses, latency_counts, latency_sum, count, query_counts, query_sum, db_seconds in routes:
+        for status, status_count in sorted(statuses.items()):
+            requests.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {status_count}")
+        latency += _histogram_lines(
+            "http_request_duration_seconds", LATENCY_BUCKETS, latency_counts, latency_sum, count,
+            method=method, route=route
+        )
+        queries += _histogram_lines(
+            "http_request_db_queries", QUERY_BUCKETS, query_counts, int(query_sum), count,
+            method=method, route=route
+        )
+        db_time.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {db_seconds}")
+
+    background = [
+        "# HELP db_background_queries_total SQL statements executed outside a request.",
+        "# TYPE db_background_queries_total counter",
+        f"db_background_queries_total {background_queries}",
+        "# HELP db_background_seconds_total Time spent on SQL statements outside a request.",
+        "# TYPE db_background_seconds_total counter",
+        f"db_background_seconds_total {background_db_seconds}",
+    ]
+
+    pool_wait = [
+        "# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    pool_events = [
+        "# HELP db_pool_events_total Connection pool events.",
+        "# TYPE db_pool_events_total counter",
+    ]
+    pool_occupancy = [
+        "# HELP db_pool_connections Pooled connections by state.",
+        "# TYPE db_pool_connections gauge",
+    ]
+    for pool_name, stats in sorted(get_pool_stats().items()):
+        wait = stats["checkout_wait"]
+        pool_wait += _histogram_lines(
+            "db_pool_checkout_wait_seconds", WAIT_BUCKETS, list(wait["buckets"].values()),
+            wait["seconds_total"], wait["count"], pool=pool_name
+        )
+        for event_name in ("checkouts", "checkins", "connects", "closes", "invalidations"):
+            pool_events.append(f"db_pool_events_total{_labels(pool=pool_name, event=event_name)} {stats[event_name]}")
+        for state, value in stats.get("occupancy", {}).items():
+            pool_occupancy.append(f"db_pool_connections{_labels(pool=pool_name, state=state)} {value}")
+
+    return "\n".join(requests + latency + queries + db_time + background + pool_wait + pool_events + pool_occupancy) + "\n"
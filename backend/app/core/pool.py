@@ -0,0 +1,145 @@
+import bisect
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .config import get_settings
+
+# Connection pool configuration and instrumentation
+#
+# Engines are built with the pool settings from Settings and an instrumented QueuePool
+# subclass that times every checkout, so a request queuing for a connection shows up
+# as wait time instead of unexplained latency. Pool events count connection churn.
+
+# Upper bounds, in seconds, of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class PoolStats:
+    """Checkout wait and connection churn counters for one engine's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS, seconds)] += 1
+            self.wait_count += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {
+                "checkout_wait": {
+                    "count": self.wait_count,
+                    "seconds_total": self.wait_seconds_total,
+                    "seconds_max": self.wait_seconds_max,
+                    "buckets": dict(zip([str(bound) for bound in WAIT_BUCKETS] + ["+Inf"], self.wait_buckets)),
+                },
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+            }
+        pool = self.engine.pool if self.engine is not None else None
+        if isinstance(pool, QueuePool):
+            data["occupancy"] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                # QueuePool counts overflow from -size upwards
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            }
+        return data
+
+POOL_STATS: Dict[str, PoolStats] = {}
+
+def _instrumented_pool_class(base, stats: PoolStats):
+    # Pool.recreate() (engine.dispose()) instantiates self.__class__, so the stats
+    # binding survives pool recreation
+    class InstrumentedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                stats.record_wait(time.perf_counter() - start)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def engine_options(database_url: str, name: str, is_async: bool = False) -> dict:
+    """
+    Builds create_engine keyword arguments from the pool settings.
+
+    Args:
+        database_url: URL the engine will connect to
+        name: Label the pool's stats are registered under
+        is_async: Whether the options are for create_async_engine
+
+    Returns:
+        Keyword arguments for create_engine / create_async_engine
+    """
+    settings = get_settings()
+    url = make_url(database_url)
+    stats = POOL_STATS.setdefault(name, PoolStats(name))
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    # In-memory SQLite keeps one connection per thread; sizing does not apply
+    if not _is_memory_sqlite(url):
+        base = AsyncAdaptedQueuePool if is_async else QueuePool
+        options.update(
+            poolclass=_instrumented_pool_class(base, stats),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    if timeout_ms and url.get_backend_name() == "postgresql":
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+def instrument_engine(engine: Engine, name: str):
+    """Attaches the churn-counting pool events to a (sync) engine."""
+    stats = POOL_STATS.setdefault(name, PoolStats(name))
+    stats.engine = engine
+    for event_name, counter in (
+        ("checkout", "checkouts"),
+        ("checkin", "checkins"),
+        ("connect", "connects"),
+        ("close", "closes"),
+        ("invalidate", "invalidations"),
+    ):
+        event.listen(engine, event_name, lambda *args, counter=counter: stats.increment(counter))
+
+def get_pool_stats() -> dict:
+    return {name: stats.snapshot() for name, stats in POOL_STATS.items()}
@@ -1,11 +1,23 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, List, Optional
 from jose import jwt
 from passlib.context import CryptContext
 from .config import get_settings
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# The app's one password hashing context; worker processes import it from here too
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
@@ -27,6 +39,116 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+# Password hashing
+#
+# bcrypt spends hundreds of milliseconds of CPU per hash by design. Hashes run in a
+# pool of worker processes behind a bounded queue: a request waits on a future instead
+# of burning its thread, and a burst of sign-ups is turned away with
+# PasswordHashingBusyError rather than piling up behind the cores.
+
+class PasswordHashingBusyError(RuntimeError):
+    """Raised when the hashing queue is full."""
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+class PasswordHasher:
+    """
+    Hashes and verifies passwords in a lazily started process pool.
+
+    Args:
+        workers: Worker processes; 0 runs every hash in the calling thread
+        queue_size: Hashes queued or running at once
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers do not inherit the server's threads and open sockets
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def submit(self, function: Callable, *args, block: bool = False) -> Future:
+        """
+        Queues a call of one of the module's hashing functions.
+
+        Raises:
+            PasswordHashingBusyError: If the queue is full and block is False
+        """
+        if self.workers == 0:
+            future = Future()
+            future.set_result(function(*args))
+            return future
+        if not self._slots.acquire(blocking=block):
+            raise PasswordHashingBusyError("Too many password hashes in progress")
+        try:
+            future = self._get_executor().submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        return self.submit(_hash, password).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self.submit(_hash, password))
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self.submit(_verify, plain_password, hashed_password).result()
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self.submit(_verify, plain_password, hashed_password))
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hashes passwords in parallel across the workers, in order.
+
+        At most half the queue is used, so single hashes from other requests still get
+        through while a bulk import runs; the import waits for capacity instead of failing.
+        """
+        window = max(min(self.workers, self.queue_size // 2), 1)
+        hashes = []
+        in_flight = deque()
+        for password in passwords:
+            if len(in_flight) >= window:
+                hashes.append(in_flight.popleft().result())
+            in_flight.append(self.submit(_hash, password, block=True))
+        hashes.extend(future.result() for future in in_flight)
+        return hashes
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+_password_hasher: Optional[PasswordHasher] = None
+_password_hasher_lock = threading.Lock()
+
+def get_password_hasher() -> PasswordHasher:
+    global _password_hasher
+    with _password_hasher_lock:
+        if _password_hasher is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            if workers is None:
+                workers = os.cpu_count() or 1
+            _password_hasher = PasswordHasher(workers, settings.PASSWORD_HASH_QUEUE_SIZE)
+        return _password_hasher
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifies a password against a hash.
@@ -38,16 +160,34 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches the hash, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_hasher().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """
-    Hashes a password.
+    Hashes a password, blocking the calling thread until a worker has done it.
     
     Args:
         password: Plain text password
         
     Returns:
         Hashed password
+        
+    Raises:
+        PasswordHashingBusyError: If the hashing queue is full
+    """
+    return get_password_hasher().hash(password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hashes a password without blocking the event loop.
+
+    Raises:
+        PasswordHashingBusyError: If the hashing queue is full
+    """
+    return await get_password_hasher().hash_async(password)
+
+def get_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    Hashes many passwords in parallel, returning the hashes in the same order.
     """
-    return pwd_context.hash(password)
\ No newline at end of file
+    return get_password_hasher().hash_many(passwords)
@@ -1,43 +1,117 @@
 # This file imports all CRUD operations to provide a unified interface
+from .pagination import InvalidCursorError
+from . import aio
 from .device import (
     get_device,
+    get_device_detail,
+    get_device_detail_version,
     get_device_by_serial,
     get_devices,
+    get_device_cursor,
+    DEVICE_CURSOR_FIELDS,
+    DEVICE_VERSION_FIELDS,
+    iter_devices,
     create_device,
     update_device,
     retire_device,
+    bulk_create_devices,
 )
 from .user import (
     get_user,
+    get_user_detail,
+    get_user_detail_version,
     get_user_by_username,
     get_user_by_email,
     get_users,
+    get_user_cursor,
+    USER_CURSOR_FIELDS,
+    USER_VERSION_FIELDS,
+    iter_users,
     create_user,
     update_user,
+    bulk_create_users,
 )
 from .device_type import (
     get_device_type,
+    get_device_type_version,
     get_device_type_by_name,
     get_device_types,
+    DEVICE_TYPE_VERSION_FIELDS,
     create_device_type,
     update_device_type,
 )
 from .purchase import (
     get_purchase,
+    get_purchase_detail,
+    get_purchase_detail_version,
     get_purchase_by_po,
     get_purchases,
+    get_purchase_cursor,
+    PURCHASE_CURSOR_FIELDS,
+    PURCHASE_VERSION_FIELDS,
     create_purchase,
     update_purchase,
 )
 from .assignment import (
     get_assignment,
+    get_assignment_detail,
+    get_assignment_detail_version,
     get_assignments,
+    get_assignment_cursor,
+    ASSIGNMENT_CURSOR_FIELDS,
+    ASSIGNMENT_VERSION_FIELDS,
+    iter_assignments,
     create_assignment,
+    create_assignments,
     return_device,
+    return_devices,
+    AssignmentConflictError,
+)
+from .principal import (
+    Principal,
+    get_principal,
+    get_cached_principal,
+    get_principal_version,
+    cache_principal,
+    invalidate_principals,
+    get_principal_cache_stats,
+)
+from .counters import (
+    rebuild_device_status_counters,
+    ensure_device_status_counters,
+    rebuild_purchase_spend_rollups,
+    ensure_purchase_spend_rollups,
 )
 from .reports import (
     get_devices_by_type_report,
     get_device_status_report,
     get_user_assignments_report,
     get_expiring_warranties_report,
-)
\ No newline at end of file
+    get_utilization_report,
+    get_refresh_forecast_report,
+    get_purchase_spend_report,
+    get_report_cache_stats,
+)
+from .utilization import (
+    get_utilization_series_sweep,
+    get_utilization_series_sql,
+    UTILIZATION_INTERVALS,
+    MAX_UTILIZATION_DAYS,
+)
+from .forecast import (
+    get_refresh_forecast,
+    MAX_FORECAST_MONTHS,
+)
+from .spend import (
+    get_purchase_spend,
+    SPEND_GROUPINGS,
+)
+from .history import (
+    get_device_usage_stats,
+    get_devices_usage_stats,
+)
+from .changes import (
+    get_changes,
+    CHANGE_FEED_ENTITIES,
+    MAX_CHANGES_LIMIT,
+)
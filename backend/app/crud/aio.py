@@ -0,0 +1,83 @@
+# Async CRUD operations
+#
+# Each function here takes an AsyncSession and runs the sync CRUD function of the same
+# name on it through AsyncSession.run_sync. The query code is shared with the sync path,
+# while the endpoint awaits the database on the event loop instead of holding a
+# threadpool slot. Returned objects are detached from the greenlet, so callers must
+# not touch unloaded relationships on them.
+from functools import wraps
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import device, user, device_type, purchase, assignment, counters, reports, principal, history, changes
+
+def _run_sync(function):
+    @wraps(function)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(function, *args, **kwargs)
+    return wrapper
+
+# Devices
+get_device = _run_sync(device.get_device)
+get_device_detail = _run_sync(device.get_device_detail)
+get_device_detail_version = _run_sync(device.get_device_detail_version)
+get_device_by_serial = _run_sync(device.get_device_by_serial)
+get_devices = _run_sync(device.get_devices)
+create_device = _run_sync(device.create_device)
+update_device = _run_sync(device.update_device)
+retire_device = _run_sync(device.retire_device)
+
+# Users
+get_user = _run_sync(user.get_user)
+get_user_detail = _run_sync(user.get_user_detail)
+get_user_detail_version = _run_sync(user.get_user_detail_version)
+get_user_by_username = _run_sync(user.get_user_by_username)
+get_user_by_email = _run_sync(user.get_user_by_email)
+get_users = _run_sync(user.get_users)
+create_user = _run_sync(user.create_user)
+update_user = _run_sync(user.update_user)
+get_principal = _run_sync(principal.get_principal)
+
+# Device types
+get_device_type = _run_sync(device_type.get_device_type)
+get_device_type_version = _run_sync(device_type.get_device_type_version)
+get_device_type_by_name = _run_sync(device_type.get_device_type_by_name)
+get_device_types = _run_sync(device_type.get_device_types)
+create_device_type = _run_sync(device_type.create_device_type)
+update_device_type = _run_sync(device_type.update_device_type)
+
+# Purchases
+get_purchase = _run_sync(purchase.get_purchase)
+get_purchase_detail = _run_sync(purchase.get_purchase_detail)
+get_purchase_detail_version = _run_sync(purchase.get_purchase_detail_version)
+get_purchase_by_po = _run_sync(purchase.get_purchase_by_po)
+get_purchases = _run_sync(purchase.get_purchases)
+create_purchase = _run_sync(purchase.create_purchase)
+update_purchase = _run_sync(purchase.update_purchase)
+
+# Assignments
+get_assignment = _run_sync(assignment.get_assignment)
+get_assignment_detail = _run_sync(assignment.get_assignment_detail)
+get_assignment_detail_version = _run_sync(assignment.get_assignment_detail_version)
+get_assignments = _run_sync(assignment.get_assignments)
+create_assignment = _run_sync(assignment.create_assignment)
+create_assignments = _run_sync(assignment.create_assignments)
+return_device = _run_sync(assignment.return_device)
+return_devices = _run_sync(assignment.return_devices)
+
+# Usage history
+get_device_usage_stats = _run_sync(history.get_device_usage_stats)
+get_devices_usage_stats = _run_sync(history.get_devices_usage_stats)
+
+# Counters
+rebuild_device_status_counters = _run_sync(counters.rebuild_device_status_counters)
+
+# Reports
+get_devices_by_type_report = _run_sync(reports.get_devices_by_type_report)
+get_device_status_report = _run_sync(reports.get_device_status_report)
+get_user_assignments_report = _run_sync(reports.get_user_assignments_report)
+get_expiring_warranties_report = _run_sync(reports.get_expiring_warranties_report)
+get_utilization_report = _run_sync(reports.get_utilization_report)
+get_refresh_forecast_report = _run_sync(reports.get_refresh_forecast_report)
+get_purchase_spend_report = _run_sync(reports.get_purchase_spend_report)
+
+# Change feed
+get_changes = _run_sync(changes.get_changes)
@@ -1,25 +1,58 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import Optional
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy import case, desc, select, tuple_, update
+from typing import List, Optional
+from datetime import date
+from collections import Counter
 from app import models
 from app import schemas
-from .device import get_device
+from app.core.events import publish_event
+from .device import EXPORT_BATCH_SIZE
+from .pagination import encode_cursor, decode_cursor
+from .counters import adjust_device_status_counter
+from .loading import fieldset_options, model_columns, schema_columns
+from .reports import invalidate_reports, ASSIGNMENT_REPORTS
+from .versioning import row_version
 
 # Device Assignment CRUD operations
 def get_assignment(db: Session, assignment_id: int):
     return db.query(models.DeviceAssignment).filter(models.DeviceAssignment.assignment_id == assignment_id).first()
 
-def get_assignments(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100,
+def get_assignment_detail(db: Session, assignment_id: int, fields: Optional[List[str]] = None):
+    # Loads the assignment with its device, user and creator (or only the given fields) in a single joined query
+    relationships = {
+        "device": joinedload(models.DeviceAssignment.device).load_only(
+            *schema_columns(models.Device, schemas.DeviceBrief)
+        ),
+        "user": joinedload(models.DeviceAssignment.user).load_only(
+            *schema_columns(models.User, schemas.UserBrief)
+        ),
+        "created_by_user": joinedload(models.DeviceAssignment.created_by_user).load_only(
+            *schema_columns(models.User, schemas.UserBrief)
+        )
+    }
+    return db.query(models.DeviceAssignment).options(
+        *fieldset_options(models.DeviceAssignment, relationships, fields)
+    ).filter(models.DeviceAssignment.assignment_id == assignment_id).first()
+
+def get_assignment_detail_version(db: Session, assignment_id: int):
+    # Modification times of the assignment and the device, user and creator it shows
+    creator = aliased(models.User)
+    return row_version(db.query(
+        models.DeviceAssignment.last_modified_date,
+        models.Device.last_modified_date,
+        models.User.last_modified_date,
+        creator.last_modified_date
+    ).join(models.DeviceAssignment.device).join(models.DeviceAssignment.user).outerjoin(
+        models.DeviceAssignment.created_by_user.of_type(creator)
+    ).filter(models.DeviceAssignment.assignment_id == assignment_id).first())
+
+def filter_assignments(
+    query,
     device_id: Optional[int] = None,
     user_id: Optional[int] = None,
     active_only: bool = False
 ):
-    query = db.query(models.DeviceAssignment)
-    
-    # Apply filters
+    # Applies the assignment listing filters to a query over assignments
     if device_id is not None:
         query = query.filter(models.DeviceAssignment.device_id == device_id)
     
@@ -29,9 +62,211 @@ def get_assignments(
     if active_only:
         query = query.filter(models.DeviceAssignment.actual_return_date == None)
     
-    return query.order_by(desc(models.DeviceAssignment.checkout_date)).offset(skip).limit(limit).all()
+    return query
+
+def get_assignments(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100,
+    device_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    active_only: bool = False,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
+):
+    # With fields, returns plain rows of just those columns instead of DeviceAssignment objects
+    query = filter_assignments(
+        db.query(*model_columns(models.DeviceAssignment, fields)) if fields else db.query(models.DeviceAssignment),
+        device_id=device_id,
+        user_id=user_id,
+        active_only=active_only
+    )
+    
+    # Keyset pagination replaces the offset when a cursor is given
+    sort_key = (models.DeviceAssignment.checkout_date, models.DeviceAssignment.assignment_id)
+    query = query.order_by(*[desc(column) for column in sort_key])
+    if cursor:
+        query = query.filter(tuple_(*sort_key) < tuple_(*decode_cursor(cursor, date, int)))
+    else:
+        query = query.offset(skip)
+    
+    return query.limit(limit).all()
+
+# The fields a listing page's version is made of (app.utils.conditional.page_version)
+ASSIGNMENT_VERSION_FIELDS = ("assignment_id", "last_modified_date")
+
+# The fields the cursor is made of, which a narrowed listing must still select
+ASSIGNMENT_CURSOR_FIELDS = ("checkout_date", "assignment_id")
+
+def get_assignment_cursor(db_assignment: models.DeviceAssignment) -> str:
+    return encode_cursor(db_assignment.checkout_date, db_assignment.assignment_id)
+
+def iter_assignments(
+    db: Session,
+    device_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    active_only: bool = False
+):
+    # Streams plain rows with the columns of the DeviceAssignment schema, without building ORM objects
+    columns = schema_columns(models.DeviceAssignment, schemas.DeviceAssignment)
+    query = filter_assignments(
+        db.query(*columns),
+        device_id=device_id,
+        user_id=user_id,
+        active_only=active_only
+    )
+    return query.order_by(
+        desc(models.DeviceAssignment.checkout_date),
+        desc(models.DeviceAssignment.assignment_id)
+    ).yield_per(EXPORT_BATCH_SIZE)
+
+class AssignmentConflictError(ValueError):
+    """
+    Raised when a checkout or return cannot be applied. The transaction is rolled
+    back and nothing is written.
+
+    Attributes:
+        errors: One {"id", "error"} entry per rejected device or assignment
+    """
+
+    def __init__(self, errors: List[dict]):
+        super().__init__("; ".join(f"{error['id']}: {error['error']}" for error in errors))
+        self.errors = errors
+
+def _adjust_status_counters(db: Session, moves: Counter):
+    # moves counts devices per (status before, status after) pair
+    for (before, after), count in moves.items():
+        adjust_device_status_counter(db, before, -count)
+        adjust_device_status_counter(db, after, count)
+
+def _checkout_error(db_device) -> str:
+    # Same order as the checks in create_assignments
+    if db_device is None:
+        return "Device not found"
+    if db_device.is_checked_out or not db_device.is_retired:
+        return "Device is already checked out"
+    return "Cannot assign a retired device"
+
+def _check_out_devices(db: Session, device_ids: List[int]):
+    """
+    Flips is_checked_out on every device in one conditional UPDATE. A device that is
+    already checked out or retired does not match, so two concurrent checkouts of the
+    same device cannot both succeed.
+
+    Returns:
+        The device type of each device, by device ID
+    """
+    device = models.Device
+    rows = db.execute(
+        update(device)
+        .where(
+            device.device_id.in_(device_ids),
+            device.is_checked_out == False,
+            device.is_retired == False
+        )
+        .values(is_checked_out=True)
+        .returning(device.device_id, device.device_type_id)
+        .execution_options(synchronize_session="fetch")
+    ).all()
+
+    checked_out = {row.device_id for row in rows}
+    missed = [device_id for device_id in device_ids if device_id not in checked_out]
+    if missed:
+        db.rollback()
+        # Read why each device did not match; it changed after any checks the caller made
+        current = {
+            row.device_id: row
+            for row in db.execute(
+                select(device.device_id, device.is_checked_out, device.is_retired)
+                .where(device.device_id.in_(missed))
+            )
+        }
+        raise AssignmentConflictError([
+            {"id": device_id, "error": _checkout_error(current.get(device_id))} for device_id in missed
+        ])
+
+    _adjust_status_counters(db, Counter(
+        ((row.device_type_id, False, False), (row.device_type_id, True, False)) for row in rows
+    ))
+    return {row.device_id: row.device_type_id for row in rows}
+
+def _publish_checkout(db_assignment: models.DeviceAssignment, device_type_id: int):
+    # Called once the checkout has committed, for the /events stream
+    publish_event(
+        "device.checked_out",
+        device_id=db_assignment.device_id,
+        device_type_id=device_type_id,
+        assignment_id=db_assignment.assignment_id,
+        user_id=db_assignment.user_id
+    )
+
+def _lock_devices(db: Session, device_ids: List[int]):
+    # Reads the status of every requested device in one query, locking the rows until commit
+    return {
+        row.device_id: row
+        for row in db.execute(
+            select(
+                models.Device.device_id,
+                models.Device.is_checked_out,
+                models.Device.is_retired
+            )
+            .where(models.Device.device_id.in_(device_ids))
+            .with_for_update()
+        )
+    }
+
+def create_assignments(db: Session, checkout: schemas.DeviceBatchCheckout) -> List[models.DeviceAssignment]:
+    """
+    Checks a set of devices out to one user in a single transaction. Either every
+    device is assigned or, if any is missing, checked out or retired, none is.
+
+    Args:
+        db: Database session
+        checkout: User, devices and shared checkout details
+
+    Returns:
+        The new assignments, in device_ids order
+
+    Raises:
+        AssignmentConflictError: If any device cannot be checked out
+    """
+    device_ids = checkout.device_ids
+    devices = _lock_devices(db, device_ids)
+
+    errors = []
+    seen = set()
+    for device_id in device_ids:
+        db_device = devices.get(device_id)
+        if device_id in seen:
+            errors.append({"id": device_id, "error": "Device is listed more than once"})
+        elif db_device is None:
+            errors.append({"id": device_id, "error": "Device not found"})
+        elif db_device.is_checked_out:
+            errors.append({"id": device_id, "error": "Device is already checked out"})
+        elif db_device.is_retired:
+            errors.append({"id": device_id, "error": "Cannot assign a retired device"})
+        seen.add(device_id)
+    if errors:
+        db.rollback()
+        raise AssignmentConflictError(errors)
+
+    device_types = _check_out_devices(db, device_ids)
+
+    details = checkout.model_dump(exclude={"device_ids"})
+    db_assignments = [models.DeviceAssignment(device_id=device_id, **details) for device_id in device_ids]
+    db.add_all(db_assignments)
+
+    db.commit()
+    invalidate_reports(*ASSIGNMENT_REPORTS)
+    for db_assignment in db_assignments:
+        db.refresh(db_assignment)
+        _publish_checkout(db_assignment, device_types[db_assignment.device_id])
+    return db_assignments
 
 def create_assignment(db: Session, assignment: schemas.DeviceAssignmentCreate):
+    # Flip the device first; the conditional UPDATE rejects a device checked out concurrently
+    device_types = _check_out_devices(db, [assignment.device_id])
+    
     # Create the assignment
     db_assignment = models.DeviceAssignment(
         device_id=assignment.device_id,
@@ -44,33 +279,136 @@ def create_assignment(db: Session, assignment: schemas.DeviceAssignmentCreate):
     )
     db.add(db_assignment)
     
-    # Update device status
-    db_device = get_device(db, assignment.device_id)
-    db_device.is_checked_out = True
-    
     db.commit()
+    invalidate_reports(*ASSIGNMENT_REPORTS)
     db.refresh(db_assignment)
+    _publish_checkout(db_assignment, device_types[assignment.device_id])
     return db_assignment
 
+def _return_notes(notes: Optional[str]):
+    # Appends the return notes to the existing notes inside the UPDATE
+    column = models.DeviceAssignment.notes
+    if not notes:
+        return column
+    return case(
+        (column == None, f"Return Notes: {notes}"),
+        else_=column + f"\n\nReturn Notes: {notes}"
+    )
+
+def _return_assignments(db: Session, assignment_ids: List[int], return_info: schemas.DeviceReturn):
+    """
+    Closes open assignments and checks their devices back in with one conditional
+    UPDATE per table. An assignment that was already returned does not match, so a
+    device cannot be returned twice.
+
+    Returns:
+        (assignment ID, device ID, device type ID) of each returned assignment
+    """
+    assignment = models.DeviceAssignment
+    rows = db.execute(
+        update(assignment)
+        .where(
+            assignment.assignment_id.in_(assignment_ids),
+            assignment.actual_return_date == None
+        )
+        .values(
+            actual_return_date=return_info.actual_return_date,
+            return_condition=return_info.return_condition,
+            notes=_return_notes(return_info.notes)
+        )
+        .returning(assignment.assignment_id, assignment.device_id)
+        .execution_options(synchronize_session="fetch")
+    ).all()
+
+    returned = {row.assignment_id for row in rows}
+    missed = [assignment_id for assignment_id in assignment_ids if assignment_id not in returned]
+    if missed:
+        db.rollback()
+        raise AssignmentConflictError([
+            {"id": assignment_id, "error": "Device has already been returned"} for assignment_id in missed
+        ])
+
+    device = models.Device
+    devices = db.execute(
+        update(device)
+        .where(device.device_id.in_([row.device_id for row in rows]))
+        .values(is_checked_out=False)
+        .returning(device.device_id, device.device_type_id, device.is_retired)
+        .execution_options(synchronize_session="fetch")
+    ).all()
+    _adjust_status_counters(db, Counter(
+        ((row.device_type_id, True, row.is_retired), (row.device_type_id, False, row.is_retired))
+        for row in devices
+    ))
+    device_types = {row.device_id: row.device_type_id for row in devices}
+    return [(row.assignment_id, row.device_id, device_types[row.device_id]) for row in rows]
+
+def _publish_returns(returned: list):
+    # Called once the returns have committed, for the /events stream
+    for assignment_id, device_id, device_type_id in returned:
+        publish_event(
+            "device.returned", device_id=device_id, device_type_id=device_type_id, assignment_id=assignment_id
+        )
+
+def return_devices(db: Session, batch: schemas.DeviceBatchReturn) -> List[models.DeviceAssignment]:
+    """
+    Returns a set of assignments in a single transaction. Either every assignment is
+    closed or, if any is missing or already returned, none is.
+
+    Args:
+        db: Database session
+        batch: Assignments to close and shared return details
+
+    Returns:
+        The closed assignments, in assignment_ids order
+
+    Raises:
+        AssignmentConflictError: If any assignment cannot be returned
+    """
+    assignment_ids = batch.assignment_ids
+    # One query validates the whole batch and locks the assignment rows
+    assignments = {
+        row.assignment_id: row
+        for row in db.execute(
+            select(models.DeviceAssignment.assignment_id, models.DeviceAssignment.actual_return_date)
+            .where(models.DeviceAssignment.assignment_id.in_(assignment_ids))
+            .with_for_update()
+        )
+    }
+
+    errors = []
+    seen = set()
+    for assignment_id in assignment_ids:
+        db_assignment = assignments.get(assignment_id)
+        if assignment_id in seen:
+            errors.append({"id": assignment_id, "error": "Assignment is listed more than once"})
+        elif db_assignment is None:
+            errors.append({"id": assignment_id, "error": "Assignment not found"})
+        elif db_assignment.actual_return_date is not None:
+            errors.append({"id": assignment_id, "error": "Device has already been returned"})
+        seen.add(assignment_id)
+    if errors:
+        db.rollback()
+        raise AssignmentConflictError(errors)
+
+    returned = _return_assignments(db, assignment_ids, batch)
+    db.commit()
+    invalidate_reports(*ASSIGNMENT_REPORTS)
+    _publish_returns(returned)
+
+    db_assignments = {
+        db_assignment.assignment_id: db_assignment
+        for db_assignment in db.query(models.DeviceAssignment)
+        .filter(models.DeviceAssignment.assignment_id.in_(assignment_ids))
+    }
+    return [db_assignments[assignment_id] for assignment_id in assignment_ids]
+
 def return_device(db: Session, assignment_id: int, return_info: schemas.DeviceReturn):
-    # Get assignment
-    db_assignment = get_assignment(db, assignment_id)
-    
-    # Update assignment
-    db_assignment.actual_return_date = return_info.actual_return_date
-    db_assignment.return_condition = return_info.return_condition
-    
-    # Update notes if provided
-    if return_info.notes:
-        if db_assignment.notes:
-            db_assignment.notes = f"{db_assignment.notes}\n\nReturn Notes: {return_info.notes}"
-        else:
-            db_assignment.notes = f"Return Notes: {return_info.notes}"
-    
-    # Update device status
-    db_device = get_device(db, db_assignment.device_id)
-    db_device.is_checked_out = False
+    # Close the assignment and check the device back in; the conditional UPDATE
+    # rejects an assignment returned concurrently
+    returned = _return_assignments(db, [assignment_id], return_info)
     
     db.commit()
-    db.refresh(db_assignment)
-    return db_assignment
\ No newline at end of file
+    invalidate_reports(*ASSIGNMENT_REPORTS)
+    _publish_returns(returned)
+    return get_assignment(db, assignment_id)
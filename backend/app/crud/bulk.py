@@ -0,0 +1,159 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel, ValidationError
+from itertools import islice
+from typing import Callable, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type
+from app.utils.bulk_import import validation_message
+
+# Bulk import
+#
+# Upload rows are processed in chunks. Each chunk is validated against the create
+# schema, then every uniqueness and reference check runs as one set-based query for
+# the whole chunk, and the valid rows go in with a single executemany and a commit,
+# so a bad row never aborts the good ones. If the insert still fails, because a
+# concurrent writer registered the same key after the checks, the chunk is retried
+# with one savepoint per row and only the conflicting rows are reported.
+
+BULK_IMPORT_CHUNK_SIZE = 500
+
+class UniqueKey(NamedTuple):
+    """A field whose value must be new, both in the database and within the upload."""
+    field: str
+    column: object
+    error: str
+
+class Reference(NamedTuple):
+    """A field that, when set, must match an existing row."""
+    field: str
+    column: object
+    error: str
+
+def _existing(db: Session, column, values: set) -> set:
+    if not values:
+        return set()
+    return {value for (value,) in db.query(column).filter(column.in_(values))}
+
+def _row_error(item: BaseModel, unique, references, existing: dict, seen: dict, known: dict) -> Optional[str]:
+    for key in unique:
+        value = getattr(item, key.field)
+        if value in existing[key.field] or value in seen[key.field]:
+            return key.error
+    for reference in references:
+        value = getattr(item, reference.field)
+        if value is not None and value not in known[reference.field]:
+            return reference.error
+    return None
+
+def bulk_insert(
+    db: Session,
+    rows: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+    model,
+    schema: Type[BaseModel],
+    noun: str,
+    key_field: str,
+    unique: Sequence[UniqueKey] = (),
+    references: Sequence[Reference] = (),
+    prepare: Optional[Callable[[List[BaseModel]], List[dict]]] = None,
+    track: Optional[Callable[[Session, List[BaseModel]], None]] = None,
+    chunk_size: int = BULK_IMPORT_CHUNK_SIZE
+) -> dict:
+    """
+    Inserts the valid rows of an upload and reports the others.
+
+    Args:
+        db: Database session
+        rows: (row_number, data, error) tuples as produced by app.utils.bulk_import
+        model: Model the rows are inserted into
+        schema: Create schema each row is validated with
+        noun: What a row is, for the error report, e.g. "device"
+        key_field: Field that identifies a row in the error report
+        unique: Fields that must not be registered yet, checked in order
+        references: Fields that must point at existing rows, checked after unique
+        prepare: Builds the insert values of the valid rows; defaults to model_dump()
+        track: Called with the rows inserted, in their transaction, e.g. to adjust counters
+        chunk_size: Number of rows validated and inserted per transaction
+
+    Returns:
+        Dict with the number of rows created and a per-row error report
+    """
+    created = 0
+    errors = []
+    seen = {key.field: set() for key in unique}
+    rows = iter(rows)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        # Validate the shape of each row
+        candidates = []
+        for row_number, data, error in chunk:
+            if error is None:
+                try:
+                    candidates.append((row_number, schema(**data)))
+                    continue
+                except ValidationError as exc:
+                    error = validation_message(exc)
+            errors.append({"row": row_number, key_field: data.get(key_field) if data else None, "error": error})
+
+        # Check keys and references for the whole chunk at once
+        existing = {
+            key.field: _existing(db, key.column, {getattr(item, key.field) for _, item in candidates})
+            for key in unique
+        }
+        known = {
+            reference.field: _existing(
+                db, reference.column, {getattr(item, reference.field) for _, item in candidates} - {None}
+            )
+            for reference in references
+        }
+        # End the read transaction; preparing the rows can take far longer than the queries
+        db.commit()
+
+        valid = []
+        for row_number, item in candidates:
+            error = _row_error(item, unique, references, existing, seen, known)
+            if error is not None:
+                errors.append({"row": row_number, key_field: getattr(item, key_field), "error": error})
+                continue
+            for key in unique:
+                seen[key.field].add(getattr(item, key.field))
+            valid.append((row_number, item))
+
+        if valid:
+            created += _insert_chunk(db, model, noun, key_field, valid, errors, prepare, track)
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "failed": len(errors), "errors": errors}
+
+def _insert_chunk(db: Session, model, noun: str, key_field: str, valid: list, errors: list, prepare, track) -> int:
+    items = [item for _, item in valid]
+    values = prepare(items) if prepare is not None else [item.model_dump() for item in items]
+    try:
+        db.execute(insert(model), values)
+        if track is not None:
+            track(db, items)
+        db.commit()
+        return len(valid)
+    except IntegrityError:
+        db.rollback()
+
+    # A concurrent writer got in first; fall back to one savepoint per row
+    created = 0
+    for (row_number, item), row_values in zip(valid, values):
+        try:
+            with db.begin_nested():
+                db.execute(insert(model), row_values)
+                if track is not None:
+                    track(db, [item])
+            created += 1
+        except IntegrityError as exc:
+            errors.append({
+                "row": row_number,
+                key_field: getattr(item, key_field),
+                "error": f"Could not insert {noun}: {exc.orig}"
+            })
+    db.commit()
+    return created
@@ -0,0 +1,122 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import literal
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.types import DateTime
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from app import models
+from app import schemas
+from app.core.config import get_settings
+from .dates import seconds_ago
+from .loading import schema_columns
+from .pagination import encode_cursor, decode_cursor
+
+# Change feed
+#
+# Rows modified after a token, read per entity in (last_modified_date, primary key)
+# order from the ix_<table>_last_modified indexes, so a sync reads only what changed.
+# The token holds the last (last_modified_date, id) handed out for every entity, and
+# the feed's next token resumes each entity where the page ended.
+#
+# Rows are stamped with the database time when their transaction or statement started,
+# so a write can commit with a timestamp older than changes already handed out. Changes
+# from the last CHANGE_FEED_SETTLE_SECONDS are therefore held back until the next sync.
+# Nothing is ever hard deleted: retired devices, deactivated users and returned
+# assignments come through as changes with their own action.
+
+# name: (model, primary key, response schema, action for rows in an end state or None)
+CHANGE_FEED_ENTITIES = {
+    "device_types": (models.DeviceType, "device_type_id", schemas.DeviceType, None),
+    "purchases": (models.Purchase, "purchase_id", schemas.Purchase, None),
+    "users": (models.User, "user_id", schemas.User, lambda row: None if row.is_active else "deactivated"),
+    "devices": (models.Device, "device_id", schemas.Device, lambda row: "retired" if row.is_retired else None),
+    "assignments": (
+        models.DeviceAssignment, "assignment_id", schemas.DeviceAssignment,
+        lambda row: "returned" if row.actual_return_date is not None else None
+    ),
+}
+
+# Most changes returned per entity in one call
+MAX_CHANGES_LIMIT = 1000
+
+# SQLite keeps CURRENT_TIMESTAMP as text to the second and compares it as text, so the
+# token's timestamp is bound in the same format
+_SQLITE_TIMESTAMP = sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+)
+
+def _decode_token(token: Optional[str]) -> Dict[str, tuple]:
+    if not token:
+        return {name: (None, None) for name in CHANGE_FEED_ENTITIES}
+    values = decode_cursor(token, *(datetime, int) * len(CHANGE_FEED_ENTITIES))
+    return {name: values[index * 2:index * 2 + 2] for index, name in enumerate(CHANGE_FEED_ENTITIES)}
+
+def _encode_token(positions: Dict[str, tuple]) -> str:
+    return encode_cursor(*(value for name in CHANGE_FEED_ENTITIES for value in positions[name]))
+
+def _action(row, end_state) -> str:
+    action = end_state(row) if end_state is not None else None
+    if action is not None:
+        return action
+    # Rows that were never updated still carry their creation time
+    return "created" if row.created_date == row.last_modified_date else "updated"
+
+def get_changes(
+    db: Session,
+    since: Optional[str] = None,
+    entities: Optional[Sequence[str]] = None,
+    limit: int = 100
+) -> dict:
+    """
+    Returns the rows modified after a feed token, oldest change first per entity.
+
+    Args:
+        db: Database session
+        since: Token from a previous call, or None to start from the beginning
+        entities: Entity names to read, from CHANGE_FEED_ENTITIES; defaults to all
+        limit: Most changes per entity
+
+    Returns:
+        The changes, the token to pass as since next time, and whether any entity
+        had more changes than the limit
+
+    Raises:
+        InvalidCursorError: If the token cannot be decoded
+    """
+    positions = _decode_token(since)
+    settled = seconds_ago(get_settings().CHANGE_FEED_SETTLE_SECONDS)
+    sqlite_dialect = db.get_bind().dialect.name == "sqlite"
+    changes: List[dict] = []
+    has_more = False
+
+    for name in entities or CHANGE_FEED_ENTITIES:
+        model, key, schema, end_state = CHANGE_FEED_ENTITIES[name]
+        modified = model.last_modified_date
+        primary_key = getattr(model, key)
+        query = db.query(*schema_columns(model, schema)).filter(modified <= settled)
+        rows = []
+        last_modified, last_id = positions[name]
+        if last_modified is not None:
+            last_modified = literal(last_modified, _SQLITE_TIMESTAMP if sqlite_dialect else DateTime())
+            # The rest of the rows sharing the token's timestamp, then the later ones: two
+            # index range scans, where one OR over both reads every row with that timestamp
+            rows = query.filter(
+                modified == last_modified, primary_key > last_id
+            ).order_by(primary_key).limit(limit).all()
+            query = query.filter(modified > last_modified)
+        if len(rows) < limit:
+            rows += query.order_by(modified, primary_key).limit(limit - len(rows)).all()
+
+        for row in rows:
+            changes.append({
+                "entity": name,
+                "id": getattr(row, key),
+                "action": _action(row, end_state),
+                "last_modified_date": row.last_modified_date,
+                "data": row._asdict(),
+            })
+        if rows:
+            positions[name] = (rows[-1].last_modified_date, getattr(rows[-1], key))
+        has_more = has_more or len(rows) == limit
+
+    return {"changes": changes, "next": _encode_token(positions), "has_more": has_more}
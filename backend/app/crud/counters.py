@@ -0,0 +1,283 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, insert, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+from app import models
+from .dates import month_start
+from .reports import (
+    invalidate_reports, get_devices_by_type_report, get_device_status_report, get_purchase_spend_report
+)
+
+# Device status counters
+#
+# device_status_counters holds one row per (device_type_id, is_checked_out, is_retired)
+# with the number of devices in that state. Every write that changes one of those three
+# columns moves the device between rows inside the caller's transaction, so the status
+# reports read a handful of rows instead of counting the devices table.
+
+StatusKey = Tuple[int, bool, bool]
+
+_upsert_dialects = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def device_status_key(db_device: models.Device) -> StatusKey:
+    return (db_device.device_type_id, bool(db_device.is_checked_out), bool(db_device.is_retired))
+
+def adjust_device_status_counter(db: Session, key: StatusKey, delta: int):
+    device_type_id, is_checked_out, is_retired = key
+    counter = models.DeviceStatusCounter
+    dialect_insert = _upsert_dialects.get(db.get_bind().dialect.name)
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(counter).values(
+            device_type_id=device_type_id,
+            is_checked_out=is_checked_out,
+            is_retired=is_retired,
+            device_count=delta
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[counter.device_type_id, counter.is_checked_out, counter.is_retired],
+            set_={"device_count": counter.device_count + stmt.excluded.device_count}
+        )
+        db.execute(stmt)
+        return
+
+    # Portable fallback: update the row, creating it if it does not exist yet
+    result = db.execute(
+        update(counter).where(
+            counter.device_type_id == device_type_id,
+            counter.is_checked_out == is_checked_out,
+            counter.is_retired == is_retired
+        ).values(device_count=counter.device_count + delta)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(counter).values(
+            device_type_id=device_type_id,
+            is_checked_out=is_checked_out,
+            is_retired=is_retired,
+            device_count=delta
+        ))
+
+def track_device_status(db: Session, before: Optional[StatusKey], after: Optional[StatusKey]):
+    """
+    Moves one device between counter rows.
+
+    Args:
+        db: Database session
+        before: Status key before the write, or None for a new device
+        after: Status key after the write
+    """
+    if before == after:
+        return
+    if before is not None:
+        adjust_device_status_counter(db, before, -1)
+    if after is not None:
+        adjust_device_status_counter(db, after, 1)
+
+def rebuild_device_status_counters(db: Session) -> int:
+    """
+    Rebuilds the counter table from the devices table.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of counter rows written
+    """
+    counter = models.DeviceStatusCounter
+    db.execute(delete(counter))
+    result = db.execute(
+        insert(counter).from_select(
+            ["device_type_id", "is_checked_out", "is_retired", "device_count"],
+            select(
+                models.Device.device_type_id,
+                models.Device.is_checked_out,
+                models.Device.is_retired,
+                func.count(models.Device.device_id)
+            ).group_by(
+                models.Device.device_type_id,
+                models.Device.is_checked_out,
+                models.Device.is_retired
+            )
+        )
+    )
+    db.commit()
+    invalidate_reports(get_devices_by_type_report, get_device_status_report)
+    return result.rowcount
+
+def ensure_device_status_counters(db: Session) -> bool:
+    """
+    Seeds the counter table when it is empty but devices already exist,
+    e.g. the first start after the table was introduced.
+
+    Returns:
+        True if the table was rebuilt
+    """
+    if db.query(models.DeviceStatusCounter).first() is not None:
+        return False
+    if db.query(models.Device.device_id).first() is None:
+        return False
+    rebuild_device_status_counters(db)
+    return True
+
+# Purchase spend rollups
+#
+# purchase_spend_rollups holds one row per (vendor, purchase month) with the number of
+# purchases, their total amount and the number of devices bought with them, so the spend
+# reports read rollup rows instead of grouping the purchases table. Purchase writes move
+# a purchase between rows; device writes that set or change a device's purchase move
+# the device between rows. Undated purchases have no month and are left out.
+
+SpendKey = Tuple[str, date]
+
+def purchase_spend_key(vendor: Optional[str], purchase_date: Optional[date]) -> Optional[SpendKey]:
+    if purchase_date is None:
+        return None
+    return (vendor or "", purchase_date.replace(day=1))
+
+def adjust_purchase_spend(
+    db: Session, key: SpendKey, purchases: int = 0, amount: Decimal = Decimal(0), devices: int = 0
+):
+    vendor, month = key
+    rollup = models.PurchaseSpendRollup
+    dialect_insert = _upsert_dialects.get(db.get_bind().dialect.name)
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(rollup).values(
+            vendor=vendor, month=month, purchase_count=purchases, total_amount=amount, device_count=devices
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[rollup.vendor, rollup.month],
+            set_={
+                "purchase_count": rollup.purchase_count + stmt.excluded.purchase_count,
+                "total_amount": rollup.total_amount + stmt.excluded.total_amount,
+                "device_count": rollup.device_count + stmt.excluded.device_count,
+            }
+        )
+        db.execute(stmt)
+        return
+
+    # Portable fallback: update the row, creating it if it does not exist yet
+    result = db.execute(
+        update(rollup).where(rollup.vendor == vendor, rollup.month == month).values(
+            purchase_count=rollup.purchase_count + purchases,
+            total_amount=rollup.total_amount + amount,
+            device_count=rollup.device_count + devices
+        )
+    )
+    if result.rowcount == 0:
+        db.execute(insert(rollup).values(
+            vendor=vendor, month=month, purchase_count=purchases, total_amount=amount, device_count=devices
+        ))
+
+def track_purchase_spend(
+    db: Session,
+    purchase_id: Optional[int],
+    before: Optional[Tuple[SpendKey, Decimal]],
+    after: Optional[Tuple[SpendKey, Decimal]]
+):
+    """
+    Moves one purchase, with its devices, between rollup rows.
+
+    Args:
+        db: Database session
+        purchase_id: The purchase, or None for a new one, which has no devices yet
+        before: Rollup key and amount before the write, or None for a new or undated purchase
+        after: Rollup key and amount after the write, or None for an undated purchase
+    """
+    if before == after:
+        return
+    devices = 0
+    if purchase_id is not None:
+        devices = db.query(func.count(models.Device.device_id)).filter(
+            models.Device.purchase_id == purchase_id
+        ).scalar()
+    if before is not None:
+        key, amount = before
+        adjust_purchase_spend(db, key, -1, -amount, -devices)
+    if after is not None:
+        key, amount = after
+        adjust_purchase_spend(db, key, 1, amount, devices)
+
+def track_purchase_devices(db: Session, deltas: Dict[Optional[int], int]):
+    """
+    Moves devices between the rollup rows of their purchases.
+
+    Args:
+        db: Database session
+        deltas: Devices gained, or lost if negative, by purchase ID
+    """
+    deltas = {purchase_id: delta for purchase_id, delta in deltas.items() if purchase_id is not None and delta}
+    if not deltas:
+        return
+    changes = {}
+    for purchase_id, vendor, purchase_date in db.query(
+        models.Purchase.purchase_id, models.Purchase.vendor, models.Purchase.purchase_date
+    ).filter(models.Purchase.purchase_id.in_(deltas)):
+        key = purchase_spend_key(vendor, purchase_date)
+        if key is not None:
+            changes[key] = changes.get(key, 0) + deltas[purchase_id]
+    for key, delta in changes.items():
+        if delta:
+            adjust_purchase_spend(db, key, devices=delta)
+
+def rebuild_purchase_spend_rollups(db: Session) -> int:
+    """
+    Rebuilds the rollup table from the purchases and devices tables.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of rollup rows written
+    """
+    rollup = models.PurchaseSpendRollup
+    purchase = models.Purchase
+    devices = select(
+        models.Device.purchase_id, func.count(models.Device.device_id).label("device_count")
+    ).where(models.Device.purchase_id != None).group_by(models.Device.purchase_id).subquery()
+    # Grouped over a subquery, so the vendor expression and its bound "" appear once
+    dated = select(
+        func.coalesce(purchase.vendor, "").label("vendor"),
+        month_start(purchase.purchase_date).label("month"),
+        purchase.purchase_id,
+        purchase.total_amount,
+        devices.c.device_count
+    ).outerjoin(
+        devices, devices.c.purchase_id == purchase.purchase_id
+    ).where(purchase.purchase_date != None).subquery()
+    db.execute(delete(rollup))
+    result = db.execute(
+        insert(rollup).from_select(
+            ["vendor", "month", "purchase_count", "total_amount", "device_count"],
+            select(
+                dated.c.vendor,
+                dated.c.month,
+                func.count(dated.c.purchase_id),
+                func.coalesce(func.sum(dated.c.total_amount), 0),
+                func.coalesce(func.sum(dated.c.device_count), 0)
+            ).group_by(dated.c.vendor, dated.c.month)
+        )
+    )
+    db.commit()
+    invalidate_reports(get_purchase_spend_report)
+    return result.rowcount
+
+def ensure_purchase_spend_rollups(db: Session) -> bool:
+    """
+    Seeds the rollup table when it is empty but dated purchases already exist,
+    e.g. the first start after the table was introduced.
+
+    Returns:
+        True if the table was rebuilt
+    """
+    if db.query(models.PurchaseSpendRollup).first() is not None:
+        return False
+    if db.query(models.Purchase.purchase_id).filter(models.Purchase.purchase_date != None).first() is None:
+        return False
+    rebuild_purchase_spend_rollups(db)
+    return True
@@ -0,0 +1,89 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import Date, DateTime, Integer
+
+# Date arithmetic that compiles per dialect
+class days_between(FunctionElement):
+    """Whole days from the start date to the end date: days_between(end, start)."""
+    type = Integer()
+    name = "days_between"
+    inherit_cache = True
+
+@compiles(days_between)
+def _days_between(element, compiler, **kw):
+    # PostgreSQL subtracts dates as a number of days
+    end, start = element.clauses
+    return f"({compiler.process(end, **kw)} - {compiler.process(start, **kw)})"
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    # SQLite stores dates as ISO text
+    end, start = element.clauses
+    return f"CAST(julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}) AS INTEGER)"
+
+class add_days(FunctionElement):
+    """A date moved by a whole number of days: add_days(day, days)."""
+    type = Date()
+    name = "add_days"
+    inherit_cache = True
+
+@compiles(add_days)
+def _add_days(element, compiler, **kw):
+    day, days = element.clauses
+    return f"({compiler.process(day, **kw)} + {compiler.process(days, **kw)})"
+
+@compiles(add_days, "sqlite")
+def _add_days_sqlite(element, compiler, **kw):
+    day, days = element.clauses
+    return f"date({compiler.process(day, **kw)}, ({compiler.process(days, **kw)}) || ' days')"
+
+class add_months(FunctionElement):
+    """A date moved by a whole number of months: add_months(day, months). Only used on
+    first-of-month dates here, where the dialects agree about month ends."""
+    type = Date()
+    name = "add_months"
+    inherit_cache = True
+
+@compiles(add_months)
+def _add_months(element, compiler, **kw):
+    day, months = element.clauses
+    return f"CAST({compiler.process(day, **kw)} + ({compiler.process(months, **kw)}) * interval '1 month' AS DATE)"
+
+@compiles(add_months, "sqlite")
+def _add_months_sqlite(element, compiler, **kw):
+    day, months = element.clauses
+    return f"date({compiler.process(day, **kw)}, ({compiler.process(months, **kw)}) || ' months')"
+
+class month_start(FunctionElement):
+    """The first day of a date's month: month_start(day)."""
+    type = Date()
+    name = "month_start"
+    inherit_cache = True
+
+@compiles(month_start)
+def _month_start(element, compiler, **kw):
+    (day,) = element.clauses
+    return f"CAST(date_trunc('month', {compiler.process(day, **kw)}) AS DATE)"
+
+@compiles(month_start, "sqlite")
+def _month_start_sqlite(element, compiler, **kw):
+    (day,) = element.clauses
+    return f"date({compiler.process(day, **kw)}, 'start of month')"
+
+class seconds_ago(FunctionElement):
+    """The database's current local time less a number of seconds: seconds_ago(seconds).
+    Comparable with the DateTime columns that default to func.now()."""
+    type = DateTime()
+    name = "seconds_ago"
+    inherit_cache = True
+
+@compiles(seconds_ago)
+def _seconds_ago(element, compiler, **kw):
+    (seconds,) = element.clauses
+    return f"(LOCALTIMESTAMP - ({compiler.process(seconds, **kw)}) * interval '1 second')"
+
+@compiles(seconds_ago, "sqlite")
+def _seconds_ago_sqlite(element, compiler, **kw):
+    # Same text format as CURRENT_TIMESTAMP
+    (seconds,) = element.clauses
+    return f"datetime('now', '-' || ({compiler.process(seconds, **kw)}) || ' seconds')"
@@ -1,28 +1,80 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import Optional
+from sqlalchemy.orm import Session, joinedload
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
 from app import models
 from app import schemas
+from app.core.events import publish_event
+from .pagination import encode_cursor, decode_cursor
+from .search import apply_search
+from .counters import device_status_key, track_device_status, adjust_device_status_counter, track_purchase_devices
+from .reports import invalidate_reports, DEVICE_REPORTS
+from .bulk import BULK_IMPORT_CHUNK_SIZE, Reference, UniqueKey, bulk_insert
+from .loading import fieldset_options, model_columns, schema_columns
+from .versioning import row_version
+
+# Rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 1000
 
 # Device CRUD operations
+def _publish_device_event(event_type: str, db_device: models.Device):
+    # Called once the write has committed, for the /events stream
+    publish_event(
+        event_type,
+        device_id=db_device.device_id,
+        device_type_id=db_device.device_type_id,
+        is_checked_out=db_device.is_checked_out,
+        is_retired=db_device.is_retired
+    )
+
 def get_device(db: Session, device_id: int):
     return db.query(models.Device).filter(models.Device.device_id == device_id).first()
 
+def get_device_detail(db: Session, device_id: int, fields: Optional[List[str]] = None):
+    # Loads everything DeviceDetail needs, or only the given fields, in a single joined query
+    relationships = {
+        "device_type": joinedload(models.Device.device_type).load_only(
+            *schema_columns(models.DeviceType, schemas.DeviceTypeBrief)
+        ),
+        "purchase": joinedload(models.Device.purchase).load_only(
+            *schema_columns(models.Purchase, schemas.PurchaseBrief)
+        ),
+        "active_assignment": joinedload(models.Device.active_assignment).load_only(
+            *schema_columns(models.DeviceAssignment, schemas.AssignmentBrief)
+        )
+    }
+    return db.query(models.Device).options(
+        *fieldset_options(models.Device, relationships, fields)
+    ).filter(models.Device.device_id == device_id).first()
+
+def get_device_detail_version(db: Session, device_id: int):
+    # Modification times of everything DeviceDetail shows, without loading any of it
+    return row_version(db.query(
+        models.Device.last_modified_date,
+        models.DeviceType.last_modified_date,
+        models.Purchase.last_modified_date,
+        models.DeviceAssignment.assignment_id,
+        models.DeviceAssignment.last_modified_date
+    ).join(models.Device.device_type).outerjoin(models.Device.purchase).outerjoin(
+        models.Device.active_assignment
+    ).filter(models.Device.device_id == device_id).first())
+
 def get_device_by_serial(db: Session, serial_number: str):
     return db.query(models.Device).filter(models.Device.serial_number == serial_number).first()
 
-def get_devices(
-    db: Session, 
-    skip: int = 0, 
-    limit: int = 100,
+def filter_devices(
+    db: Session,
+    query,
     device_type_id: Optional[int] = None,
     is_checked_out: Optional[bool] = None,
     is_retired: Optional[bool] = None,
     search: Optional[str] = None
 ):
-    query = db.query(models.Device)
-    
-    # Apply filters
+    """
+    Applies the device listing filters to a query over devices.
+
+    Returns:
+        Tuple of the filtered query and the search relevance expression, if any
+    """
     if device_type_id is not None:
         query = query.filter(models.Device.device_type_id == device_type_id)
     
@@ -32,17 +84,74 @@ def get_devices(
     if is_retired is not None:
         query = query.filter(models.Device.is_retired == is_retired)
     
+    relevance = None
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.Device.serial_number.ilike(search_term),
-                models.Device.device_name.ilike(search_term),
-                models.Device.model.ilike(search_term)
-            )
-        )
+        query, relevance = apply_search(db, query, models.Device, search)
     
-    return query.order_by(models.Device.device_id).offset(skip).limit(limit).all()
+    return query, relevance
+
+def get_devices(
+    db: Session, 
+    skip: int = 0, 
+    limit: int = 100,
+    device_type_id: Optional[int] = None,
+    is_checked_out: Optional[bool] = None,
+    is_retired: Optional[bool] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
+):
+    # With fields, returns plain rows of just those columns instead of Device objects
+    query, relevance = filter_devices(
+        db,
+        db.query(*model_columns(models.Device, fields)) if fields else db.query(models.Device),
+        device_type_id=device_type_id,
+        is_checked_out=is_checked_out,
+        is_retired=is_retired,
+        search=search
+    )
+    
+    # Search results are ranked by relevance unless the caller is paging by cursor
+    if relevance is not None and not cursor:
+        query = query.order_by(relevance.desc())
+    query = query.order_by(models.Device.device_id)
+    
+    # Keyset pagination replaces the offset when a cursor is given
+    if cursor:
+        (last_device_id,) = decode_cursor(cursor, int)
+        query = query.filter(models.Device.device_id > last_device_id)
+    else:
+        query = query.offset(skip)
+    
+    return query.limit(limit).all()
+
+# The fields a listing page's version is made of (app.utils.conditional.page_version)
+DEVICE_VERSION_FIELDS = ("device_id", "last_modified_date")
+
+# The fields the cursor is made of, which a narrowed listing must still select
+DEVICE_CURSOR_FIELDS = ("device_id",)
+
+def get_device_cursor(db_device: models.Device) -> str:
+    return encode_cursor(db_device.device_id)
+
+def iter_devices(
+    db: Session,
+    device_type_id: Optional[int] = None,
+    is_checked_out: Optional[bool] = None,
+    is_retired: Optional[bool] = None,
+    search: Optional[str] = None
+):
+    # Streams plain rows with the columns of the Device schema, without building ORM objects
+    columns = schema_columns(models.Device, schemas.Device)
+    query, _ = filter_devices(
+        db,
+        db.query(*columns),
+        device_type_id=device_type_id,
+        is_checked_out=is_checked_out,
+        is_retired=is_retired,
+        search=search
+    )
+    return query.order_by(models.Device.device_id).yield_per(EXPORT_BATCH_SIZE)
 
 def create_device(db: Session, device: schemas.DeviceCreate):
     db_device = models.Device(
@@ -61,12 +170,18 @@ def create_device(db: Session, device: schemas.DeviceCreate):
         is_retired=device.is_retired
     )
     db.add(db_device)
+    track_device_status(db, None, device_status_key(db_device))
+    track_purchase_devices(db, {db_device.purchase_id: 1})
     db.commit()
+    invalidate_reports(*DEVICE_REPORTS)
     db.refresh(db_device)
+    _publish_device_event("device.created", db_device)
     return db_device
 
 def update_device(db: Session, device_id: int, device: schemas.DeviceUpdate):
     db_device = get_device(db, device_id)
+    status_before = device_status_key(db_device)
+    purchase_before = db_device.purchase_id
     
     if device.device_type_id is not None:
         db_device.device_type_id = device.device_type_id
@@ -93,13 +208,63 @@ def update_device(db: Session, device_id: int, device: schemas.DeviceUpdate):
     if device.is_retired is not None:
         db_device.is_retired = device.is_retired
     
+    track_device_status(db, status_before, device_status_key(db_device))
+    if db_device.purchase_id != purchase_before:
+        track_purchase_devices(db, {purchase_before: -1, db_device.purchase_id: 1})
     db.commit()
+    invalidate_reports(*DEVICE_REPORTS)
     db.refresh(db_device)
+    retired = db_device.is_retired and not status_before[2]
+    _publish_device_event("device.retired" if retired else "device.updated", db_device)
     return db_device
 
 def retire_device(db: Session, device_id: int):
     db_device = get_device(db, device_id)
+    status_before = device_status_key(db_device)
     db_device.is_retired = True
+    track_device_status(db, status_before, device_status_key(db_device))
     db.commit()
+    invalidate_reports(*DEVICE_REPORTS)
     db.refresh(db_device)
-    return db_device
\ No newline at end of file
+    _publish_device_event("device.retired", db_device)
+    return db_device
+
+# Bulk import
+def _track_imported_devices(db: Session, devices: List[schemas.DeviceCreate]):
+    statuses = Counter((device.device_type_id, device.is_checked_out, device.is_retired) for device in devices)
+    for key, count in statuses.items():
+        adjust_device_status_counter(db, key, count)
+    track_purchase_devices(db, Counter(device.purchase_id for device in devices))
+
+def bulk_create_devices(
+    db: Session,
+    rows: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+    chunk_size: int = BULK_IMPORT_CHUNK_SIZE
+):
+    """
+    Creates devices from a stream of parsed upload rows, as described in bulk.py.
+    Serial numbers must be new; device types and purchases must exist.
+
+    Args:
+        db: Database session
+        rows: (row_number, data, error) tuples as produced by app.utils.bulk_import
+        chunk_size: Number of rows validated and inserted per transaction
+
+    Returns:
+        Dict with the number of devices created and a per-row error report
+    """
+    result = bulk_insert(
+        db, rows, models.Device, schemas.DeviceCreate, "device", "serial_number",
+        unique=[UniqueKey("serial_number", models.Device.serial_number, "Serial number already registered")],
+        references=[
+            Reference("device_type_id", models.DeviceType.device_type_id, "Device type not found"),
+            Reference("purchase_id", models.Purchase.purchase_id, "Purchase not found"),
+        ],
+        track=_track_imported_devices,
+        chunk_size=chunk_size
+    )
+    if result["created"]:
+        invalidate_reports(*DEVICE_REPORTS)
+        # One event for the whole import; subscribers refetch rather than take thousands
+        publish_event("devices.imported", created=result["created"])
+    return result
@@ -1,16 +1,32 @@
 from sqlalchemy.orm import Session
+from typing import List, Optional
 from app import models
 from app import schemas
+from .loading import fieldset_options, model_columns
+from .reports import invalidate_reports, DEVICE_TYPE_REPORTS
+from .versioning import row_version
 
 # Device Type CRUD operations
-def get_device_type(db: Session, device_type_id: int):
-    return db.query(models.DeviceType).filter(models.DeviceType.device_type_id == device_type_id).first()
+def get_device_type(db: Session, device_type_id: int, fields: Optional[List[str]] = None):
+    return db.query(models.DeviceType).options(
+        *fieldset_options(models.DeviceType, {}, fields)
+    ).filter(models.DeviceType.device_type_id == device_type_id).first()
+
+def get_device_type_version(db: Session, device_type_id: int):
+    return row_version(db.query(models.DeviceType.last_modified_date).filter(
+        models.DeviceType.device_type_id == device_type_id
+    ).first())
 
 def get_device_type_by_name(db: Session, name: str):
     return db.query(models.DeviceType).filter(models.DeviceType.type_name == name).first()
 
-def get_device_types(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.DeviceType).offset(skip).limit(limit).all()
+def get_device_types(db: Session, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = None):
+    # With fields, returns plain rows of just those columns instead of DeviceType objects
+    query = db.query(*model_columns(models.DeviceType, fields)) if fields else db.query(models.DeviceType)
+    return query.order_by(models.DeviceType.device_type_id).offset(skip).limit(limit).all()
+
+# The fields a listing page's version is made of (app.utils.conditional.page_version)
+DEVICE_TYPE_VERSION_FIELDS = ("device_type_id", "last_modified_date")
 
 def create_device_type(db: Session, device_type: schemas.DeviceTypeCreate):
     db_device_type = models.DeviceType(
@@ -33,5 +49,6 @@ def update_device_type(db: Session, device_type_id: int, device_type: schemas.De
         db_device_type.refresh_cycle_months = device_type.refresh_cycle_months
     
     db.commit()
+    invalidate_reports(*DEVICE_TYPE_REPORTS)
     db.refresh(db_device_type)
     return db_device_type
\ No newline at end of file
@@ -0,0 +1,112 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Date, extract, func, literal, literal_column
+from datetime import date
+from typing import Optional
+from app import models
+from .dates import add_months
+
+# Refresh-cycle forecast
+#
+# A device is due for replacement refresh_cycle_months (from its type) after the month
+# it was purchased. One aggregate query counts the in-service devices of each type by
+# purchase month, and only those due before the end of the horizon are read: the due
+# date test is turned around into a purchase date bound per type,
+#
+#   purchase_date < horizon end - refresh_cycle_months
+#
+# which is a range scan of ix_devices_refresh_due (device_type_id, purchase_date) for
+# each type. The due date itself cannot be indexed, as it spans devices and device_types.
+# Devices without a purchase date, or of a type without a refresh cycle, are never due.
+
+# Longest horizon a forecast may cover, in months
+MAX_FORECAST_MONTHS = 120
+
+def _month_index(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+def _month_start(index: int) -> date:
+    return date(index // 12, index % 12 + 1, 1)
+
+def get_refresh_forecast(
+    db: Session,
+    start: date,
+    months: int = 12,
+    device_type_id: Optional[int] = None,
+    include_overdue: bool = True
+) -> dict:
+    """
+    Counts the in-service devices due for replacement in each month of a horizon, per type.
+
+    Args:
+        db: Database session
+        start: Any day of the first month of the horizon
+        months: Months in the horizon
+        device_type_id: Only devices of this type
+        include_overdue: Also count devices that were due before the horizon starts
+    """
+    first = _month_index(start)
+    refresh_cycle = models.DeviceType.refresh_cycle_months
+    criteria = [
+        # Spelled like the index predicate: SQLite only uses a partial index whose WHERE
+        # matches the query's, and it would render == False as = 0
+        models.Device.is_retired == literal_column("false"),
+        models.Device.purchase_date < add_months(literal(_month_start(first + months), Date), -refresh_cycle),
+    ]
+    if not include_overdue:
+        criteria.append(models.Device.purchase_date >= add_months(literal(_month_start(first), Date), -refresh_cycle))
+    if device_type_id is not None:
+        criteria.append(models.Device.device_type_id == device_type_id)
+
+    purchase_year = extract("year", models.Device.purchase_date)
+    purchase_month = extract("month", models.Device.purchase_date)
+    result = db.query(
+        models.DeviceType.device_type_id,
+        models.DeviceType.type_name,
+        refresh_cycle,
+        purchase_year,
+        purchase_month,
+        func.count()
+    ).join(
+        models.Device, models.Device.device_type_id == models.DeviceType.device_type_id
+    ).filter(*criteria).group_by(
+        models.DeviceType.device_type_id,
+        models.DeviceType.type_name,
+        refresh_cycle,
+        purchase_year,
+        purchase_month
+    ).all()
+
+    series = {}
+    totals = [0] * months
+    overdue = 0
+    for type_id, type_name, cycle, year, month, count in result:
+        entry = series.setdefault(type_id, {
+            "device_type_id": type_id,
+            "type_name": type_name,
+            "refresh_cycle_months": cycle,
+            "overdue": 0,
+            "counts": [0] * months,
+        })
+        due = int(year) * 12 + int(month) - 1 + cycle
+        if due < first:
+            entry["overdue"] += count
+            overdue += count
+        else:
+            entry["counts"][due - first] += count
+            totals[due - first] += count
+
+    report = []
+    for entry in sorted(series.values(), key=lambda entry: entry["type_name"]):
+        counts = entry.pop("counts")
+        entry["due"] = sum(counts)
+        entry["points"] = [
+            {"month": _month_start(first + index), "count": count} for index, count in enumerate(counts)
+        ]
+        report.append(entry)
+    return {
+        "start": _month_start(first),
+        "months": months,
+        "overdue": overdue,
+        "totals": [{"month": _month_start(first + index), "count": count} for index, count in enumerate(totals)],
+        "series": report,
+    }
@@ -0,0 +1,110 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Date, case, func, literal, select
+from datetime import date
+from typing import Optional
+from app import models
+from .dates import days_between
+
+# Device usage history
+#
+# Usage stats come from one statement per call, however many devices it covers. A
+# window over each device's assignments, in checkout order, gives every loan its
+# length and the gap since the loan before it was returned; the outer query folds
+# those into one row per device. Devices that were never assigned get a row too, so
+# the bulk form shows hardware that has never left the shelf.
+
+def _usage_stats_query(db: Session, today: date, *device_criteria):
+    assignment = models.DeviceAssignment
+    today = literal(today, Date)
+    previous_return = func.lag(assignment.actual_return_date).over(
+        partition_by=assignment.device_id,
+        order_by=(assignment.checkout_date, assignment.assignment_id)
+    )
+    loans = select(
+        assignment.device_id,
+        assignment.user_id,
+        assignment.checkout_date,
+        assignment.actual_return_date,
+        days_between(func.coalesce(assignment.actual_return_date, today), assignment.checkout_date).label("days"),
+        days_between(assignment.checkout_date, previous_return).label("gap_days")
+    )
+    if device_criteria:
+        loans = loans.where(assignment.device_id.in_(select(models.Device.device_id).where(*device_criteria)))
+    loans = loans.subquery()
+
+    last_return = func.max(loans.c.actual_return_date)
+    return db.query(
+        models.Device.device_id,
+        models.Device.serial_number,
+        models.Device.device_type_id,
+        models.Device.is_checked_out,
+        models.Device.is_retired,
+        func.count(loans.c.device_id).label("loans"),
+        func.count(func.distinct(loans.c.user_id)).label("holders"),
+        func.coalesce(func.sum(loans.c.days), 0).label("days_checked_out"),
+        # Open loans have no length yet
+        func.avg(case((loans.c.actual_return_date != None, loans.c.days))).label("average_loan_days"),
+        func.coalesce(func.sum(loans.c.gap_days), 0).label("days_idle_between_loans"),
+        last_return.label("last_return_date"),
+        # Idle since the last return, or since purchase for devices never assigned
+        days_between(today, func.coalesce(last_return, models.Device.purchase_date)).label("days_since_return"),
+        days_between(today, func.coalesce(models.Device.purchase_date, func.min(loans.c.checkout_date))).label(
+            "days_in_service"
+        )
+    ).outerjoin(
+        loans, loans.c.device_id == models.Device.device_id
+    ).filter(*device_criteria).group_by(models.Device.device_id)
+
+def _usage_stats(row) -> dict:
+    stats = row._asdict()
+    days_since_return = stats.pop("days_since_return")
+    days_in_service = stats.pop("days_in_service")
+    # A device out on loan is not idle
+    stats["days_idle"] = 0 if row.is_checked_out else days_since_return
+    if stats["average_loan_days"] is not None:
+        stats["average_loan_days"] = round(float(stats["average_loan_days"]), 1)
+    stats["utilization"] = (
+        round(min(row.days_checked_out / days_in_service, 1.0), 3) if days_in_service else None
+    )
+    return stats
+
+def get_device_usage_stats(db: Session, device_id: int, today: Optional[date] = None) -> Optional[dict]:
+    """
+    Returns the usage stats of one device, or None if it does not exist.
+
+    Args:
+        db: Database session
+        device_id: Device to summarize
+        today: Date open loans and idle time run to; defaults to today
+    """
+    row = _usage_stats_query(db, today or date.today(), models.Device.device_id == device_id).first()
+    return _usage_stats(row) if row is not None else None
+
+def get_devices_usage_stats(
+    db: Session,
+    device_type_id: Optional[int] = None,
+    is_retired: Optional[bool] = None,
+    skip: int = 0,
+    limit: int = 100,
+    today: Optional[date] = None
+) -> list:
+    """
+    Returns the usage stats of many devices, least used first.
+
+    Args:
+        db: Database session
+        device_type_id: Only devices of this type
+        is_retired: Only retired or only in-service devices
+        skip: Devices to skip
+        limit: Maximum number of devices to return
+        today: Date open loans and idle time run to; defaults to today
+    """
+    criteria = []
+    if device_type_id is not None:
+        criteria.append(models.Device.device_type_id == device_type_id)
+    if is_retired is not None:
+        criteria.append(models.Device.is_retired == is_retired)
+    query = _usage_stats_query(db, today or date.today(), *criteria).order_by(
+        "days_checked_out", models.Device.device_id
+    )
+    return [_usage_stats(row) for row in query.offset(skip).limit(limit).all()]
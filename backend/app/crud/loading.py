@@ -0,0 +1,49 @@
+from sqlalchemy.orm import load_only
+
+# Helpers for loading exactly the columns a response schema needs
+def model_columns(model, names) -> list:
+    """
+    Returns the model columns with the given attribute names.
+
+    Args:
+        model: SQLAlchemy model class
+        names: Attribute names, e.g. response schema field names
+
+    Returns:
+        List of instrumented column attributes, in the given order
+    """
+    return [getattr(model, name) for name in names]
+
+def schema_columns(model, schema) -> list:
+    """
+    Returns the model columns backing a response schema's fields.
+
+    Args:
+        model: SQLAlchemy model class
+        schema: Pydantic schema whose field names are model attributes
+
+    Returns:
+        List of instrumented column attributes, in schema field order
+    """
+    return model_columns(model, schema.model_fields)
+
+def fieldset_options(model, relationships: dict, fields=None) -> list:
+    """
+    Returns the loader options of a detail query, narrowed to a sparse fieldset.
+
+    Args:
+        model: SQLAlchemy model class being queried
+        relationships: Loader option of each relationship field, keyed by field name
+        fields: Response fields to load, or None for all of them
+
+    Returns:
+        The relationship loaders for the requested relationships, plus a load_only
+        of the requested columns (the primary key is always loaded)
+    """
+    if fields is None:
+        return list(relationships.values())
+    columns = [getattr(model, name) for name in fields if name not in relationships]
+    primary_key = [getattr(model, column.key) for column in model.__mapper__.primary_key]
+    return [load_only(*primary_key, *columns)] + [
+        relationships[name] for name in fields if name in relationships
+    ]
@@ -0,0 +1,48 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+# Keyset (cursor) pagination helpers
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def encode_cursor(*values) -> str:
+    """
+    Encodes the sort key values of the last row on a page as an opaque cursor.
+
+    Args:
+        values: Sort key values in ORDER BY order
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = [value.isoformat() if isinstance(value, date) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string from a previous page
+        types: Expected type of each sort key (int, str, date or datetime)
+
+    Returns:
+        Tuple of sort key values
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or has the wrong shape
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("unexpected cursor shape")
+        return tuple(
+            None if value is None else type_.fromisoformat(value) if type_ in (date, datetime) else type_(value)
+            for value, type_ in zip(payload, types)
+        )
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
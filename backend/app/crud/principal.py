@@ -0,0 +1,70 @@
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from app import models
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+
+class Principal(NamedTuple):
+    """The user fields authorization needs, cached in place of the User row."""
+    user_id: int
+    username: str
+    is_active: bool
+    is_admin: bool
+
+# Principal cache
+#
+# Authenticated tokens are cached per process, mapped to the Principal they resolved
+# to and the token's own expiry, so a request with a known token costs neither a JWT
+# decode nor a DB round trip. update_user evicts a user's entries after it commits a
+# change to their username, active flag or admin flag; other processes pick the change
+# up when the entry expires after PRINCIPAL_CACHE_TTL_SECONDS.
+#
+# A request may have loaded the principal before that commit and cache it after the
+# eviction. Eviction therefore also bumps the user's version in the cache, keyed by
+# username as that is all a request knows before the load, and cache_principal drops a
+# principal loaded before the bump.
+@lru_cache()
+def get_principal_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+def get_cached_principal(token: str) -> Optional[Principal]:
+    entry = get_principal_cache().get(token)
+    if entry is None:
+        return None
+    expires_at, principal = entry
+    # The token may expire before the cache entry does
+    if expires_at is not None and expires_at <= datetime.now(timezone.utc):
+        return None
+    return principal
+
+def get_principal_version(username: str) -> int:
+    # Read before loading the principal, and passed to cache_principal with it
+    return get_principal_cache().version(username)
+
+def cache_principal(
+    token: str, principal: Principal, expires_at: Optional[datetime] = None, version: Optional[int] = None
+):
+    get_principal_cache().set(token, (expires_at, principal), group=principal.username, version=version)
+
+def invalidate_principals(user_id: int, *usernames: str) -> int:
+    """
+    Evicts a user's cached principals.
+
+    Args:
+        user_id: User whose entries are dropped
+        usernames: The user's usernames before and after the change, whose versions are bumped
+    """
+    return get_principal_cache().invalidate_values(lambda entry: entry[1].user_id == user_id, groups=usernames)
+
+def get_principal_cache_stats():
+    return get_principal_cache().stats()
+
+def get_principal(db: Session, username: str) -> Optional[Principal]:
+    # Selects only the principal's columns
+    row = db.query(
+        models.User.user_id, models.User.username, models.User.is_active, models.User.is_admin
+    ).filter(models.User.username == username).first()
+    return Principal(*row) if row is not None else None
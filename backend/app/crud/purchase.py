@@ -1,16 +1,92 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, func, or_
+from typing import List, Optional
+from datetime import date
 from app import models
 from app import schemas
+from .pagination import encode_cursor, decode_cursor
+from .loading import fieldset_options, model_columns, schema_columns
+from .versioning import row_version
+from .counters import purchase_spend_key, track_purchase_spend
+from .reports import invalidate_reports, PURCHASE_REPORTS
 
 # Purchase CRUD operations
 def get_purchase(db: Session, purchase_id: int):
     return db.query(models.Purchase).filter(models.Purchase.purchase_id == purchase_id).first()
 
+def get_purchase_detail(db: Session, purchase_id: int, fields: Optional[List[str]] = None):
+    # Loads the purchase, then only the DeviceBrief columns of its devices in one IN query.
+    # With fields, the devices are only loaded if asked for.
+    relationships = {
+        "devices": selectinload(models.Purchase.devices).load_only(
+            *schema_columns(models.Device, schemas.DeviceBrief)
+        )
+    }
+    return db.query(models.Purchase).options(
+        *fieldset_options(models.Purchase, relationships, fields)
+    ).filter(models.Purchase.purchase_id == purchase_id).first()
+
+def get_purchase_detail_version(db: Session, purchase_id: int):
+    # The purchase's modification time plus the count and newest change of its devices
+    return row_version(db.query(
+        models.Purchase.last_modified_date,
+        func.count(models.Device.device_id),
+        func.max(models.Device.last_modified_date)
+    ).outerjoin(models.Purchase.devices).filter(
+        models.Purchase.purchase_id == purchase_id
+    ).group_by(models.Purchase.purchase_id, models.Purchase.last_modified_date).first())
+
 def get_purchase_by_po(db: Session, purchase_order: str):
     return db.query(models.Purchase).filter(models.Purchase.purchase_order == purchase_order).first()
 
-def get_purchases(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Purchase).order_by(models.Purchase.purchase_date.desc()).offset(skip).limit(limit).all()
+def get_purchases(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
+):
+    # With fields, returns plain rows of just those columns instead of Purchase objects
+    query = (db.query(*model_columns(models.Purchase, fields)) if fields else db.query(models.Purchase)).order_by(
+        models.Purchase.purchase_date.desc().nulls_last(),
+        models.Purchase.purchase_id.desc()
+    )
+    
+    # Keyset pagination replaces the offset when a cursor is given.
+    # Undated purchases sort last, so they need their own branch of the predicate.
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, date, int)
+        if last_date is None:
+            query = query.filter(
+                models.Purchase.purchase_date == None,
+                models.Purchase.purchase_id < last_id
+            )
+        else:
+            query = query.filter(
+                or_(
+                    models.Purchase.purchase_date < last_date,
+                    and_(models.Purchase.purchase_date == last_date, models.Purchase.purchase_id < last_id),
+                    models.Purchase.purchase_date == None
+                )
+            )
+    else:
+        query = query.offset(skip)
+    
+    return query.limit(limit).all()
+
+# The fields a listing page's version is made of (app.utils.conditional.page_version)
+PURCHASE_VERSION_FIELDS = ("purchase_id", "last_modified_date")
+
+# The fields the cursor is made of, which a narrowed listing must still select
+PURCHASE_CURSOR_FIELDS = ("purchase_date", "purchase_id")
+
+def get_purchase_cursor(db_purchase: models.Purchase) -> str:
+    return encode_cursor(db_purchase.purchase_date, db_purchase.purchase_id)
+
+def _spend_entry(db_purchase: models.Purchase):
+    # The purchase's rollup key and amount, or None if it is undated
+    key = purchase_spend_key(db_purchase.vendor, db_purchase.purchase_date)
+    return (key, db_purchase.total_amount or 0) if key is not None else None
 
 def create_purchase(db: Session, purchase: schemas.PurchaseCreate):
     db_purchase = models.Purchase(
@@ -21,12 +97,15 @@ def create_purchase(db: Session, purchase: schemas.PurchaseCreate):
         notes=purchase.notes
     )
     db.add(db_purchase)
+    track_purchase_spend(db, None, None, _spend_entry(db_purchase))
     db.commit()
+    invalidate_reports(*PURCHASE_REPORTS)
     db.refresh(db_purchase)
     return db_purchase
 
 def update_purchase(db: Session, purchase_id: int, purchase: schemas.PurchaseUpdate):
     db_purchase = get_purchase(db, purchase_id)
+    spend_before = _spend_entry(db_purchase)
     
     if purchase.purchase_order is not None:
         db_purchase.purchase_order = purchase.purchase_order
@@ -39,6 +118,8 @@ def update_purchase(db: Session, purchase_id: int, purchase: schemas.PurchaseUpd
     if purchase.notes is not None:
         db_purchase.notes = purchase.notes
     
+    track_purchase_spend(db, purchase_id, spend_before, _spend_entry(db_purchase))
     db.commit()
+    invalidate_reports(*PURCHASE_REPORTS)
     db.refresh(db_purchase)
     return db_purchase
\ No newline at end of file
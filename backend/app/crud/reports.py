@@ -1,38 +1,89 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from datetime import date, timedelta
+from functools import lru_cache, wraps
+from typing import Optional
+import inspect
 from app import models
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from .utilization import build_utilization_report, get_utilization_series_sweep
+from .forecast import get_refresh_forecast
+from .spend import get_purchase_spend
+
+# Report cache
+#
+# Report results are cached per process, keyed by report name and arguments. Entries
+# expire after REPORT_CACHE_TTL_SECONDS, and the CRUD writes that change a report's
+# inputs evict it through invalidate_reports() after they commit. That also bumps the
+# report's version in the cache, so a report computed from rows read before the commit
+# is not stored when it finishes after the eviction.
+@lru_cache()
+def get_report_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(maxsize=settings.REPORT_CACHE_MAX_ENTRIES, ttl=settings.REPORT_CACHE_TTL_SECONDS)
+
+def cached_report(report):
+    signature = inspect.signature(report)
+    
+    @wraps(report)
+    def wrapper(db: Session, *args, **kwargs):
+        bound = signature.bind(db, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple((name, value) for name, value in bound.arguments.items() if name != "db")
+        key = (report.__name__, arguments)
+        return get_report_cache().get_or_set(key, lambda: report(db, *args, **kwargs), group=report.__name__)
+    
+    return wrapper
+
+def invalidate_reports(*reports):
+    names = {report.__name__ for report in reports}
+    get_report_cache().invalidate(lambda key: key[0] in names, groups=names)
+
+def get_report_cache_stats():
+    return get_report_cache().stats()
 
 # Reports
+# The status reports read the device_status_counters summary rows (see counters.py)
+@cached_report
 def get_devices_by_type_report(db: Session):
+    device_count = func.sum(models.DeviceStatusCounter.device_count)
     result = db.query(
         models.DeviceType.type_name,
-        func.count(models.Device.device_id).label('count')
+        device_count.label('count')
     ).join(
-        models.Device
+        models.DeviceStatusCounter,
+        models.DeviceStatusCounter.device_type_id == models.DeviceType.device_type_id
     ).filter(
-        models.Device.is_retired == False
+        models.DeviceStatusCounter.is_retired == False
     ).group_by(
         models.DeviceType.type_name
+    ).having(
+        device_count > 0
     ).all()
     
     return [{"type": item[0], "count": item[1]} for item in result]
 
+@cached_report
 def get_device_status_report(db: Session):
-    # Get counts by status
-    available_count = db.query(func.count(models.Device.device_id)).filter(
-        models.Device.is_checked_out == False,
-        models.Device.is_retired == False
-    ).scalar()
-    
-    checked_out_count = db.query(func.count(models.Device.device_id)).filter(
-        models.Device.is_checked_out == True,
-        models.Device.is_retired == False
-    ).scalar()
+    # Get counts by status in one pass over the counter rows
+    result = db.query(
+        models.DeviceStatusCounter.is_checked_out,
+        models.DeviceStatusCounter.is_retired,
+        func.sum(models.DeviceStatusCounter.device_count)
+    ).group_by(
+        models.DeviceStatusCounter.is_checked_out,
+        models.DeviceStatusCounter.is_retired
+    ).all()
     
-    retired_count = db.query(func.count(models.Device.device_id)).filter(
-        models.Device.is_retired == True
-    ).scalar()
+    available_count = checked_out_count = retired_count = 0
+    for is_checked_out, is_retired, count in result:
+        if is_retired:
+            retired_count += count
+        elif is_checked_out:
+            checked_out_count += count
+        else:
+            available_count += count
     
     return [
         {"status": "Available", "count": available_count},
@@ -40,6 +91,7 @@ def get_device_status_report(db: Session):
         {"status": "Retired", "count": retired_count}
     ]
 
+@cached_report
 def get_user_assignments_report(db: Session, limit: int = 10):
     result = db.query(
         models.User.user_id,
@@ -47,7 +99,8 @@ def get_user_assignments_report(db: Session, limit: int = 10):
         models.User.last_name,
         func.count(models.DeviceAssignment.assignment_id).label('count')
     ).join(
-        models.DeviceAssignment
+        models.DeviceAssignment,
+        models.DeviceAssignment.user_id == models.User.user_id
     ).filter(
         models.DeviceAssignment.actual_return_date == None
     ).group_by(
@@ -66,6 +119,7 @@ def get_user_assignments_report(db: Session, limit: int = 10):
         } for item in result
     ]
 
+@cached_report
 def get_expiring_warranties_report(db: Session, days: int = 90):
     today = date.today()
     expiry_date = today + timedelta(days=days)
@@ -87,4 +141,50 @@ def get_expiring_warranties_report(db: Session, days: int = 90):
             "model": device.model,
             "warranty_expiration": device.warranty_expiration
         } for device in result
-    ]
\ No newline at end of file
+    ]
+
+@cached_report
+def get_utilization_report(
+    db: Session,
+    start: date,
+    end: date,
+    interval: str = "day",
+    device_type_id: Optional[int] = None
+):
+    # Daily counts from the event sweep (see utilization.py), bucketed by interval
+    series = get_utilization_series_sweep(db, start, end, device_type_id=device_type_id)
+    return build_utilization_report(db, series, start, end, interval=interval, device_type_id=device_type_id)
+
+@cached_report
+def get_refresh_forecast_report(
+    db: Session,
+    start: date,
+    months: int = 12,
+    device_type_id: Optional[int] = None,
+    include_overdue: bool = True
+):
+    # Devices due for replacement per month, from one aggregate query (see forecast.py)
+    return get_refresh_forecast(
+        db, start, months=months, device_type_id=device_type_id, include_overdue=include_overdue
+    )
+
+@cached_report
+def get_purchase_spend_report(
+    db: Session,
+    by: str = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    vendor: Optional[str] = None
+):
+    # Spend from the purchase_spend_rollups rows (see spend.py)
+    return get_purchase_spend(db, by=by, start=start, end=end, vendor=vendor)
+
+# Reports affected by each kind of write, for invalidate_reports()
+DEVICE_REPORTS = (
+    get_devices_by_type_report, get_device_status_report, get_expiring_warranties_report, get_utilization_report,
+    get_refresh_forecast_report, get_purchase_spend_report
+)
+ASSIGNMENT_REPORTS = (get_device_status_report, get_user_assignments_report, get_utilization_report)
+USER_REPORTS = (get_user_assignments_report,)
+PURCHASE_REPORTS = (get_purchase_spend_report,)
+DEVICE_TYPE_REPORTS = (get_devices_by_type_report, get_utilization_report, get_refresh_forecast_report)
\ No newline at end of file
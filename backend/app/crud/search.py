@@ -0,0 +1,159 @@
+from sqlalchemy import case, event, func, literal_column, or_, table, column
+from sqlalchemy.orm import Query, Session
+from app.database import Base
+
+# Indexed text search behind the `search` parameter of the device and user listings.
+#
+# PostgreSQL: a trigram GIN index serves substring matches and a tsvector GIN index
+# serves multi-word matches, both over one lower-cased document expression per table.
+# SQLite: an external-content FTS5 table with the trigram tokenizer, kept in sync by
+# triggers, gives the same substring semantics for development and tests.
+# Terms too short for trigrams fall back to a scan that matches the same rows. Every
+# path ranks its matches, so search results always come best first: PostgreSQL by
+# text rank plus trigram similarity, FTS5 by bm25, the fallback by the number of
+# columns that contain the term.
+
+SEARCH_COLUMNS = {
+    "devices": ("device_id", ("serial_number", "device_name", "model")),
+    "users": ("user_id", ("first_name", "last_name", "username", "email")),
+}
+
+# FTS5 trigrams cannot match terms shorter than this
+MIN_FTS_TERM_LENGTH = 3
+
+# Inlined rather than bound so the planner can match the tsvector expression index
+TS_CONFIG = "'simple'::regconfig"
+
+def search_document(table_name: str, qualified: bool = True) -> str:
+    """
+    Returns the SQL expression indexed for a table's search document.
+
+    The same expression is used in the index definitions and the queries so that
+    PostgreSQL can match the expression indexes.
+    """
+    _, columns = SEARCH_COLUMNS[table_name]
+    prefix = f"{table_name}." if qualified else ""
+    parts = " || ' ' || ".join(f"coalesce({prefix}{name}, '')" for name in columns)
+    return f"lower({parts})"
+
+def postgresql_search_ddl(table_name: str) -> list:
+    document = search_document(table_name, qualified=False)
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search_trgm ON {table_name} "
+        f"USING gin (({document}) gin_trgm_ops)",
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search_tsv ON {table_name} "
+        f"USING gin (to_tsvector({TS_CONFIG}, {document}))",
+    ]
+
+def postgresql_search_drop_ddl(table_name: str) -> list:
+    return [
+        f"DROP INDEX IF EXISTS ix_{table_name}_search_trgm",
+        f"DROP INDEX IF EXISTS ix_{table_name}_search_tsv",
+    ]
+
+def sqlite_search_ddl(table_name: str) -> list:
+    key, columns = SEARCH_COLUMNS[table_name]
+    fts = f"{table_name}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    insert_new = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.{key}, {new_values});"
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.{key}, {old_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table_name}', content_rowid='{key}', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table_name} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+def sqlite_search_drop_ddl(table_name: str) -> list:
+    fts = f"{table_name}_fts"
+    # The triggers first: they write to the FTS table on every change of the table
+    return [
+        *(f"DROP TRIGGER IF EXISTS {fts}_{suffix}" for suffix in ("ai", "ad", "au")),
+        f"DROP TABLE IF EXISTS {fts}",
+    ]
+
+def install_search_indexes(connection):
+    """Creates the search indexes for the connection's dialect. Safe to run repeatedly."""
+    dialect = connection.dialect.name
+    for table_name in SEARCH_COLUMNS:
+        if dialect == "postgresql":
+            for statement in postgresql_search_ddl(table_name):
+                connection.exec_driver_sql(statement)
+        elif dialect == "sqlite":
+            fts = f"{table_name}_fts"
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+            ).first()
+            for statement in sqlite_search_ddl(table_name):
+                connection.exec_driver_sql(statement)
+            # Index rows that predate the FTS table
+            if not exists:
+                connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_indexes(target, connection, **kw):
+    """Creates the dialect-specific search indexes after `create_all`."""
+    install_search_indexes(connection)
+
+@event.listens_for(Base.metadata, "after_drop")
+def drop_search_indexes(target, connection, **kw):
+    """Drops the SQLite FTS tables after `drop_all`; PostgreSQL indexes go with their tables."""
+    if connection.dialect.name == "sqlite":
+        for table_name in SEARCH_COLUMNS:
+            for statement in sqlite_search_drop_ddl(table_name):
+                connection.exec_driver_sql(statement)
+
+def _like_pattern(search: str) -> str:
+    escaped = search.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def apply_search(db: Session, query: Query, model, search: str):
+    """
+    Filters a query on a model's search document.
+
+    Args:
+        db: Database session
+        query: Query over the model
+        model: models.Device or models.User
+        search: Search term as entered by the user
+
+    Returns:
+        Tuple of the filtered query and a relevance expression to order by
+        (higher is better)
+    """
+    table_name = model.__tablename__
+    key, columns = SEARCH_COLUMNS[table_name]
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        document = literal_column(search_document(table_name))
+        ts_config = literal_column(TS_CONFIG)
+        ts_document = func.to_tsvector(ts_config, document)
+        ts_query = func.plainto_tsquery(ts_config, search)
+        query = query.filter(
+            or_(
+                document.like(_like_pattern(search), escape="\\"),
+                ts_document.op("@@")(ts_query)
+            )
+        )
+        return query, func.ts_rank(ts_document, ts_query) + func.similarity(document, search.lower())
+
+    if dialect == "sqlite" and len(search) >= MIN_FTS_TERM_LENGTH:
+        fts = table(f"{table_name}_fts", column("rowid"), column("rank"), column(f"{table_name}_fts"))
+        phrase = '"' + search.replace('"', '""') + '"'
+        query = query.join(fts, fts.c.rowid == getattr(model, key)).filter(
+            fts.c[f"{table_name}_fts"].op("MATCH")(phrase)
+        )
+        # FTS5 rank is bm25, where lower is better
+        return query, -fts.c.rank
+
+    # Short terms and other backends fall back to an unindexed scan
+    pattern = _like_pattern(search)
+    matches = [func.lower(getattr(model, name)).like(pattern, escape="\\") for name in columns]
+    relevance = sum(case((match, 1), else_=0) for match in matches)
+    return query.filter(or_(*matches)), relevance
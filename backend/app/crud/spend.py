@@ -0,0 +1,75 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import extract, func
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+from app import models
+
+# Purchase spend
+#
+# Spend by vendor, month or year, read from the purchase_spend_rollups rows (see
+# counters.py) rather than the purchases table. Cost per device divides a group's total
+# amount by the devices bought with its purchases, so purchases without devices, such
+# as services, raise it.
+
+SPEND_GROUPINGS = ("vendor", "month", "year")
+
+CENTS = Decimal("0.01")
+
+def _spend(purchases: int, amount: Decimal, devices: int) -> dict:
+    return {
+        "purchases": purchases,
+        "total_amount": amount,
+        "devices": devices,
+        "cost_per_device": (amount / devices).quantize(CENTS) if devices else None,
+    }
+
+def get_purchase_spend(
+    db: Session,
+    by: str = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    vendor: Optional[str] = None
+) -> dict:
+    """
+    Totals purchase spend by vendor, month or year, with a grand total.
+
+    Args:
+        db: Database session
+        by: Grouping, one of SPEND_GROUPINGS
+        start: Only purchases from this date's month on
+        end: Only purchases up to this date's month
+        vendor: Only purchases from this vendor
+    """
+    rollup = models.PurchaseSpendRollup
+    group = {
+        "vendor": rollup.vendor,
+        "month": rollup.month,
+        "year": extract("year", rollup.month),
+    }[by]
+    purchases = func.sum(rollup.purchase_count)
+    query = db.query(
+        group, purchases, func.sum(rollup.total_amount), func.sum(rollup.device_count)
+    ).group_by(group).having(purchases > 0).order_by(group)
+    if start is not None:
+        query = query.filter(rollup.month >= start.replace(day=1))
+    if end is not None:
+        query = query.filter(rollup.month <= end)
+    if vendor is not None:
+        query = query.filter(rollup.vendor == vendor)
+
+    rows = []
+    total_purchases = total_devices = 0
+    total_amount = Decimal("0.00")
+    for key, purchase_count, amount, device_count in query.all():
+        # SQLite sums the amounts without their scale
+        amount = Decimal(amount or 0).quantize(CENTS)
+        if by == "vendor":
+            key = key or None
+        elif by == "year":
+            key = int(key)
+        rows.append({by: key, **_spend(purchase_count, amount, device_count)})
+        total_purchases += purchase_count
+        total_amount += amount
+        total_devices += device_count
+    return {"by": by, "rows": rows, "total": _spend(total_purchases, total_amount, total_devices)}
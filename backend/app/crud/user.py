@@ -1,57 +1,117 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import Optional
-from passlib.context import CryptContext
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, tuple_
+from typing import Iterable, List, Optional, Tuple
 from app import models
 from app import schemas
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Helper functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+from app.core.security import get_password_hash, get_password_hashes
+from .pagination import encode_cursor, decode_cursor
+from .search import apply_search
+from .reports import invalidate_reports, USER_REPORTS
+from .principal import invalidate_principals
+from .device import EXPORT_BATCH_SIZE
+from .bulk import BULK_IMPORT_CHUNK_SIZE, UniqueKey, bulk_insert
+from .loading import fieldset_options, model_columns, schema_columns
+from .versioning import row_version
 
 # User CRUD operations
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.user_id == user_id).first()
 
+def get_user_detail(db: Session, user_id: int, fields: Optional[List[str]] = None):
+    # Loads the user, then its open assignments in one IN query.
+    # With fields, the assignments are only loaded if asked for.
+    relationships = {
+        "active_assignments": selectinload(models.User.active_assignments).load_only(
+            *schema_columns(models.DeviceAssignment, schemas.AssignmentBrief)
+        )
+    }
+    return db.query(models.User).options(
+        *fieldset_options(models.User, relationships, fields)
+    ).filter(models.User.user_id == user_id).first()
+
+def get_user_detail_version(db: Session, user_id: int):
+    # The user's modification time plus the count and newest change of its open assignments
+    return row_version(db.query(
+        models.User.last_modified_date,
+        func.count(models.DeviceAssignment.assignment_id),
+        func.max(models.DeviceAssignment.last_modified_date)
+    ).outerjoin(models.User.active_assignments).filter(
+        models.User.user_id == user_id
+    ).group_by(models.User.user_id, models.User.last_modified_date).first())
+
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
+def filter_users(db: Session, query, is_active: Optional[bool] = None, search: Optional[str] = None):
+    """
+    Applies the user listing filters to a query over users.
+
+    Returns:
+        Tuple of the filtered query and the search relevance expression, if any
+    """
+    if is_active is not None:
+        query = query.filter(models.User.is_active == is_active)
+    
+    relevance = None
+    if search:
+        query, relevance = apply_search(db, query, models.User, search)
+    
+    return query, relevance
+
 def get_users(
     db: Session, 
     skip: int = 0, 
     limit: int = 100, 
     is_active: Optional[bool] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
 ):
-    query = db.query(models.User)
+    # With fields, returns plain rows of just those columns instead of User objects
+    query, relevance = filter_users(
+        db, db.query(*model_columns(models.User, fields)) if fields else db.query(models.User), is_active=is_active, search=search
+    )
     
-    # Apply filters
-    if is_active is not None:
-        query = query.filter(models.User.is_active == is_active)
+    # Search results are ranked by relevance unless the caller is paging by cursor
+    if relevance is not None and not cursor:
+        query = query.order_by(relevance.desc())
     
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.User.first_name.ilike(search_term),
-                models.User.last_name.ilike(search_term),
-                models.User.username.ilike(search_term),
-                models.User.email.ilike(search_term)
-            )
-        )
+    # Keyset pagination replaces the offset when a cursor is given
+    sort_key = (models.User.last_name, models.User.first_name, models.User.user_id)
+    query = query.order_by(*sort_key)
+    if cursor:
+        query = query.filter(tuple_(*sort_key) > tuple_(*decode_cursor(cursor, str, str, int)))
+    else:
+        query = query.offset(skip)
     
-    return query.order_by(models.User.last_name, models.User.first_name).offset(skip).limit(limit).all()
+    return query.limit(limit).all()
+
+# The fields a listing page's version is made of (app.utils.conditional.page_version)
+USER_VERSION_FIELDS = ("user_id", "last_modified_date")
+
+# The fields the cursor is made of, which a narrowed listing must still select
+USER_CURSOR_FIELDS = ("last_name", "first_name", "user_id")
 
-def create_user(db: Session, user: schemas.UserCreate):
+def get_user_cursor(db_user: models.User) -> str:
+    return encode_cursor(db_user.last_name, db_user.first_name, db_user.user_id)
+
+def iter_users(db: Session, is_active: Optional[bool] = None, search: Optional[str] = None):
+    # Streams plain rows with the columns of the User schema; the password hash is never selected
+    columns = schema_columns(models.User, schemas.User)
+    query, _ = filter_users(db, db.query(*columns), is_active=is_active, search=search)
+    return query.order_by(
+        models.User.last_name, models.User.first_name, models.User.user_id
+    ).yield_per(EXPORT_BATCH_SIZE)
+
+def create_user(db: Session, user: schemas.UserCreate, password_hash: Optional[str] = None):
+    # Hash before touching the database so no transaction is open while bcrypt runs.
+    # Async endpoints hash without blocking the event loop and pass the hash in.
+    if password_hash is None and user.password:
+        password_hash = get_password_hash(user.password)
+    
     db_user = models.User(
         first_name=user.first_name,
         last_name=user.last_name,
@@ -60,19 +120,21 @@ def create_user(db: Session, user: schemas.UserCreate):
         is_active=user.is_active,
         is_admin=user.is_admin,
         start_date=user.start_date,
-        end_date=user.end_date
+        end_date=user.end_date,
+        password_hash=password_hash
     )
     
-    if user.password:
-        db_user.password_hash = hash_password(user.password)
-    
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, user: schemas.UserUpdate):
+def update_user(db: Session, user_id: int, user: schemas.UserUpdate, password_hash: Optional[str] = None):
+    if password_hash is None and user.password:
+        password_hash = get_password_hash(user.password)
+    
     db_user = get_user(db, user_id)
+    previous_username = db_user.username
     
     if user.first_name is not None:
         db_user.first_name = user.first_name
@@ -90,9 +152,51 @@ def update_user(db: Session, user_id: int, user: schemas.UserUpdate):
         db_user.start_date = user.start_date
     if user.end_date is not None:
         db_user.end_date = user.end_date
-    if user.password:
-        db_user.password_hash = hash_password(user.password)
+    if password_hash is not None:
+        db_user.password_hash = password_hash
     
     db.commit()
+    invalidate_reports(*USER_REPORTS)
+    # Cached principals carry these fields, so a deactivated or demoted user loses access at once
+    if user.username is not None or user.is_active is not None or user.is_admin is not None:
+        invalidate_principals(user_id, previous_username, user.username or previous_username)
     db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    return db_user
+
+def _user_values(users: List[schemas.UserCreate]) -> List[dict]:
+    # Hashes the chunk's passwords in parallel across the hashing workers
+    hashes = iter(get_password_hashes([new_user.password for new_user in users if new_user.password]))
+    values = []
+    for new_user in users:
+        row_values = new_user.model_dump(exclude={"password"})
+        row_values["password_hash"] = next(hashes) if new_user.password else None
+        values.append(row_values)
+    return values
+
+def bulk_create_users(
+    db: Session,
+    rows: Iterable[Tuple[int, Optional[dict], Optional[str]]],
+    chunk_size: int = BULK_IMPORT_CHUNK_SIZE
+):
+    """
+    Creates users from a stream of parsed upload rows, as described in bulk.py.
+    Usernames and emails must be new. Passwords are hashed after the chunk's read
+    transaction has ended, so no connection is held while bcrypt runs.
+
+    Args:
+        db: Database session
+        rows: (row_number, data, error) tuples as produced by app.utils.bulk_import
+        chunk_size: Number of rows validated and inserted per transaction
+
+    Returns:
+        Dict with the number of users created and a per-row error report
+    """
+    return bulk_insert(
+        db, rows, models.User, schemas.UserCreate, "user", "username",
+        unique=[
+            UniqueKey("username", models.User.username, "Username already registered"),
+            UniqueKey("email", models.User.email, "Email already registered"),
+        ],
+        prepare=_user_values,
+        chunk_size=chunk_size
+    )
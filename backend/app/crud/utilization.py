@@ -0,0 +1,152 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Date, and_, cast, func, literal, literal_column, or_, select, union_all
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from app import models
+from .dates import add_days
+
+# Fleet utilization
+#
+# The number of devices of each type checked out on each day of a range. A device
+# counts as checked out from its checkout date up to, not including, its return date.
+# Two implementations produce the same {device_type_id: [count per day]} series, with
+# an entry for each type that had a device out on at least one day:
+#
+#   sweep  SQL groups the loan endpoints into +1 / -1 events per type and day, so only
+#          a few rows per day leave the database, and a cumulative sum over the days
+#          turns the events into counts.
+#   sql    The days are generated in SQL (generate_series on PostgreSQL, a recursive
+#          CTE elsewhere) and joined against the loan intervals, counting per day.
+#
+# The sweep reads each assignment once; the join touches each assignment once for
+# every day it was out. `python -m benchmarks.utilization` compares them.
+
+UTILIZATION_INTERVALS = ("day", "week")
+
+# Longest range a report may cover, in days
+MAX_UTILIZATION_DAYS = 3660
+
+def _overlapping_loans(start: date, end: date, device_type_id: Optional[int] = None) -> list:
+    # Loans out on at least one day of the range
+    criteria = [
+        models.DeviceAssignment.checkout_date <= end,
+        or_(models.DeviceAssignment.actual_return_date == None, models.DeviceAssignment.actual_return_date > start),
+    ]
+    if device_type_id is not None:
+        criteria.append(models.Device.device_type_id == device_type_id)
+    return criteria
+
+def get_utilization_series_sweep(
+    db: Session, start: date, end: date, device_type_id: Optional[int] = None
+) -> Dict[int, List[int]]:
+    # Imported on first use to keep it out of application startup
+    import numpy
+
+    assignment = models.DeviceAssignment
+    criteria = _overlapping_loans(start, end, device_type_id)
+    # Loans already out when the range starts are counted from its first day
+    already_out = select(
+        models.Device.device_type_id, literal(start, Date).label("day"), func.count().label("change")
+    ).join(assignment.device).where(*criteria, assignment.checkout_date < start).group_by(
+        models.Device.device_type_id
+    )
+    checkouts = select(
+        models.Device.device_type_id, assignment.checkout_date, func.count()
+    ).join(assignment.device).where(*criteria, assignment.checkout_date >= start).group_by(
+        models.Device.device_type_id, assignment.checkout_date
+    )
+    returns = select(
+        models.Device.device_type_id, assignment.actual_return_date, -func.count()
+    ).join(assignment.device).where(*criteria, assignment.actual_return_date <= end).group_by(
+        models.Device.device_type_id, assignment.actual_return_date
+    )
+    events = db.execute(union_all(already_out, checkouts, returns)).all()
+
+    type_ids = sorted({type_id for type_id, _, _ in events})
+    rows = {type_id: row for row, type_id in enumerate(type_ids)}
+    changes = numpy.zeros((len(type_ids), (end - start).days + 1), dtype=numpy.int64)
+    if events:
+        type_column, day_column, change_column = zip(*events)
+        numpy.add.at(
+            changes,
+            ([rows[type_id] for type_id in type_column], [(day - start).days for day in day_column]),
+            change_column
+        )
+    counts = numpy.cumsum(changes, axis=1)
+    # Loans returned the day they went out leave events but no device out
+    return {type_id: counts[row].tolist() for type_id, row in rows.items() if counts[row].any()}
+
+def _day_series(db: Session, start: date, end: date):
+    if db.get_bind().dialect.name == "postgresql":
+        series = func.generate_series(
+            literal(start, Date), literal(end, Date), literal_column("interval '1 day'")
+        ).table_valued("value")
+        return select(cast(series.c.value, Date).label("day")).subquery("days")
+    days = select(literal(start, Date).label("day")).cte("days", recursive=True)
+    return days.union_all(select(add_days(days.c.day, 1)).where(days.c.day < end))
+
+def get_utilization_series_sql(
+    db: Session, start: date, end: date, device_type_id: Optional[int] = None
+) -> Dict[int, List[int]]:
+    assignment = models.DeviceAssignment
+    loans = select(
+        models.Device.device_type_id, assignment.checkout_date, assignment.actual_return_date
+    ).join(assignment.device).where(*_overlapping_loans(start, end, device_type_id)).subquery("loans")
+    days = _day_series(db, start, end)
+    result = db.execute(
+        select(loans.c.device_type_id, days.c.day, func.count()).select_from(days).join(
+            loans,
+            and_(
+                loans.c.checkout_date <= days.c.day,
+                or_(loans.c.actual_return_date == None, loans.c.actual_return_date > days.c.day)
+            )
+        ).group_by(loans.c.device_type_id, days.c.day)
+    ).all()
+
+    series = {}
+    for type_id, day, count in result:
+        series.setdefault(type_id, [0] * ((end - start).days + 1))[(day - start).days] = count
+    return series
+
+def _weekly(start: date, counts: List[int]) -> List[dict]:
+    # Weeks start on Monday; the first and last may be partial
+    points = []
+    index = 0
+    while index < len(counts):
+        day = start + timedelta(days=index)
+        week = counts[index:index + 7 - day.weekday()]
+        points.append({"date": day, "checked_out": round(sum(week) / len(week), 1), "peak": max(week)})
+        index += len(week)
+    return points
+
+def build_utilization_report(
+    db: Session,
+    series: Dict[int, List[int]],
+    start: date,
+    end: date,
+    interval: str = "day",
+    device_type_id: Optional[int] = None
+) -> dict:
+    """
+    Shapes daily counts into the utilization report, one series per device type.
+
+    Types without any loans in the range get a series of zeros. Weekly points hold the
+    average and the peak of the daily counts of each week.
+    """
+    days = (end - start).days + 1
+    types = db.query(models.DeviceType.device_type_id, models.DeviceType.type_name)
+    if device_type_id is not None:
+        types = types.filter(models.DeviceType.device_type_id == device_type_id)
+
+    report = []
+    for type_id, type_name in types.order_by(models.DeviceType.type_name).all():
+        counts = series.get(type_id) or [0] * days
+        if interval == "week":
+            points = _weekly(start, counts)
+        else:
+            points = [
+                {"date": start + timedelta(days=index), "checked_out": count, "peak": count}
+                for index, count in enumerate(counts)
+            ]
+        report.append({"device_type_id": type_id, "type_name": type_name, "points": points})
+    return {"start": start, "end": end, "interval": interval, "series": report}
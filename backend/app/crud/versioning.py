@@ -0,0 +1,12 @@
+from typing import Optional
+
+# Versions for conditional GETs
+#
+# A detail version is a tuple of the modification times of the rows a detail response
+# is built from, read in one query that loads nothing else; app.utils.conditional turns
+# it into ETag and Last-Modified headers. Listing pages are versioned from their own
+# rows instead (app.utils.conditional.page_version).
+
+def row_version(row) -> Optional[tuple]:
+    # A detail version query returns no row when the resource does not exist
+    return tuple(row) if row is not None else None
@@ -1,30 +1,133 @@
 # database.py
-from sqlalchemy import create_engine
+import asyncio
+import logging
+import threading
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from app.core.config import Settings
+from app.core.config import get_settings
+from app.core.pool import engine_options, instrument_engine
+from app.core.metrics import instrument_queries
 
-# Get settings
-settings = Settings()
+logger = logging.getLogger(__name__)
 
-# Get database URL from Settings or use a default for development
-DATABASE_URL = settings.DATABASE_URL
-print(f"Database URL from database.py: {DATABASE_URL}")
+# Engines and session factories
+#
+# Each engine and its session factory are built on first use, once per process, so
+# importing the app neither reads the database settings nor sets up a pool. The
+# lifespan handler in app.main checks connectivity at startup and disposes the pools
+# at shutdown.
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+# Async drivers for each sync dialect
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def get_async_database_url(database_url: str) -> str:
+    # Swap the sync driver for its async counterpart, keeping the rest of the URL
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(
+        hide_password=False
+    )
+
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_engine_lock = threading.Lock()
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+_async_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is None:
+            # Create SQLAlchemy engine with the configured, instrumented pool
+            database_url = get_settings().DATABASE_URL
+            engine = create_engine(database_url, **engine_options(database_url, "sync"))
+            instrument_engine(engine, "sync")
+            instrument_queries(engine)
+            _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            _engine = engine
+            logger.info("Database engine created for %s", engine.url.render_as_string(hide_password=True))
+        return _engine
+
+def get_sessionmaker() -> sessionmaker:
+    get_engine()
+    return _session_factory
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _async_session_factory
+    with _async_engine_lock:
+        if _async_engine is None:
+            # Create async engine and session factory alongside the sync ones
+            settings = get_settings()
+            async_database_url = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+            async_engine = create_async_engine(
+                async_database_url, **engine_options(async_database_url, "async", is_async=True)
+            )
+            instrument_engine(async_engine.sync_engine, "async")
+            instrument_queries(async_engine.sync_engine)
+            _async_session_factory = async_sessionmaker(
+                async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+            )
+            _async_engine = async_engine
+        return _async_engine
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    get_async_engine()
+    return _async_session_factory
+
+async def check_database(timeout: float):
+    """
+    Runs a trivial query on the async engine.
+
+    Raises:
+        asyncio.TimeoutError: If the database does not answer within timeout seconds
+        Exception: Whatever the driver raises when it cannot connect
+    """
+    async def ping():
+        async with get_async_engine().connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    await asyncio.wait_for(ping(), timeout)
+
+async def dispose_engines():
+    # Closes the pooled connections of the engines created so far; they reconnect if used again
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+
+# Module-level names from before the engines were lazy, for scripts and tests;
+# `from app.database import engine` builds the engine at that point
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "SessionLocal": get_sessionmaker,
+    "async_engine": get_async_engine,
+    "AsyncSessionLocal": get_async_sessionmaker,
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Create base class for models
 Base = declarative_base()
 
 # Dependency to get DB session
 def get_db():
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get async DB session
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
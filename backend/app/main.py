@@ -1,18 +1,45 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import uvicorn
 
 from app.api.api import api_router
 from app.core.config import get_settings
-from app.database import engine, Base
+from app.core.events import get_event_bus
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.security import get_password_hasher
+from app.database import check_database, dispose_engines
+from app.utils.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+# Startup checks that the database answers and starts the event broker. The schema is
+# migrated before the server starts (`python -m app.commands migrate`), and an
+# unreachable database does not stop the process: /readyz reports it until the
+# database comes back, and the event broker keeps reconnecting meanwhile.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await check_database(settings.DB_READY_TIMEOUT_SECONDS)
+    except Exception as exc:
+        logger.warning("Database not reachable at startup: %r", exc)
+    await get_event_bus().start()
+    yield
+    await get_event_bus().stop()
+    get_password_hasher().shutdown()
+    await dispose_engines()
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -22,8 +49,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
+# Record per-route latency, status codes and SQL work; added last so it wraps CORS too
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, exclude_paths=["/metrics", "/healthz", "/readyz", "/events/"])
+
 # Include API router
 app.include_router(api_router)
 
@@ -37,10 +69,30 @@ def read_root():
         "docs_url": "/docs"
     }
 
-# Create database tables if they don't exist
-@app.on_event("startup")
-async def startup_event():
-    Base.metadata.create_all(bind=engine)
+# Liveness probe: the process is serving requests; never touches the database
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    return {"status": "ok"}
+
+# Readiness probe: the database answers within DB_READY_TIMEOUT_SECONDS. The event
+# broker's state is reported but does not make the worker unready: without it the
+# worker still serves requests and streams its own events.
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    events = "connected" if get_event_bus().connected else "disconnected"
+    try:
+        await check_database(settings.DB_READY_TIMEOUT_SECONDS)
+    except Exception as exc:
+        logger.warning("Readiness check failed: %r", exc)
+        return ORJSONResponse(
+            {"status": "unavailable", "database": type(exc).__name__, "events": events}, status_code=503
+        )
+    return {"status": "ready", "events": events}
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -1,10 +1,24 @@
 # models.py
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Date, DateTime, Text, Numeric, func
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Date, DateTime, Text, Numeric, func, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+# Partial index predicates, shared by the model definitions and the migrations
+OPEN_ASSIGNMENT = text("actual_return_date IS NULL")
+NOT_RETIRED = text("is_retired = false")
+
+def partial_index(name: str, *columns: str, where) -> Index:
+    # Partial on the dialects that support it, a plain index elsewhere
+    return Index(name, *columns, postgresql_where=where, sqlite_where=where)
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # User listing order (get_users)
+        Index("ix_users_name", "last_name", "first_name", "user_id"),
+        # Change feed (get_changes)
+        Index("ix_users_last_modified", "last_modified_date", "user_id"),
+    )
 
     user_id = Column(Integer, primary_key=True, index=True)
     last_name = Column(String(100), nullable=False)
@@ -23,9 +37,18 @@ class User(Base):
     assignments = relationship("DeviceAssignment", back_populates="user", foreign_keys="[DeviceAssignment.user_id]")
     created_assignments = relationship("DeviceAssignment", back_populates="created_by_user", 
                                     foreign_keys="[DeviceAssignment.created_by]")
+    active_assignments = relationship(
+        "DeviceAssignment",
+        primaryjoin="and_(User.user_id == DeviceAssignment.user_id, DeviceAssignment.actual_return_date == None)",
+        viewonly=True
+    )
 
 class DeviceType(Base):
     __tablename__ = "device_types"
+    __table_args__ = (
+        # Change feed (get_changes)
+        Index("ix_device_types_last_modified", "last_modified_date", "device_type_id"),
+    )
     
     device_type_id = Column(Integer, primary_key=True, index=True)
     type_name = Column(String(50), unique=True, nullable=False, index=True)
@@ -39,6 +62,12 @@ class DeviceType(Base):
 
 class Purchase(Base):
     __tablename__ = "purchases"
+    __table_args__ = (
+        # Purchase listing order (get_purchases)
+        Index("ix_purchases_purchase_date", "purchase_date", "purchase_id"),
+        # Change feed (get_changes)
+        Index("ix_purchases_last_modified", "last_modified_date", "purchase_id"),
+    )
     
     purchase_id = Column(Integer, primary_key=True, index=True)
     purchase_order = Column(String(50), unique=True, nullable=True, index=True)
@@ -54,6 +83,18 @@ class Purchase(Base):
 
 class Device(Base):
     __tablename__ = "devices"
+    __table_args__ = (
+        # Status filters of the device listing, most selective flag first
+        Index("ix_devices_status", "is_retired", "is_checked_out", "device_type_id"),
+        # Expiring warranties report
+        partial_index("ix_devices_warranty_expiration", "warranty_expiration", where=NOT_RETIRED),
+        # Refresh forecast report, a purchase date range per type
+        partial_index("ix_devices_refresh_due", "device_type_id", "purchase_date", where=NOT_RETIRED),
+        # Devices of a purchase (purchase detail)
+        Index("ix_devices_purchase_id", "purchase_id"),
+        # Change feed (get_changes)
+        Index("ix_devices_last_modified", "last_modified_date", "device_id"),
+    )
     
     device_id = Column(Integer, primary_key=True, index=True)
     device_type_id = Column(Integer, ForeignKey("device_types.device_type_id"), nullable=False)
@@ -76,9 +117,26 @@ class Device(Base):
     device_type = relationship("DeviceType", back_populates="devices")
     purchase = relationship("Purchase", back_populates="devices")
     assignments = relationship("DeviceAssignment", back_populates="device")
+    active_assignment = relationship(
+        "DeviceAssignment",
+        primaryjoin="and_(Device.device_id == DeviceAssignment.device_id, DeviceAssignment.actual_return_date == None)",
+        uselist=False,
+        viewonly=True
+    )
 
 class DeviceAssignment(Base):
     __tablename__ = "device_assignments"
+    __table_args__ = (
+        # Open assignments of a device or user (checkout, detail views, user assignments report)
+        partial_index("ix_device_assignments_device_open", "device_id", where=OPEN_ASSIGNMENT),
+        partial_index("ix_device_assignments_user_open", "user_id", where=OPEN_ASSIGNMENT),
+        # Assignment listing order, alone and filtered by device or user (get_assignments)
+        Index("ix_device_assignments_checkout", "checkout_date", "assignment_id"),
+        Index("ix_device_assignments_device_checkout", "device_id", "checkout_date", "assignment_id"),
+        Index("ix_device_assignments_user_checkout", "user_id", "checkout_date", "assignment_id"),
+        # Change feed (get_changes)
+        Index("ix_device_assignments_last_modified", "last_modified_date", "assignment_id"),
+    )
     
     assignment_id = Column(Integer, primary_key=True, index=True)
     device_id = Column(Integer, ForeignKey("devices.device_id"), nullable=False)
@@ -96,4 +154,28 @@ class DeviceAssignment(Base):
     # Relationships
     device = relationship("Device", back_populates="assignments")
     user = relationship("User", back_populates="assignments", foreign_keys=[user_id])
-    created_by_user = relationship("User", back_populates="created_assignments", foreign_keys=[created_by])
\ No newline at end of file
+    created_by_user = relationship("User", back_populates="created_assignments", foreign_keys=[created_by])
+
+class DeviceStatusCounter(Base):
+    __tablename__ = "device_status_counters"
+    
+    # Summary of devices by status, maintained by the device and assignment CRUD writes
+    device_type_id = Column(Integer, ForeignKey("device_types.device_type_id"), primary_key=True)
+    is_checked_out = Column(Boolean, primary_key=True)
+    is_retired = Column(Boolean, primary_key=True)
+    device_count = Column(Integer, default=0, nullable=False)
+
+class PurchaseSpendRollup(Base):
+    __tablename__ = "purchase_spend_rollups"
+    __table_args__ = (
+        # Spend by month and year (get_purchase_spend)
+        Index("ix_purchase_spend_rollups_month", "month"),
+    )
+    
+    # Spend of dated purchases by vendor and month, maintained by the purchase and device CRUD writes.
+    # Purchases without a vendor are counted under "".
+    vendor = Column(String(100), primary_key=True)
+    month = Column(Date, primary_key=True)
+    purchase_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Numeric(14, 2), default=0, nullable=False)
+    device_count = Column(Integer, default=0, nullable=False)
@@ -1,5 +1,5 @@
 # schemas.py
-from pydantic import BaseModel, EmailStr, validator, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing import List, Optional
 from datetime import date, datetime
 from decimal import Decimal
@@ -109,30 +109,75 @@ class DeviceReturn(BaseModel):
     return_condition: Optional[str] = None
     notes: Optional[str] = None
 
+# Batch checkout and return schemas
+class DeviceBatchCheckout(BaseModel):
+    user_id: int
+    device_ids: List[int]
+    checkout_date: date = Field(default_factory=date.today)
+    expected_return_date: Optional[date] = None
+    checkout_condition: Optional[str] = None
+    notes: Optional[str] = None
+    created_by: Optional[int] = None
+
+    @field_validator("device_ids")
+    @classmethod
+    def device_ids_not_empty(cls, value):
+        if not value:
+            raise ValueError("At least one device is required")
+        return value
+
+class DeviceBatchReturn(DeviceReturn):
+    assignment_ids: List[int]
+
+    @field_validator("assignment_ids")
+    @classmethod
+    def assignment_ids_not_empty(cls, value):
+        if not value:
+            raise ValueError("At least one assignment is required")
+        return value
+
+# Bulk import schemas
+class BulkImportError(BaseModel):
+    row: int
+    serial_number: Optional[str] = None
+    error: str
+
+class BulkImportResult(BaseModel):
+    created: int
+    failed: int
+    errors: List[BulkImportError] = []
+
+class UserBulkImportError(BaseModel):
+    row: int
+    username: Optional[str] = None
+    error: str
+
+class UserBulkImportResult(BaseModel):
+    created: int
+    failed: int
+    errors: List[UserBulkImportError] = []
+
 # Response schemas with ID and timestamps
 class DeviceType(DeviceTypeBase):
     device_type_id: int
     created_date: datetime
     last_modified_date: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class User(UserBase):
     user_id: int
     created_date: datetime
     last_modified_date: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class Purchase(PurchaseBase):
     purchase_id: int
     created_date: datetime
     last_modified_date: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class Device(DeviceBase):
     device_id: int
@@ -141,8 +186,7 @@ class Device(DeviceBase):
     created_date: datetime
     last_modified_date: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DeviceAssignment(DeviceAssignmentBase):
     assignment_id: int
@@ -151,8 +195,7 @@ class DeviceAssignment(DeviceAssignmentBase):
     created_date: datetime
     last_modified_date: datetime
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Nested response schemas for detailed views
 class UserBrief(BaseModel):
@@ -163,15 +206,13 @@ class UserBrief(BaseModel):
     email: EmailStr
     is_active: bool
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DeviceTypeBrief(BaseModel):
     device_type_id: int
     type_name: str
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PurchaseBrief(BaseModel):
     purchase_id: int
@@ -179,8 +220,7 @@ class PurchaseBrief(BaseModel):
     purchase_date: Optional[date] = None
     vendor: Optional[str] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DeviceBrief(BaseModel):
     device_id: int
@@ -190,8 +230,7 @@ class DeviceBrief(BaseModel):
     is_checked_out: bool
     is_retired: bool
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AssignmentBrief(BaseModel):
     assignment_id: int
@@ -199,8 +238,7 @@ class AssignmentBrief(BaseModel):
     expected_return_date: Optional[date] = None
     actual_return_date: Optional[date] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Detailed response schemas with relationships
 class DeviceDetail(Device):
@@ -208,25 +246,41 @@ class DeviceDetail(Device):
     purchase: Optional[PurchaseBrief] = None
     active_assignment: Optional[AssignmentBrief] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UserDetail(User):
     active_assignments: List[AssignmentBrief] = []
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PurchaseDetail(Purchase):
     devices: List[DeviceBrief] = []
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DeviceAssignmentDetail(DeviceAssignment):
     device: DeviceBrief
     user: UserBrief
     created_by_user: Optional[UserBrief] = None
     
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+# Device usage history schemas
+class DeviceUsageStats(BaseModel):
+    device_id: int
+    serial_number: str
+    device_type_id: int
+    is_checked_out: bool
+    is_retired: bool
+    loans: int
+    holders: int
+    days_checked_out: int
+    average_loan_days: Optional[float] = None  # over returned loans
+    days_idle_between_loans: int
+    last_return_date: Optional[date] = None
+    days_idle: Optional[int] = None  # since the last return, or purchase if never assigned; 0 while checked out
+    utilization: Optional[float] = None  # share of the days since purchase (or first checkout) spent checked out
+
+class DeviceHistory(BaseModel):
+    stats: DeviceUsageStats
+    assignments: List[DeviceAssignment]
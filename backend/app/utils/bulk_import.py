@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+
+# Streaming parsers for bulk uploads.
+#
+# Each parser yields (row_number, data, error) one record at a time, where data is a
+# dict of field values, or None with an error message when the record cannot be parsed.
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+SUPPORTED_FORMATS = ("csv", "jsonl")
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """
+    Guesses the upload format from the file name or content type.
+
+    Returns:
+        "csv", "jsonl", or None if the format is not recognized
+    """
+    name = (filename or "").lower()
+    media_type = (content_type or "").lower()
+    if name.endswith(".csv") or media_type in ("text/csv", "application/csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or media_type in ("application/x-ndjson", "application/jsonl"):
+        return "jsonl"
+    return None
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[ParsedRow]:
+    """
+    Parses a CSV upload with a header row. Empty cells are left out so that
+    schema defaults apply.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, "Row has more values than the header"
+                continue
+            yield reader.line_num, {key: value for key, value in record.items() if value != ""}, None
+    except (csv.Error, UnicodeDecodeError) as exc:
+        yield reader.line_num + 1, None, f"Unreadable CSV: {exc}"
+    finally:
+        text.detach()
+
+def iter_jsonl_rows(stream: BinaryIO) -> Iterator[ParsedRow]:
+    """
+    Parses a JSON Lines upload with one object per line. Blank lines are skipped.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except (ValueError, UnicodeDecodeError) as exc:
+            yield line_number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, record, None
+
+def validation_message(exc: ValidationError) -> str:
+    """Flattens a row's validation errors into one "field: message; ..." line for the error report."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+def iter_rows(stream: BinaryIO, format: str) -> Iterator[ParsedRow]:
+    if format == "csv":
+        return iter_csv_rows(stream)
+    return iter_jsonl_rows(stream)
@@ -0,0 +1,120 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+
+# Conditional GET support.
+#
+# An endpoint describes the current state of what it would return as a version. A
+# detail's version is the modification times of its rows, read by one query that
+# loads nothing else (see the get_*_detail_version CRUD functions). A listing page's
+# version is the key and modification time of each row on the page: a revalidation
+# reads just those columns for the page, and a plain GET takes them from the rows it
+# loads, so a page costs the same whether or not it is conditional and no request
+# scans the whole filtered set. The version is hashed into a strong ETag and its
+# newest timestamp becomes Last-Modified, so a client revalidating with If-None-Match
+# or If-Modified-Since gets a 304 before the response is loaded or serialized.
+# Timestamps are stored as naive UTC. SQLite only keeps them to the second, so there a
+# row written twice within one second keeps its version; PostgreSQL keeps microseconds.
+
+def page_version(rows: Iterable, key: str) -> tuple:
+    """
+    Returns the version of a listing page: its newest last_modified_date followed by
+    the key and last_modified_date of each row, in page order. Any insert, update or
+    delete that changes which rows the page holds, their order, or their content
+    changes it; changes elsewhere in the listing do not.
+
+    Args:
+        rows: The page's rows, e.g. selected with a listing's *_VERSION_FIELDS
+        key: Name of the primary key column
+    """
+    stamps = tuple((getattr(row, key), row.last_modified_date) for row in rows)
+    return (max((modified for _, modified in stamps), default=None), stamps)
+
+def is_revalidation(request: Request) -> bool:
+    # Only then can checking the version first save loading the response
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def make_etag(*version) -> str:
+    return '"' + hashlib.blake2b(repr(version).encode(), digest_size=16).hexdigest() + '"'
+
+def _last_modified(version) -> Optional[datetime]:
+    timestamps = [part for part in version if isinstance(part, datetime)]
+    if not timestamps:
+        return None
+    # HTTP dates have whole seconds
+    return max(timestamps).replace(tzinfo=timezone.utc, microsecond=0)
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def _modified_since(header: str, last_modified: Optional[datetime]) -> bool:
+    if last_modified is None:
+        return True
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        return True
+    return last_modified > since
+
+def set_validators(request: Request, response: Response, *version) -> dict:
+    """
+    Sets the ETag, Last-Modified and Cache-Control headers of a GET response.
+
+    Args:
+        request: The incoming request, whose query string is part of the ETag
+        response: The endpoint's response
+        version: Resource name and key followed by its version parts
+
+    Returns:
+        The headers set
+    """
+    # The query string is part of the tag, so pages and filters of a listing never share one
+    etag = make_etag(*version, request.url.query)
+    last_modified = _last_modified(version)
+    # Clients may keep the body but must revalidate it before each use
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(headers)
+    return headers
+
+def conditional_get(request: Request, response: Response, *version) -> Optional[Response]:
+    """
+    Sets the cache validators of a GET response and answers revalidations.
+
+    Args:
+        request: The incoming request, for its If-None-Match and If-Modified-Since headers
+        response: The endpoint's response, which gets ETag, Last-Modified and Cache-Control
+        version: Resource name and key followed by its version parts
+
+    Returns:
+        A 304 response if the client's copy is current, otherwise None
+    """
+    headers = set_validators(request, response, *version)
+    etag = headers["ETag"]
+    last_modified = _last_modified(version)
+
+    # If-None-Match takes precedence; If-Modified-Since is only used without it
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        modified = not _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        modified = if_modified_since is None or _modified_since(if_modified_since, last_modified)
+
+    if modified:
+        return None
+    return Response(status_code=304, headers=headers)
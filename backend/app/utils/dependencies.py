@@ -1,32 +1,34 @@
+from datetime import datetime, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
 from typing import Optional
 
-import crud
+from app import crud
 from app.core.config import get_settings
-from app.database import get_db
+from app.database import get_async_sessionmaker
 
 settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 async def get_current_user(
-    db: Session = Depends(get_db),
     token: Optional[str] = Depends(oauth2_scheme)
 ):
     """
-    Get the current authenticated user based on the JWT token.
+    Get the current authenticated principal based on the JWT token.
     
     Note: This is a placeholder for future authentication implementation.
     Currently, it does not enforce authentication but is included for future use.
     
+    A token seen before is answered from the principal cache, with no JWT decode and
+    no database round trip. Otherwise the principal is loaded in a short-lived session
+    of its own and cached until the token or the cache entry expires.
+    
     Args:
-        db: Database session
         token: JWT token
         
     Returns:
-        User model instance if authenticated
+        Principal (user_id, username, is_active, is_admin) if authenticated
         
     Raises:
         HTTPException: If authentication fails
@@ -36,26 +38,40 @@ async def get_current_user(
         # This allows the API to work without authentication
         return None
         
-    # This section will be implemented when authentication is added
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    principal = crud.get_cached_principal(token)
+    if principal is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+        except JWTError:
+            raise credentials_exception
+        
+        # An update committed after this read bumps the version, and the stale principal is not cached
+        version = crud.get_principal_version(username)
+        async with get_async_sessionmaker()() as db:
+            principal = await crud.aio.get_principal(db, username=username)
+        if principal is None:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
         
-    user = crud.get_user_by_username(db, username=username)
-    if user is None:
+        expires_at = payload.get("exp")
+        crud.cache_principal(
+            token, principal, datetime.fromtimestamp(expires_at, timezone.utc) if expires_at is not None else None,
+            version=version
+        )
+    
+    # Deactivated users are cached too, so repeated attempts stay off the database
+    if not principal.is_active:
         raise credentials_exception
         
-    return user
+    return principal
 
 async def get_admin_user(
     current_user = Depends(get_current_user)
@@ -66,10 +82,10 @@ async def get_admin_user(
     Note: This is a placeholder for future authentication implementation.
     
     Args:
-        current_user: User model instance from get_current_user
+        current_user: Principal from get_current_user
         
     Returns:
-        User model instance if admin
+        Principal if admin
         
     Raises:
         HTTPException: If user is not an admin
@@ -0,0 +1,82 @@
+import csv
+import io
+from datetime import date
+from typing import Any, Callable, Iterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+from app.database import get_sessionmaker
+from app.utils.responses import dumps
+
+# Streaming exports
+#
+# Rows are read through a server-side cursor (Query.yield_per) and serialized as they
+# arrive, so memory stays flat regardless of table size. The export owns its session
+# for the lifetime of the stream rather than borrowing the request's.
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Serialized rows are flushed to the client in chunks of roughly this many bytes
+FLUSH_BYTES = 64 * 1024
+
+def _iter_ndjson(names: list, rows) -> Iterator[str]:
+    for row in rows:
+        yield dumps(dict(zip(names, row))).decode("utf-8") + "\n"
+
+def _csv_value(value: Any) -> Any:
+    # The text the JSON formats use: ISO dates and datetimes, true and false; None
+    # becomes an empty cell and Decimals keep their digits
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _iter_csv(names: list, rows) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_export(build_query: Callable[[Session], Query], format: str) -> Iterator[bytes]:
+    """
+    Runs an export query in its own session and yields the encoded output.
+
+    Args:
+        build_query: Builds the streaming query for a session
+        format: One of EXPORT_FORMATS
+    """
+    db = get_sessionmaker()()
+    try:
+        query = build_query(db)
+        names = [description["name"] for description in query.column_descriptions]
+        serialize = _iter_csv if format == "csv" else _iter_ndjson
+
+        chunk = []
+        size = 0
+        for text in serialize(names, query):
+            chunk.append(text)
+            size += len(text)
+            if size >= FLUSH_BYTES:
+                yield "".join(chunk).encode("utf-8")
+                chunk = []
+                size = 0
+        if chunk:
+            yield "".join(chunk).encode("utf-8")
+    finally:
+        db.close()
+
+def export_response(build_query: Callable[[Session], Query], format: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_export(build_query, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
@@ -0,0 +1,56 @@
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Type
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, create_model
+
+# Sparse fieldsets
+#
+# List and detail endpoints take a `fields` query parameter, a comma-separated subset
+# of their response schema's fields. Listings select only those columns (plus the keys
+# their cursor is made of); details load only those columns and relationships. The
+# response holds just the requested fields, in the order they were asked for.
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[List[str]]:
+    """
+    Parses a `fields` query parameter against a response schema.
+
+    Args:
+        fields: Comma-separated field names, or None for all fields
+        schema: The endpoint's response schema
+
+    Returns:
+        The requested field names in order without duplicates, or None for all fields
+
+    Raises:
+        HTTPException: 400 if the parameter is empty or names a field the schema lacks
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="fields must name at least one field")
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(schema.model_fields)}"
+        )
+    return names
+
+def with_fields(fields: Sequence[str], extra: Sequence[str]) -> List[str]:
+    """The fields followed by any of extra not among them, e.g. the cursor keys of a listing."""
+    return list(fields) + [name for name in extra if name not in fields]
+
+@lru_cache(maxsize=256)
+def fieldset_model(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Returns a model with only the given fields of a schema.
+
+    Validating an ORM object with it reads only those attributes, so columns and
+    relationships left unloaded by the query are never touched.
+    """
+    return create_model(
+        f"{schema.__name__}Fieldset",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    )
@@ -0,0 +1,62 @@
+from decimal import Decimal
+from typing import Any, Iterable, Optional, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+# JSON responses rendered with orjson
+#
+# ORJSONResponse is the app's default response class, used for routes without a
+# response model such as the reports. Routes with a response model are serialized by
+# Pydantic straight to JSON bytes. List endpoints go further with rows_response():
+# they select the schema's columns as plain rows, which the database has already
+# constrained, and dump them with orjson without building or validating a model per
+# row. Both paths produce the same JSON: ISO dates and datetimes, Decimals as strings.
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def _json_response(content, response: Optional[Response] = None) -> Response:
+    json_response = Response(content=content, media_type="application/json")
+    if response is not None:
+        json_response.raw_headers.extend(response.headers.raw)
+    return json_response
+
+def rows_response(rows: Iterable, response: Optional[Response] = None,
+                  fields: Optional[Sequence[str]] = None) -> Response:
+    """
+    Serializes query rows as a JSON array of objects keyed by column label.
+
+    Args:
+        rows: Rows of a column projection, e.g. db.query(*schema_columns(model, schema))
+        response: The endpoint's injected response, whose headers are carried over
+        fields: Names of the leading columns to include; columns selected after them,
+            such as cursor keys, are left out. All columns if None.
+
+    Returns:
+        A JSON response that bypasses response model validation
+    """
+    if fields is None:
+        content = [row._asdict() for row in rows]
+    else:
+        content = [dict(zip(fields, row)) for row in rows]
+    return _json_response(dumps(content), response)
+
+def content_response(content: Any, response: Optional[Response] = None) -> Response:
+    """Serializes plain content, e.g. dicts built from rows, carrying over the endpoint's response headers."""
+    return _json_response(dumps(content), response)
+
+def model_response(instance: BaseModel, response: Optional[Response] = None) -> Response:
+    """Serializes a Pydantic model as JSON, carrying over the endpoint's response headers."""
+    return _json_response(instance.model_dump_json(), response)
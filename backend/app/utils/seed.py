@@ -0,0 +1,274 @@
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud.counters import rebuild_device_status_counters, rebuild_purchase_spend_rollups
+
+# Synthetic inventory for development and benchmarks
+#
+# Builds a realistic dataset with multi-row inserts on one connection: purchases spread
+# over the last years, devices bought on those purchases, users, and for every device a
+# history of back-to-back assignments ending in an open one for devices still out.
+# Primary keys are assigned here so rows can reference each other without reading
+# them back, and the generator is seeded so the same scale gives the same data.
+
+# Device types with their refresh cycle in months and a few models each
+DEVICE_TYPES = [
+    ("Laptop", 36, ["Latitude 5440", "ThinkPad T14", "EliteBook 840", "MacBook Pro 14"]),
+    ("Desktop", 60, ["OptiPlex 7010", "ThinkCentre M70q", "ProDesk 400"]),
+    ("Monitor", 72, ["P2422H", "U2723QE", "ThinkVision T24i"]),
+    ("Dock", 48, ["WD19S", "ThinkPad USB-C Dock", "CalDigit TS4"]),
+    ("Headset", 24, ["Jabra Evolve2 65", "Poly Voyager 4320", "Logitech Zone Vibe"]),
+    ("Phone", 36, ["iPhone 15", "Pixel 8", "Galaxy S23"]),
+    ("Tablet", 48, ["iPad Air", "Galaxy Tab S9", "Surface Go 4"]),
+    ("Keyboard", 60, ["MX Keys", "KB216", "Magic Keyboard"]),
+    ("Mouse", 60, ["MX Master 3S", "MS116", "M720 Triathlon"]),
+    ("Webcam", 48, ["Brio 4K", "C920", "Kiyo Pro"]),
+]
+
+VENDORS = ["CDW", "Dell", "Lenovo", "HP", "Apple", "Insight", "SHI", "Amazon Business", "Connection", "Zones"]
+
+FIRST_NAMES = [
+    "Ava", "Ben", "Chloe", "Daniel", "Emma", "Felix", "Grace", "Henry", "Isla", "Jack", "Kara", "Liam",
+    "Maya", "Noah", "Olivia", "Priya", "Quinn", "Ravi", "Sofia", "Theo", "Uma", "Victor", "Wen", "Yusuf", "Zoe",
+]
+
+LAST_NAMES = [
+    "Anderson", "Brown", "Chen", "Davis", "Evans", "Garcia", "Hughes", "Ito", "Johnson", "Kim", "Lopez",
+    "Martin", "Nguyen", "Okafor", "Patel", "Reyes", "Smith", "Taylor", "Usman", "Walker", "Young", "Zhang",
+]
+
+CONDITIONS = ["New", "Excellent", "Good", "Fair", "Worn"]
+
+@dataclass
+class SeedScale:
+    """Row counts to generate. Device types are fixed by DEVICE_TYPES."""
+
+    devices: int = 200_000
+    users: int = 50_000
+    assignments: int = 2_000_000
+    purchases: int = 10_000
+
+    @classmethod
+    def scaled(cls, factor: float) -> "SeedScale":
+        full = cls()
+        return cls(
+            devices=max(int(full.devices * factor), 1),
+            users=max(int(full.users * factor), 1),
+            assignments=max(int(full.assignments * factor), 0),
+            purchases=max(int(full.purchases * factor), 1),
+        )
+
+# Rows per multi-row INSERT
+SEED_BATCH_SIZE = 5000
+
+# Years of history the purchases and assignments are spread over
+HISTORY_YEARS = 6
+
+def _batched(rows: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _insert(connection: Connection, model, rows: Iterator[dict], log: Callable[[str], None]) -> int:
+    count = 0
+    for batch in _batched(rows, SEED_BATCH_SIZE):
+        connection.execute(insert(model), batch)
+        count += len(batch)
+    log(f"{model.__tablename__}: {count} rows")
+    return count
+
+def _purchase_rows(rng: random.Random, scale: SeedScale, today: date) -> Iterator[dict]:
+    for purchase_id in range(1, scale.purchases + 1):
+        yield {
+            "purchase_id": purchase_id,
+            "purchase_order": f"PO-{purchase_id:07d}",
+            "purchase_date": today - timedelta(days=rng.randrange(HISTORY_YEARS * 365)),
+            "vendor": rng.choice(VENDORS),
+            "total_amount": round(rng.uniform(200, 50_000), 2),
+            "notes": None,
+        }
+
+def _user_rows(rng: random.Random, scale: SeedScale, today: date) -> Iterator[dict]:
+    for user_id in range(1, scale.users + 1):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        is_active = rng.random() < 0.9
+        start_date = today - timedelta(days=rng.randrange(HISTORY_YEARS * 365 + 365))
+        yield {
+            "user_id": user_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "username": f"{first_name.lower()}.{last_name.lower()}{user_id}",
+            "email": f"{first_name.lower()}.{last_name.lower()}{user_id}@example.com",
+            "password_hash": None,
+            "start_date": start_date,
+            "end_date": None if is_active else start_date + timedelta(days=rng.randrange(30, 2000)),
+            "is_active": is_active,
+            "is_admin": user_id <= max(scale.users // 1000, 1),
+        }
+
+def _device_history(rng: random.Random, device_id: int, start: date, today: date, count: int,
+                    users: int, retired: bool) -> List[dict]:
+    """
+    Back-to-back assignments filling the device's life since purchase. The last one
+    stays open for most devices still in service; retired devices have every loan
+    returned, by today at the latest.
+    """
+    history = []
+    span = (today - start).days
+    if count <= 0 or span < 2:
+        return history
+    # Each assignment gets a slot of roughly equal length, mostly spent checked out
+    slot = span / count
+    checkout = start + timedelta(days=rng.randrange(0, max(int(slot * 0.1), 1)))
+    for index in range(count):
+        if checkout >= today:
+            break
+        returned = checkout + timedelta(days=max(int(slot * rng.uniform(0.5, 0.9)), 1))
+        is_last = index == count - 1
+        if returned >= today and retired:
+            returned = today
+        elif returned >= today or (is_last and not retired and rng.random() < 0.6):
+            returned = None
+        history.append({
+            "device_id": device_id,
+            "user_id": rng.randrange(1, users + 1),
+            "checkout_date": checkout,
+            "expected_return_date": checkout + timedelta(days=365) if rng.random() < 0.3 else None,
+            "actual_return_date": returned,
+            "checkout_condition": rng.choice(CONDITIONS),
+            "return_condition": rng.choice(CONDITIONS) if returned else None,
+            "notes": None,
+            "created_by": 1,
+        })
+        if returned is None:
+            break
+        checkout = max(returned, start + timedelta(days=int(slot * (index + 1))))
+    return history
+
+def seed_database(engine: Engine, scale: SeedScale, seed: int = 42,
+                  log: Optional[Callable[[str], None]] = None) -> dict:
+    """
+    Fills an empty database with synthetic inventory.
+
+    Args:
+        engine: Engine of a migrated, empty database
+        scale: Row counts to generate
+        seed: Random seed; the same seed and scale give the same data
+        log: Progress callback, e.g. print
+
+    Returns:
+        Rows written per table and the elapsed seconds
+
+    Raises:
+        ValueError: If the database already has devices or users
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    today = date.today()
+    started = time.perf_counter()
+    counts = {}
+
+    with engine.begin() as connection:
+        for model in (models.Device, models.User):
+            if connection.execute(select(func.count()).select_from(model)).scalar():
+                raise ValueError(f"{model.__tablename__} is not empty; seed a fresh database")
+
+        counts["device_types"] = _insert(connection, models.DeviceType, (
+            {
+                "device_type_id": device_type_id,
+                "type_name": name,
+                "description": f"{name}s issued to staff",
+                "refresh_cycle_months": refresh_cycle_months,
+            }
+            for device_type_id, (name, refresh_cycle_months, _) in enumerate(DEVICE_TYPES, start=1)
+        ), log)
+        purchase_dates = {}
+        def purchases():
+            for row in _purchase_rows(rng, scale, today):
+                purchase_dates[row["purchase_id"]] = row["purchase_date"]
+                yield row
+        counts["purchases"] = _insert(connection, models.Purchase, purchases(), log)
+        counts["users"] = _insert(connection, models.User, _user_rows(rng, scale, today), log)
+
+        # Devices and their histories are generated together, since whether a device is
+        # checked out depends on its last assignment
+        per_device = scale.assignments / scale.devices
+        device_count = assignment_count = 0
+        for start_id in range(1, scale.devices + 1, SEED_BATCH_SIZE):
+            devices = []
+            assignments = []
+            for device_id in range(start_id, min(start_id + SEED_BATCH_SIZE, scale.devices + 1)):
+                device_type_id = rng.randrange(1, len(DEVICE_TYPES) + 1)
+                name, refresh_cycle_months, device_models = DEVICE_TYPES[device_type_id - 1]
+                purchase_id = rng.randrange(1, scale.purchases + 1)
+                purchase_date = purchase_dates[purchase_id]
+                age_months = (today - purchase_date).days / 30
+                retired = age_months > refresh_cycle_months and rng.random() < 0.7
+
+                # Between 0 and twice the average, so the total lands near the target
+                count = int(rng.uniform(0, 2 * per_device) + 0.5)
+                history = _device_history(rng, device_id, purchase_date, today, count, scale.users, retired)
+                assignments.extend(history)
+                devices.append({
+                    "device_id": device_id,
+                    "device_type_id": device_type_id,
+                    "serial_number": f"SN{device_id:09d}",
+                    "device_name": f"{name.upper()[:3]}-{device_id:06d}",
+                    "atera_link": None,
+                    "is_checked_out": bool(history) and history[-1]["actual_return_date"] is None,
+                    "purchase_id": purchase_id,
+                    "purchase_date": purchase_date,
+                    "refresh_cycle": f"{refresh_cycle_months} months",
+                    "headset_type": rng.choice(["Wired", "Wireless"]) if name == "Headset" else None,
+                    "is_retired": retired,
+                    "model": rng.choice(device_models),
+                    "warranty_expiration": purchase_date + timedelta(days=365 * rng.choice([1, 3, 5])),
+                    "notes": None,
+                })
+            connection.execute(insert(models.Device), devices)
+            for batch in _batched(iter(assignments), SEED_BATCH_SIZE):
+                connection.execute(insert(models.DeviceAssignment), batch)
+            device_count += len(devices)
+            assignment_count += len(assignments)
+            log(f"devices: {device_count}/{scale.devices}, assignments: {assignment_count}")
+        counts["devices"] = device_count
+        counts["device_assignments"] = assignment_count
+
+        if connection.dialect.name == "postgresql":
+            # Explicit keys leave the serial sequences behind
+            for table_name, key in (
+                ("device_types", "device_type_id"),
+                ("purchases", "purchase_id"),
+                ("users", "user_id"),
+                ("devices", "device_id"),
+                ("device_assignments", "assignment_id"),
+            ):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table_name}', '{key}'), "
+                    f"(SELECT max({key}) FROM {table_name}))"
+                ))
+
+    with Session(engine) as db:
+        rebuild_device_status_counters(db)
+        rebuild_purchase_spend_rollups(db)
+
+    # Refresh planner statistics for the new data
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE"))
+
+    counts["seconds"] = round(time.perf_counter() - started, 1)
+    return counts
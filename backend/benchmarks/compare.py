@@ -0,0 +1,49 @@
+import argparse
+import sys
+
+from .harness import load_results
+
+# Compares two benchmark result files by median time
+#
+#   python -m benchmarks.compare benchmarks/results/crud-sqlite-A.json benchmarks/results/crud-sqlite-B.json
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> int:
+    """Prints the median change per benchmark and returns the number of regressions."""
+    regressions = 0
+    names = list(baseline["results"]) + [name for name in candidate["results"] if name not in baseline["results"]]
+    width = max(len(name) for name in names)
+    print(f"baseline:  {baseline['meta'].get('git_commit')} {baseline['meta'].get('timestamp')}")
+    print(f"candidate: {candidate['meta'].get('git_commit')} {candidate['meta'].get('timestamp')}")
+    print(f"{'benchmark':<{width}}  {'baseline ms':>12}  {'candidate ms':>12}  {'change':>8}")
+    for name in names:
+        before = baseline["results"].get(name)
+        after = candidate["results"].get(name)
+        if before is None or after is None:
+            status = "added" if before is None else "removed"
+            value = (after or before)["median_ms"]
+            print(f"{name:<{width}}  {'-' if before is None else value:>12}  {'-' if after is None else value:>12}  {status:>8}")
+            continue
+        change = (after["median_ms"] - before["median_ms"]) / before["median_ms"] if before["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<{width}}  {before['median_ms']:>12.3f}  {after['median_ms']:>12.3f}  {change:>+8.1%}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("baseline", help="Result file of the reference run")
+    parser.add_argument("candidate", help="Result file of the run to check")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="Relative median slowdown reported as a regression (default: 0.10)"
+    )
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression")
+    args = parser.parse_args(argv)
+
+    regressions = compare(load_results(args.baseline), load_results(args.candidate), args.threshold)
+    return 1 if regressions and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
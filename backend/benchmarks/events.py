@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import sys
+
+from app.core.events import EventHub
+
+from .harness import measure, print_results, run_metadata, save_results
+
+# Event fan-out benchmarks
+#
+# Times handing one event to N idle stream subscribers through an EventHub: the publish
+# plus every subscriber waking up and reading the event from the shared ring buffer.
+# The subscribers are started before each call, outside the timing, and are waiting on
+# the hub when the event is published, as they are between events in the app.
+#
+#   python -m benchmarks.events run --subscribers 10 --subscribers 1000
+
+EVENT = {"type": "device.updated", "device_id": 1, "device_type_id": 1}
+
+def run_suite(args) -> dict:
+    loop = asyncio.new_event_loop()
+    hub = EventHub(args.buffer_size)
+    results = {}
+    waiting = []
+
+    def start_subscribers(count):
+        waiting[:] = [loop.create_task(hub.wait(hub.last_id, 60)) for _ in range(count)]
+        # Let every subscriber reach its wait
+        loop.run_until_complete(asyncio.sleep(0))
+
+    def fan_out():
+        hub.publish(EVENT)
+        received = loop.run_until_complete(asyncio.gather(*waiting))
+        assert all(len(events) == 1 for events in received)
+
+    try:
+        for count in args.subscribers:
+            name = f"fan_out[{count}]"
+            results[name] = measure(
+                fan_out, repeat=args.repeat, warmup=args.warmup, setup=lambda: start_subscribers(count)
+            )
+            print(f"{name}: {results[name]['median_ms']} ms")
+    finally:
+        loop.close()
+
+    meta = run_metadata("events", repeat=args.repeat, warmup=args.warmup, buffer_size=args.buffer_size)
+    path = save_results(meta, results)
+    print_results(results)
+    print(f"Saved {path}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.events")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the event fan-out benchmarks and save the results")
+    run_parser.add_argument(
+        "--subscribers", type=int, action="append",
+        help="Idle subscribers per benchmark; repeat for several (default: 1, 100, 1000, 10000)"
+    )
+    run_parser.add_argument("--buffer-size", type=int, default=1024, help="Hub ring buffer size (default: 1024)")
+    run_parser.add_argument("--repeat", type=int, default=20, help="Timed calls per benchmark (default: 20)")
+    run_parser.add_argument("--warmup", type=int, default=2, help="Untimed calls per benchmark (default: 2)")
+    args = parser.parse_args(argv)
+    args.subscribers = args.subscribers or [1, 100, 1000, 10000]
+    run_suite(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# Timing harness shared by the benchmark suites
+#
+# Each benchmark is timed call by call after a warmup, with the SQL statements it
+# runs counted on the engine. A suite's results are written as one JSON file per run
+# (suite, dialect, timestamp) under benchmarks/results so that runs can be compared
+# with `python -m benchmarks.compare`.
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+class QueryCounter:
+    """Counts statements executed on an engine while active."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+
+def summarize(samples: list, queries: int) -> dict:
+    """Milliseconds statistics for a list of per-call durations in seconds."""
+    milliseconds = sorted(sample * 1000 for sample in samples)
+    return {
+        "runs": len(milliseconds),
+        "min_ms": round(milliseconds[0], 3),
+        "median_ms": round(statistics.median(milliseconds), 3),
+        "p95_ms": round(milliseconds[min(int(len(milliseconds) * 0.95), len(milliseconds) - 1)], 3),
+        "mean_ms": round(statistics.fmean(milliseconds), 3),
+        "queries_per_call": round(queries / len(milliseconds), 2),
+    }
+
+def measure(function: Callable[[], object], engine: Optional[Engine] = None, repeat: int = 20,
+            warmup: int = 2, setup: Optional[Callable[[], object]] = None) -> dict:
+    """
+    Times repeated calls of a function.
+
+    Args:
+        function: Called with no arguments
+        engine: Engine whose statements are counted, if any
+        repeat: Timed calls
+        warmup: Untimed calls made first
+        setup: Called before every call, outside the timing
+
+    Returns:
+        Summary statistics as returned by summarize()
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        function()
+
+    samples = []
+    queries = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        if engine is not None:
+            with QueryCounter(engine) as counter:
+                started = time.perf_counter()
+                function()
+                samples.append(time.perf_counter() - started)
+            queries += counter.count
+        else:
+            started = time.perf_counter()
+            function()
+            samples.append(time.perf_counter() - started)
+    return summarize(samples, queries)
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_metadata(suite: str, database_url: Optional[str] = None, **extra) -> dict:
+    meta = {
+        "suite": suite,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    if database_url is not None:
+        url = make_url(database_url)
+        meta["dialect"] = url.get_backend_name()
+        meta["database"] = url.render_as_string(hide_password=True)
+    meta.update(extra)
+    return meta
+
+def save_results(meta: dict, results: Dict[str, dict], directory: Path = RESULTS_DIR) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = meta["timestamp"].replace(":", "").replace("-", "").replace("+0000", "Z")
+    name = "-".join(part for part in (meta["suite"], meta.get("dialect"), stamp) if part)
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps({"meta": meta, "results": results}, indent=2) + "\n")
+    return path
+
+def load_results(path: Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+def print_results(results: Dict[str, dict]):
+    width = max((len(name) for name in results), default=10)
+    print(f"{'benchmark':<{width}}  {'median ms':>10}  {'p95 ms':>10}  {'queries':>8}")
+    for name, stats in results.items():
+        print(f"{name:<{width}}  {stats['median_ms']:>10.3f}  {stats['p95_ms']:>10.3f}  "
+              f"{stats.get('queries_per_call', 0):>8}")
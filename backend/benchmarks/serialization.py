@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+from .harness import measure, print_results, run_metadata, save_results
+
+# Benchmarks for serializing device listings to a JSON response body
+#
+# Compares, at several page sizes, the ways a list endpoint can turn rows into JSON:
+#
+#   legacy      ORM objects, validated into response models, jsonable_encoder, json.dumps
+#   validated   ORM objects, validated into response models, Pydantic's dump_json
+#   constructed ORM objects, models built without validation, Pydantic's dump_json
+#   rows        Core rows of the schema's columns dumped with orjson (rows_response)
+#
+# Each approach is timed twice: serialization alone, on rows fetched beforehand, and
+# fetch plus serialization as an endpoint would run it.
+#
+#   python -m benchmarks.serialization run --database-url sqlite:///benchmarks/bench.sqlite
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_DATABASE_URL = f"sqlite:///{BENCH_DIR / 'bench.sqlite'}"
+DEFAULT_SIZES = (100, 1000, 10000)
+
+def run_suite(args) -> dict:
+    # The app reads DATABASE_URL once per process, so it is set before the app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from typing import List
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import func, select
+    from app import commands, models, schemas
+    from app.crud.loading import schema_columns
+    from app.database import SessionLocal, engine
+    from app.utils.responses import dumps
+    from app.utils.seed import SeedScale, seed_database
+
+    commands.main(["migrate"])
+    with SessionLocal() as db:
+        devices = db.scalar(select(func.count()).select_from(models.Device))
+        if not devices:
+            # At least enough devices for the largest listing
+            scale = max(args.scale, max(args.sizes) / SeedScale().devices)
+            print(f"Seeding {args.database_url} at scale {scale}")
+            print(seed_database(engine, SeedScale.scaled(scale), log=print))
+            devices = db.scalar(select(func.count()).select_from(models.Device))
+        if devices < max(args.sizes):
+            print(f"Only {devices} devices; larger listings return them all")
+
+    adapter = TypeAdapter(List[schemas.Device])
+    columns = schema_columns(models.Device, schemas.Device)
+
+    def fetch_objects(size):
+        with SessionLocal() as db:
+            return db.query(models.Device).order_by(models.Device.device_id).limit(size).all()
+
+    def fetch_rows(size):
+        with SessionLocal() as db:
+            return db.query(*columns).order_by(models.Device.device_id).limit(size).all()
+
+    def legacy(objects):
+        return json.dumps(jsonable_encoder(adapter.validate_python(objects, from_attributes=True))).encode("utf-8")
+
+    def validated(objects):
+        return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+    def constructed(objects):
+        return adapter.dump_json([
+            schemas.Device.model_construct(**{name: getattr(obj, name) for name in schemas.Device.model_fields})
+            for obj in objects
+        ])
+
+    def rows(result):
+        return dumps([row._asdict() for row in result])
+
+    approaches = {
+        "legacy": (fetch_objects, legacy),
+        "validated": (fetch_objects, validated),
+        "constructed": (fetch_objects, constructed),
+        "rows": (fetch_rows, rows),
+    }
+
+    results = {}
+    for size in args.sizes:
+        repeat = max(args.repeat * 100 // size, 3)
+        for name, (fetch, serialize) in approaches.items():
+            fetched = fetch(size)
+            results[f"{name}[{size}]"] = measure(
+                lambda: serialize(fetched), repeat=repeat, warmup=args.warmup
+            )
+            results[f"{name}+fetch[{size}]"] = measure(
+                lambda: serialize(fetch(size)), engine, repeat=repeat, warmup=args.warmup
+            )
+            print(f"{name}[{size}]: {results[f'{name}[{size}]']['median_ms']} ms, "
+                  f"with fetch {results[f'{name}+fetch[{size}]']['median_ms']} ms")
+
+    meta = run_metadata(
+        "serialization", args.database_url, rows={"devices": devices}, sizes=args.sizes,
+        repeat=args.repeat, warmup=args.warmup
+    )
+    path = save_results(meta, results)
+    print_results(results)
+    print(f"Saved {path}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the serialization benchmarks and save the results")
+    run_parser.add_argument(
+        "--database-url", default=DEFAULT_DATABASE_URL,
+        help=f"Database to read devices from (default: {DEFAULT_DATABASE_URL})"
+    )
+    run_parser.add_argument(
+        "--scale", type=float, default=0.1,
+        help="Seed scale for an empty database, see `python -m app.commands seed` (default: 0.1)"
+    )
+    run_parser.add_argument(
+        "--size", type=int, action="append", dest="sizes",
+        help=f"Rows per listing; repeat for several (default: {', '.join(map(str, DEFAULT_SIZES))})"
+    )
+    run_parser.add_argument(
+        "--repeat", type=int, default=20,
+        help="Timed calls at 100 rows, scaled down for larger listings (default: 20)"
+    )
+    run_parser.add_argument("--warmup", type=int, default=1, help="Untimed calls per benchmark (default: 1)")
+    args = parser.parse_args(argv)
+    args.sizes = args.sizes or list(DEFAULT_SIZES)
+    run_suite(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
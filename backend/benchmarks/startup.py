@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from .harness import measure, print_results, run_metadata, save_results
+
+# Startup benchmarks
+#
+# Times what a fresh worker process pays before it can serve: importing app.main, and
+# importing it plus running the lifespan startup (the connectivity check) to answer
+# /healthz. Every call is a new interpreter, so nothing is cached between calls; the
+# cost of starting an empty interpreter is measured too, to subtract. The modules with
+# the largest cumulative import time, from `python -X importtime`, are saved alongside.
+#
+#   python -m benchmarks.startup run --database-url sqlite:///benchmarks/bench.sqlite
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_DATABASE_URL = f"sqlite:///{BENCH_DIR / 'bench.sqlite'}"
+
+STARTUP_SCRIPT = """
+from fastapi.testclient import TestClient
+from app.main import app
+with TestClient(app) as client:
+    assert client.get("/healthz").status_code == 200
+"""
+
+# Reports whether importing the app had side effects it should not have
+SIDE_EFFECTS_SCRIPT = """
+import json
+import app.main
+from app import database
+print(json.dumps({
+    "engine_created_at_import": database._engine is not None,
+    "async_engine_created_at_import": database._async_engine is not None,
+}))
+"""
+
+def _python(code: str, env: dict, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code], cwd=BENCH_DIR.parent, env=env,
+        capture_output=True, text=True, check=True
+    )
+
+def slowest_imports(env: dict, count: int) -> list:
+    """The modules with the largest cumulative import time when importing app.main."""
+    modules = []
+    for line in _python("import app.main", env, "-X", "importtime").stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        modules.append((int(parts[1]), parts[2].strip()))
+    modules.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(micros / 1000, 2)} for micros, name in modules[:count]]
+
+def run_suite(args) -> dict:
+    env = dict(os.environ, DATABASE_URL=args.database_url)
+    results = {}
+
+    def bench(name, code):
+        results[name] = measure(lambda: _python(code, env), repeat=args.repeat, warmup=args.warmup)
+        print(f"{name}: {results[name]['median_ms']} ms")
+
+    bench("interpreter", "pass")
+    bench("import app.main", "import app.main")
+    bench("startup /healthz", STARTUP_SCRIPT)
+
+    side_effects = json.loads(_python(SIDE_EFFECTS_SCRIPT, env).stdout.strip().splitlines()[-1])
+    print(side_effects)
+    meta = run_metadata(
+        "startup", args.database_url, repeat=args.repeat, warmup=args.warmup,
+        slowest_imports=slowest_imports(env, args.top), **side_effects
+    )
+    path = save_results(meta, results)
+    print_results(results)
+    for entry in meta["slowest_imports"]:
+        print(f"{entry['cumulative_ms']:>10.2f} ms  {entry['module']}")
+    print(f"Saved {path}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the startup benchmarks and save the results")
+    run_parser.add_argument(
+        "--database-url", default=DEFAULT_DATABASE_URL,
+        help=f"Database the startup check connects to (default: {DEFAULT_DATABASE_URL})"
+    )
+    run_parser.add_argument("--repeat", type=int, default=10, help="Timed process starts per benchmark (default: 10)")
+    run_parser.add_argument("--warmup", type=int, default=1, help="Untimed process starts per benchmark (default: 1)")
+    run_parser.add_argument("--top", type=int, default=15, help="Slowest imports to record (default: 15)")
+    args = parser.parse_args(argv)
+    run_suite(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
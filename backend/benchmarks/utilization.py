@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from .harness import measure, print_results, run_metadata, save_results
+
+# Benchmarks for the fleet utilization report
+#
+# Times the two implementations in app/crud/utilization.py against each other over
+# ranges of increasing length, for all device types and for one: the event sweep
+# (grouped loan endpoints plus a NumPy cumulative sum) and the set-based SQL join of
+# generated days against the loan intervals. Both must return the same series.
+#
+#   python -m benchmarks.utilization run --database-url sqlite:///benchmarks/bench.sqlite
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_DATABASE_URL = f"sqlite:///{BENCH_DIR / 'bench.sqlite'}"
+DEFAULT_RANGES = (90, 365, 730)
+
+def run_suite(args) -> dict:
+    # The app reads DATABASE_URL once per process, so it is set before the app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from sqlalchemy import func, select
+    from app import commands, crud, models
+    from app.database import get_engine, get_sessionmaker
+    from app.utils.seed import SeedScale, seed_database
+
+    commands.main(["migrate"])
+    engine = get_engine()
+    with get_sessionmaker()() as db:
+        if not db.scalar(select(func.count()).select_from(models.Device)):
+            print(f"Seeding {args.database_url} at scale {args.scale}")
+            print(seed_database(engine, SeedScale.scaled(args.scale), log=print))
+        assignments = db.scalar(select(func.count()).select_from(models.DeviceAssignment))
+        device_type_id = db.scalar(select(models.DeviceType.device_type_id).limit(1))
+
+    implementations = {
+        "sweep": crud.get_utilization_series_sweep,
+        "sql": crud.get_utilization_series_sql,
+    }
+    end = date.today()
+    results = {}
+    for days in args.ranges:
+        start = end - timedelta(days=days - 1)
+        for scope, type_id in (("all", None), ("type", device_type_id)):
+            series = {}
+            for name, implementation in implementations.items():
+                def call(implementation=implementation):
+                    with get_sessionmaker()() as db:
+                        return implementation(db, start, end, device_type_id=type_id)
+                key = f"{name}[{days}d,{scope}]"
+                results[key] = measure(call, engine, repeat=args.repeat, warmup=args.warmup)
+                series[name] = call()
+                print(f"{key}: {results[key]['median_ms']} ms")
+            if series["sweep"] != series["sql"]:
+                raise SystemExit(f"Implementations disagree over {days} days ({scope})")
+
+    meta = run_metadata(
+        "utilization", args.database_url, rows={"device_assignments": assignments}, ranges=args.ranges,
+        repeat=args.repeat, warmup=args.warmup
+    )
+    path = save_results(meta, results)
+    print_results(results)
+    print(f"Saved {path}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.utilization")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the utilization benchmarks and save the results")
+    run_parser.add_argument(
+        "--database-url", default=DEFAULT_DATABASE_URL,
+        help=f"Database to report on (default: {DEFAULT_DATABASE_URL})"
+    )
+    run_parser.add_argument(
+        "--scale", type=float, default=0.1,
+        help="Seed scale for an empty database, see `python -m app.commands seed` (default: 0.1)"
+    )
+    run_parser.add_argument(
+        "--days", type=int, action="append", dest="ranges",
+        help=f"Days in the report range; repeat for several (default: {', '.join(map(str, DEFAULT_RANGES))})"
+    )
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timed calls per benchmark (default: 5)")
+    run_parser.add_argument("--warmup", type=int, default=1, help="Untimed calls per benchmark (default: 1)")
+    args = parser.parse_args(argv)
+    args.ranges = args.ranges or list(DEFAULT_RANGES)
+    run_suite(args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
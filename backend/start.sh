@@ -26,11 +26,11 @@ until postgres_ready; do
 done
 >&2 echo "PostgreSQL is available"
 
-# Initialize the database
-python -c "from app.database import Base, engine; Base.metadata.create_all(engine)"
+# Apply database migrations
+python -m app.commands migrate
 
 # Run any additional startup commands here
-# For example, loading initial data or running migrations
+# For example, loading initial data
 
 # Start the application
 exec uvicorn app.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
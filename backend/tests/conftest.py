@@ -0,0 +1,81 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite database before anything imports app.database
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+import pytest
+from sqlalchemy import event, func
+
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app import crud  # noqa: F401  (registers the search index DDL)
+from app.crud.principal import get_principal_cache
+from app.crud.reports import get_report_cache
+from app.database import Base, SessionLocal, engine
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    # The caches outlive the tables, so one test's entries would answer the next
+    get_report_cache().clear()
+    get_principal_cache().clear()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    """Test client for the app, on the same database as the db fixture."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_queries():
+    """Returns a counter of the SQL statements executed on the engine while the test runs."""
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture
+def device_counts(db):
+    """Returns a function giving the device counts per status, from the counter rows and from the devices."""
+    def counts():
+        counters = {
+            (type_id, checked_out, retired): count
+            for type_id, checked_out, retired, count in db.query(
+                models.DeviceStatusCounter.device_type_id,
+                models.DeviceStatusCounter.is_checked_out,
+                models.DeviceStatusCounter.is_retired,
+                models.DeviceStatusCounter.device_count,
+            )
+            if count
+        }
+        key = (models.Device.device_type_id, models.Device.is_checked_out, models.Device.is_retired)
+        devices = {tuple(row[:3]): row[3] for row in db.query(*key, func.count()).group_by(*key)}
+        return counters, devices
+    return counts
@@ -0,0 +1,185 @@
+import pytest
+from sqlalchemy import event
+
+from app import crud, models, schemas
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def stock(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    bob = models.User(first_name="Bob", last_name="User", username="bob", email="bob@example.com")
+    db.add_all([laptop, bob])
+    db.commit()
+    device_ids = [
+        crud.create_device(
+            db, schemas.DeviceCreate(device_type_id=laptop.device_type_id, serial_number=f"SN-{i}")
+        ).device_id
+        for i in range(5)
+    ]
+    return {"user": bob.user_id, "devices": device_ids}
+
+
+def _check_out(db, user_id, *device_ids):
+    return crud.create_assignments(db, schemas.DeviceBatchCheckout(user_id=user_id, device_ids=list(device_ids)))
+
+
+def _return(db, *assignment_ids):
+    return crud.return_devices(db, schemas.DeviceBatchReturn(assignment_ids=list(assignment_ids)))
+
+
+def _checked_out(db):
+    return {device_id for (device_id,) in db.query(models.Device.device_id).filter(models.Device.is_checked_out)}
+
+
+def test_device_cannot_be_checked_out_twice(db, stock, device_counts):
+    device_id = stock["devices"][0]
+    crud.create_assignment(db, schemas.DeviceAssignmentCreate(device_id=device_id, user_id=stock["user"]))
+
+    with pytest.raises(crud.AssignmentConflictError):
+        crud.create_assignment(db, schemas.DeviceAssignmentCreate(device_id=device_id, user_id=stock["user"]))
+    with pytest.raises(crud.AssignmentConflictError) as conflict:
+        _check_out(db, stock["user"], device_id)
+
+    assert conflict.value.errors == [{"id": device_id, "error": "Device is already checked out"}]
+    assert db.query(models.DeviceAssignment).count() == 1
+    counters, devices = device_counts()
+    assert counters == devices
+
+
+def test_checkout_loses_to_a_concurrent_checkout(db, stock, device_counts):
+    first, second = stock["devices"][:2]
+
+    # Another session checks the device out after this batch read it as available,
+    # just before the batch flips the devices
+    def concurrent_checkout(state):
+        if state.is_update and not concurrent:
+            concurrent.append(True)
+            other = SessionLocal()
+            try:
+                _check_out(other, stock["user"], second)
+            finally:
+                other.close()
+    concurrent = []
+    event.listen(db, "do_orm_execute", concurrent_checkout)
+
+    with pytest.raises(crud.AssignmentConflictError) as conflict:
+        _check_out(db, stock["user"], first, second)
+
+    event.remove(db, "do_orm_execute", concurrent_checkout)
+    assert conflict.value.errors == [{"id": second, "error": "Device is already checked out"}]
+    assert _checked_out(db) == {second}
+    assert db.query(models.DeviceAssignment).count() == 1
+    counters, devices = device_counts()
+    assert counters == devices
+
+
+@pytest.mark.parametrize("concurrent_write, detail", [
+    ("checkout", "Device is already checked out"),
+    ("retire", "Cannot assign a retired device"),
+])
+def test_checkout_reports_why_it_lost_a_race(client, db, stock, device_counts, concurrent_write, detail):
+    device_id = stock["devices"][0]
+
+    # Another session changes the device after the endpoint checked it, just before the
+    # checkout flips it
+    def concurrent_change(state):
+        if state.is_update and not concurrent:
+            concurrent.append(True)
+            other = SessionLocal()
+            try:
+                if concurrent_write == "checkout":
+                    _check_out(other, stock["user"], device_id)
+                else:
+                    crud.retire_device(other, device_id)
+            finally:
+                other.close()
+    concurrent = []
+    event.listen(SessionLocal, "do_orm_execute", concurrent_change)
+    try:
+        response = client.post("/assignments/", json={"device_id": device_id, "user_id": stock["user"]})
+    finally:
+        event.remove(SessionLocal, "do_orm_execute", concurrent_change)
+
+    assert concurrent
+    assert response.status_code == 409
+    assert response.json()["detail"] == detail
+    db.expire_all()
+    counters, devices = device_counts()
+    assert counters == devices
+
+
+def test_retired_device_cannot_be_checked_out(client, db, stock):
+    device_id = stock["devices"][0]
+    crud.retire_device(db, device_id)
+
+    with pytest.raises(crud.AssignmentConflictError):
+        crud.create_assignment(db, schemas.DeviceAssignmentCreate(device_id=device_id, user_id=stock["user"]))
+    with pytest.raises(crud.AssignmentConflictError) as conflict:
+        _check_out(db, stock["user"], device_id)
+    response = client.post("/assignments/", json={"device_id": device_id, "user_id": stock["user"]})
+
+    assert conflict.value.errors == [{"id": device_id, "error": "Cannot assign a retired device"}]
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cannot assign a retired device"
+    assert db.query(models.DeviceAssignment).count() == 0
+
+
+@pytest.mark.parametrize("extra, error", [
+    ("duplicate", "Device is listed more than once"),
+    ("missing", "Device not found"),
+])
+def test_batch_checkout_is_all_or_nothing(client, db, stock, device_counts, extra, error):
+    device_ids = stock["devices"][:3]
+    bad_id = device_ids[1] if extra == "duplicate" else 9999
+    before = device_counts()
+
+    response = client.post("/assignments/batch", json={"user_id": stock["user"], "device_ids": [*device_ids, bad_id]})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == [{"id": bad_id, "error": error}]
+    db.expire_all()
+    assert db.query(models.DeviceAssignment).count() == 0
+    assert _checked_out(db) == set()
+    assert device_counts() == before
+
+
+def test_batch_checkout_and_return(db, stock, device_counts):
+    assignments = _check_out(db, stock["user"], *stock["devices"][:3])
+
+    assert [assignment.device_id for assignment in assignments] == stock["devices"][:3]
+    assert _checked_out(db) == set(stock["devices"][:3])
+    counters, devices = device_counts()
+    assert counters == devices
+
+    returned = _return(db, assignments[0].assignment_id, assignments[2].assignment_id)
+
+    assert [assignment.assignment_id for assignment in returned] == [
+        assignments[0].assignment_id, assignments[2].assignment_id
+    ]
+    assert all(assignment.actual_return_date is not None for assignment in returned)
+    assert _checked_out(db) == {stock["devices"][1]}
+    counters, devices = device_counts()
+    assert counters == devices
+
+
+def test_batch_return_is_all_or_nothing(db, stock, device_counts):
+    assignments = _check_out(db, stock["user"], *stock["devices"][:2])
+    _return(db, assignments[0].assignment_id)
+    before = device_counts()
+
+    with pytest.raises(crud.AssignmentConflictError) as conflict:
+        _return(db, assignments[1].assignment_id, assignments[0].assignment_id, 9999)
+
+    assert conflict.value.errors == [
+        {"id": assignments[0].assignment_id, "error": "Device has already been returned"},
+        {"id": 9999, "error": "Assignment not found"},
+    ]
+    db.expire_all()
+    assert _checked_out(db) == {stock["devices"][1]}
+    assert db.query(models.DeviceAssignment).filter(models.DeviceAssignment.actual_return_date == None).count() == 1
+    assert device_counts() == before
+
+    with pytest.raises(crud.AssignmentConflictError):
+        crud.return_device(db, assignments[0].assignment_id, schemas.DeviceReturn())
+    assert device_counts() == before
@@ -0,0 +1,147 @@
+import pytest
+from sqlalchemy import event
+
+from app import crud, models, schemas
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def laptop(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    db.add(laptop)
+    db.commit()
+    crud.create_device(db, schemas.DeviceCreate(device_type_id=laptop.device_type_id, serial_number="SN-EXISTING"))
+    return laptop.device_type_id
+
+
+def _upload(client, path, text, name="import.csv"):
+    return client.post(path, files={"file": (name, text.encode(), "text/csv")})
+
+
+def test_device_import_reports_bad_rows(client, db, laptop, device_counts):
+    text = "\n".join([
+        "serial_number,device_type_id,device_name",
+        f"SN-1,{laptop},ok",
+        f"SN-EXISTING,{laptop},registered before",
+        f"SN-1,{laptop},repeated in the file",
+        "SN-2,999,unknown type",
+        "SN-3,not-a-number,invalid",
+        ",1,no serial",
+        f"SN-4,{laptop},ok,extra",
+        f"SN-5,{laptop},ok",
+    ])
+
+    response = _upload(client, "/devices/bulk", text)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2
+    assert result["failed"] == 6
+    errors = {error["row"]: error for error in result["errors"]}
+    assert sorted(errors) == [3, 4, 5, 6, 7, 8]
+    assert errors[3]["error"] == errors[4]["error"] == "Serial number already registered"
+    assert errors[5]["error"] == "Device type not found"
+    assert errors[6]["error"].startswith("device_type_id:")
+    assert errors[7]["error"].startswith("serial_number:")
+    assert errors[8]["error"] == "Row has more values than the header"
+    assert {serial for (serial,) in db.query(models.Device.serial_number)} == {"SN-EXISTING", "SN-1", "SN-5"}
+    counters, devices = device_counts()
+    assert counters == devices
+
+
+def test_device_import_rejects_unknown_format(client):
+    response = client.post("/devices/bulk", files={"file": ("devices.xlsx", b"", "application/octet-stream")})
+
+    assert response.status_code == 400
+
+
+def test_device_import_falls_back_to_savepoints(db, laptop, device_counts):
+    # Another writer registers SN-2 after the chunk was checked but before its insert
+    inserted = []
+
+    def concurrent_insert(state):
+        if state.is_insert and state.statement.table.name == "devices" and not inserted:
+            inserted.append(True)
+            other = SessionLocal()
+            try:
+                crud.create_device(other, schemas.DeviceCreate(device_type_id=laptop, serial_number="SN-2"))
+            finally:
+                other.close()
+    event.listen(db, "do_orm_execute", concurrent_insert)
+    rows = [(number, {"serial_number": f"SN-{number}", "device_type_id": laptop}, None) for number in range(1, 5)]
+    result = crud.bulk_create_devices(db, rows, chunk_size=10)
+
+    assert result["created"] == 3
+    assert [(error["row"], error["serial_number"]) for error in result["errors"]] == [(2, "SN-2")]
+    assert result["errors"][0]["error"].startswith("Could not insert device")
+    assert db.query(models.Device).count() == 5
+    counters, devices = device_counts()
+    assert counters == devices
+
+
+def test_device_import_commits_each_chunk(db, laptop):
+    rows = [(number, {"serial_number": f"SN-{number}", "device_type_id": laptop}, None) for number in range(1, 8)]
+    rows.insert(3, (99, {"serial_number": "SN-1", "device_type_id": laptop}, None))
+
+    result = crud.bulk_create_devices(db, rows, chunk_size=3)
+
+    assert result["created"] == 7
+    assert [(error["row"], error["error"]) for error in result["errors"]] == [(99, "Serial number already registered")]
+
+
+def _user_row(name, **fields):
+    return {"first_name": name.title(), "last_name": "User", "username": name, "email": f"{name}@example.com", **fields}
+
+
+def test_user_import_reports_bad_rows(client, db):
+    db.add(models.User(**_user_row("taken")))
+    db.commit()
+    text = "\n".join([
+        "first_name,last_name,username,email,password",
+        "Ann,User,ann,ann@example.com,secret",
+        "Tak,User,taken,other@example.com,",
+        "Ann,Again,ann,ann2@example.com,",
+        "Cy,User,cy,ann@example.com,",
+        "Di,User,di,not-an-email,",
+        "Ed,,ed,ed@example.com,",
+        "Flo,User,flo,flo@example.com,",
+    ])
+
+    response = _upload(client, "/users/bulk", text)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2
+    errors = {error["row"]: error for error in result["errors"]}
+    assert sorted(errors) == [3, 4, 5, 6, 7]
+    assert errors[3]["error"] == errors[4]["error"] == "Username already registered"
+    assert errors[5]["error"] == "Email already registered"
+    assert errors[6]["error"].startswith("email:")
+    assert errors[7]["error"].startswith("last_name:")
+    users = {user.username: user for user in db.query(models.User)}
+    assert set(users) == {"taken", "ann", "flo"}
+    assert users["ann"].password_hash and users["ann"].password_hash != "secret"
+    assert users["flo"].password_hash is None
+
+
+def test_user_import_falls_back_to_savepoints(db):
+    # Another writer registers bob after the chunk was checked but before its insert
+    inserted = []
+
+    def concurrent_insert(state):
+        if state.is_insert and state.statement.table.name == "users" and not inserted:
+            inserted.append(True)
+            other = SessionLocal()
+            try:
+                crud.create_user(other, schemas.UserCreate(**_user_row("bob")))
+            finally:
+                other.close()
+    event.listen(db, "do_orm_execute", concurrent_insert)
+    rows = [(number, _user_row(name), None) for number, name in enumerate(["ann", "bob", "cy"], start=1)]
+
+    result = crud.bulk_create_users(db, rows)
+
+    assert result["created"] == 2
+    assert [(error["row"], error["username"]) for error in result["errors"]] == [(2, "bob")]
+    assert result["errors"][0]["error"].startswith("Could not insert user")
+    assert db.query(models.User).count() == 3
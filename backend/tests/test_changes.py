@@ -0,0 +1,106 @@
+from decimal import Decimal
+
+import pytest
+
+from sqlalchemy import func
+
+from app import crud, models, schemas
+from app.core.config import get_settings
+from app.crud.pagination import encode_cursor
+
+
+@pytest.fixture(autouse=True)
+def settle(monkeypatch):
+    """Sets CHANGE_FEED_SETTLE_SECONDS for the test; changes are handed out at once by default."""
+    def set_settle(seconds):
+        monkeypatch.setattr(get_settings(), "CHANGE_FEED_SETTLE_SECONDS", seconds)
+    set_settle(0)
+    return set_settle
+
+
+def _add_types(db, count, modified=None):
+    types = [models.DeviceType(type_name=f"Type {i}") for i in range(count)]
+    db.add_all(types)
+    db.commit()
+    if modified is not None:
+        # Stamped by the database, in the format its CURRENT_TIMESTAMP defaults use
+        db.query(models.DeviceType).update({"last_modified_date": func.datetime(modified)})
+        db.commit()
+    return [device_type.device_type_id for device_type in types]
+
+
+def _sync(db, since=None, limit=100):
+    """Reads the device type feed until has_more is false, returning the pages."""
+    pages = []
+    while True:
+        page = crud.get_changes(db, since=since, entities=["device_types"], limit=limit)
+        pages.append(page)
+        since = page["next"]
+        if not page["has_more"]:
+            return pages
+
+
+def test_ties_on_last_modified_are_split_across_pages(db):
+    # Every row has the same timestamp, so pages resume by primary key within it
+    type_ids = _add_types(db, 7, modified="2024-01-01 12:00:00")
+
+    pages = _sync(db, limit=3)
+
+    assert [len(page["changes"]) for page in pages] == [3, 3, 1]
+    assert [change["id"] for page in pages for change in page["changes"]] == type_ids
+    assert all(change["action"] == "updated" for page in pages for change in page["changes"])
+
+
+def test_has_more_is_set_while_a_page_is_full(db):
+    _add_types(db, 4)
+
+    first = crud.get_changes(db, entities=["device_types"], limit=2)
+    second = crud.get_changes(db, since=first["next"], entities=["device_types"], limit=2)
+    last = crud.get_changes(db, since=second["next"], entities=["device_types"], limit=2)
+
+    assert first["has_more"] and second["has_more"]
+    assert last == {"changes": [], "next": second["next"], "has_more": False}
+
+
+def test_recent_changes_are_held_back_until_they_settle(db, settle):
+    older = _add_types(db, 2, modified="2024-01-01 00:00:00")
+    recent = crud.create_device_type(db, schemas.DeviceTypeCreate(type_name="Recent")).device_type_id
+
+    settle(60)
+    (page,) = _sync(db)
+    assert [change["id"] for change in page["changes"]] == older
+
+    # Once it is older than the settle window the next sync delivers it, and only it
+    settle(0)
+    (page,) = _sync(db, since=page["next"])
+    assert [(change["id"], change["action"]) for change in page["changes"]] == [(recent, "created")]
+
+
+def test_end_states_come_through_as_actions(db):
+    laptop = _add_types(db, 1)[0]
+    device_id = crud.create_device(db, schemas.DeviceCreate(device_type_id=laptop, serial_number="SN-1")).device_id
+    crud.retire_device(db, device_id)
+
+    page = crud.get_changes(db, entities=["devices"])
+
+    assert [(change["id"], change["action"]) for change in page["changes"]] == [(device_id, "retired")]
+
+
+def test_feed_over_the_api(client, db):
+    crud.create_purchase(db, schemas.PurchaseCreate(purchase_order="PO-1", total_amount=Decimal("10.50")))
+
+    response = client.get("/changes/", params={"entities": "purchases"})
+
+    assert response.status_code == 200
+    (change,) = response.json()["changes"]
+    assert change["data"]["total_amount"] == "10.50"
+
+
+@pytest.mark.parametrize("params", [
+    {"since": "garbage"},
+    {"since": encode_cursor("2024-01-01T00:00:00", 1)},
+    {"entities": "devices,widgets"},
+    {"limit": 0},
+])
+def test_bad_parameters_are_400(client, params):
+    assert client.get("/changes/", params=params).status_code == 400
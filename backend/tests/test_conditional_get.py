@@ -0,0 +1,117 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app import crud, models, schemas
+from app.database import get_async_engine
+
+
+@pytest.fixture
+def devices(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    db.add(laptop)
+    db.commit()
+    return [
+        crud.create_device(db, schemas.DeviceCreate(device_type_id=laptop.device_type_id, serial_number=f"SN-{i}"))
+        .device_id
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def listing_queries():
+    """The SELECT statements the listing endpoints run on the async engine while the test runs."""
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+    sync_engine = get_async_engine().sync_engine
+    event.listen(sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", record)
+
+
+def _revalidate(client, path, etag):
+    return client.get(path, headers={"If-None-Match": etag})
+
+
+def test_unchanged_listing_is_304(client, devices):
+    etag = client.get("/devices/").headers["ETag"]
+
+    response = _revalidate(client, "/devices/", etag)
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_update_that_keeps_count_and_newest_timestamp_is_200(client, db, devices):
+    # The other row carries the newest timestamp, as a row updated later in the same
+    # second would on SQLite, so the update leaves the count and the maximum alone
+    for device_id, modified in zip(devices, [datetime(2024, 1, 1), datetime(2100, 1, 1)]):
+        db.query(models.Device).filter(models.Device.device_id == device_id).update({"last_modified_date": modified})
+    db.commit()
+    etag = client.get("/devices/").headers["ETag"]
+
+    crud.update_device(db, devices[0], schemas.DeviceUpdate(device_name="renamed"))
+    response = _revalidate(client, "/devices/", etag)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert {device["device_name"] for device in response.json()} == {"renamed", None}
+
+
+def test_insert_changes_listing_version(client, db, devices):
+    etag = client.get("/devices/").headers["ETag"]
+    device_type_id = db.query(models.DeviceType.device_type_id).scalar()
+
+    crud.create_device(db, schemas.DeviceCreate(device_type_id=device_type_id, serial_number="SN-new"))
+
+    assert _revalidate(client, "/devices/", etag).status_code == 200
+
+
+def test_listing_page_costs_one_query(client, devices, listing_queries):
+    etag = client.get("/devices/").headers["ETag"]
+    plain = len(listing_queries)
+    listing_queries.clear()
+    unchanged = _revalidate(client, "/devices/", etag)
+    revalidated = len(listing_queries)
+
+    assert plain == 1
+    assert unchanged.status_code == 304
+    assert revalidated == 1
+    assert not any("count(" in statement.lower() for statement in listing_queries)
+
+
+def test_page_version_ignores_rows_off_the_page(client, db, devices):
+    device_type_id = db.query(models.DeviceType.device_type_id).scalar()
+    for i in range(3):
+        crud.create_device(db, schemas.DeviceCreate(device_type_id=device_type_id, serial_number=f"SN-more-{i}"))
+    first = client.get("/devices/", params={"limit": 2})
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get("/devices/", params={"limit": 2, "cursor": cursor})
+
+    # A change beyond the first page leaves it alone, and shows on the page that holds it
+    crud.update_device(db, second.json()[0]["device_id"], schemas.DeviceUpdate(device_name="renamed"))
+    db.query(models.Device).filter(models.Device.device_id == second.json()[0]["device_id"]).update(
+        {"last_modified_date": datetime(2100, 1, 1)}
+    )
+    db.commit()
+
+    unchanged = client.get("/devices/", params={"limit": 2}, headers={"If-None-Match": first.headers["ETag"]})
+    assert unchanged.status_code == 304
+    changed = client.get(
+        "/devices/", params={"limit": 2, "cursor": cursor}, headers={"If-None-Match": second.headers["ETag"]}
+    )
+    assert changed.status_code == 200
+    assert changed.json()[0]["device_name"] == "renamed"
+
+
+@pytest.mark.parametrize("path", ["/devices/", "/users/", "/assignments/", "/purchases/", "/device-types/"])
+def test_narrowed_listing_has_validators_but_not_version_fields(client, devices, path):
+    response = client.get(path, params={"fields": "created_date"})
+
+    assert _revalidate(client, path + "?fields=created_date", response.headers["ETag"]).status_code == 304
+    assert all(list(row) == ["created_date"] for row in response.json())
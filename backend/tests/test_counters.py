@@ -0,0 +1,117 @@
+import io
+
+import pytest
+
+from app import commands, crud, models
+
+
+@pytest.fixture
+def types(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    phone = models.DeviceType(type_name="Phone")
+    bob = models.User(first_name="Bob", last_name="User", username="bob", email="bob@example.com")
+    db.add_all([laptop, phone, bob])
+    db.commit()
+    return {"laptop": laptop.device_type_id, "phone": phone.device_type_id, "user": bob.user_id}
+
+
+def _assert_consistent(db, client, device_counts):
+    db.expire_all()
+    counters, devices = device_counts()
+    assert counters == devices
+    # The report reads the counters; they must add up to the devices table
+    report = {row["status"]: row["count"] for row in client.get("/reports/device-status").json()}
+    assert report == {
+        "Available": sum(count for (_, out, retired), count in devices.items() if not out and not retired),
+        "Checked Out": sum(count for (_, out, retired), count in devices.items() if out and not retired),
+        "Retired": sum(count for (_, _, retired), count in devices.items() if retired),
+    }
+
+
+def test_counters_follow_every_device_write(client, db, types, device_counts):
+    def create(serial_number, **fields):
+        response = client.post(
+            "/devices/", json={"device_type_id": types["laptop"], "serial_number": serial_number, **fields}
+        )
+        assert response.status_code == 200
+        return response.json()["device_id"]
+
+    # Create, including devices created already retired or checked out
+    first = create("SN-1")
+    second = create("SN-2")
+    create("SN-3", is_retired=True)
+    fourth = create("SN-4", is_checked_out=True)
+    _assert_consistent(db, client, device_counts)
+
+    # Update: a type change, a status flag set through the update, and neither
+    assert client.put(f"/devices/{second}", json={"device_type_id": types["phone"]}).status_code == 200
+    assert client.put(f"/devices/{fourth}", json={"is_retired": True}).status_code == 200
+    assert client.put(f"/devices/{second}", json={"device_name": "renamed"}).status_code == 200
+    _assert_consistent(db, client, device_counts)
+
+    # Checkout and return, single and batched
+    assignment = client.post("/assignments/", json={"device_id": first, "user_id": types["user"]}).json()
+    _assert_consistent(db, client, device_counts)
+    assert client.put(f"/assignments/{assignment['assignment_id']}/return", json={}).status_code == 200
+    _assert_consistent(db, client, device_counts)
+    batch = client.post(
+        "/assignments/batch", json={"user_id": types["user"], "device_ids": [first, second]}
+    ).json()
+    _assert_consistent(db, client, device_counts)
+    returned = client.put(
+        "/assignments/batch/return", json={"assignment_ids": [row["assignment_id"] for row in batch]}
+    )
+    assert returned.status_code == 200
+    _assert_consistent(db, client, device_counts)
+
+    # Retire
+    assert client.put(f"/devices/{first}/retire").status_code == 200
+    _assert_consistent(db, client, device_counts)
+
+    # Bulk import, with a bad row
+    upload = "device_type_id,serial_number,is_retired\n" + "\n".join([
+        f"{types['laptop']},SN-10,false",
+        f"{types['phone']},SN-11,true",
+        f"{types['phone']},SN-1,false",
+        f"{types['phone']},SN-12,false",
+    ])
+    response = client.post(
+        "/devices/bulk", files={"file": ("devices.csv", io.BytesIO(upload.encode()), "text/csv")}
+    )
+    assert response.json()["created"] == 3
+    _assert_consistent(db, client, device_counts)
+
+
+def test_reconcile_rebuilds_drifted_counters(client, db, types, device_counts, capsys):
+    for i, (type_key, retired) in enumerate([("laptop", False), ("laptop", True), ("phone", False)]):
+        db.add(models.Device(device_type_id=types[type_key], serial_number=f"SN-{i}", is_retired=retired))
+    db.commit()
+    crud.rebuild_device_status_counters(db)
+    client.get("/reports/device-status")
+
+    # Drift: a wrong count, a missing row and a row for a state no device is in
+    counter = models.DeviceStatusCounter
+    db.query(counter).filter(counter.device_type_id == types["laptop"], counter.is_retired == False).update(
+        {"device_count": 5}
+    )
+    db.query(counter).filter(counter.device_type_id == types["phone"]).delete()
+    db.add(counter(device_type_id=types["phone"], is_checked_out=True, is_retired=True, device_count=2))
+    db.commit()
+    counters, devices = device_counts()
+    assert counters != devices
+
+    assert commands.main(["reconcile-counters"]) == 0
+
+    assert "Rebuilt device status counters (3 rows)" in capsys.readouterr().out
+    _assert_consistent(db, client, device_counts)
+
+
+def test_migrate_seeds_empty_counters(client, db, types, device_counts):
+    db.add_all([models.Device(device_type_id=types["laptop"], serial_number=f"SN-{i}") for i in range(3)])
+    db.commit()
+    db.query(models.DeviceStatusCounter).delete()
+    db.commit()
+
+    assert crud.ensure_device_status_counters(db) is True
+    assert crud.ensure_device_status_counters(db) is False
+    _assert_consistent(db, client, device_counts)
@@ -0,0 +1,79 @@
+from datetime import date
+
+import pytest
+
+from app import crud, models, schemas
+
+
+@pytest.fixture
+def inventory(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    purchase = models.Purchase(purchase_order="PO-1", vendor="Dell", purchase_date=date(2024, 1, 15))
+    alice = models.User(first_name="Alice", last_name="Admin", username="alice", email="alice@example.com")
+    bob = models.User(first_name="Bob", last_name="User", username="bob", email="bob@example.com")
+    devices = [
+        models.Device(device_type=laptop, purchase=purchase, serial_number=f"SN-{i}", is_checked_out=i < 3)
+        for i in range(50)
+    ]
+    db.add_all([laptop, purchase, alice, bob, *devices])
+    db.flush()
+
+    # One returned and three open assignments for Bob
+    db.add(models.DeviceAssignment(
+        device=devices[10], user=bob, created_by_user=alice,
+        checkout_date=date(2024, 2, 1), actual_return_date=date(2024, 3, 1)
+    ))
+    open_assignments = [
+        models.DeviceAssignment(device=device, user=bob, created_by_user=alice, checkout_date=date(2024, 4, 1))
+        for device in devices[:3]
+    ]
+    db.add_all(open_assignments)
+    db.commit()
+
+    # Plain ids, so reading them in a test does not refresh expired objects
+    ids = {
+        "device": devices[0].device_id,
+        "purchase": purchase.purchase_id,
+        "user": bob.user_id,
+        "assignment": open_assignments[0].assignment_id,
+    }
+    db.expunge_all()
+    return ids
+
+
+def _serialize(schema, obj):
+    return schema.model_validate(obj, from_attributes=True).model_dump()
+
+
+def test_device_detail_is_one_query(db, inventory, count_queries):
+    detail = _serialize(schemas.DeviceDetail, crud.get_device_detail(db, inventory["device"]))
+
+    assert count_queries.count == 1
+    assert detail["device_type"]["type_name"] == "Laptop"
+    assert detail["purchase"]["purchase_order"] == "PO-1"
+    assert detail["active_assignment"]["actual_return_date"] is None
+
+
+def test_assignment_detail_is_one_query(db, inventory, count_queries):
+    detail = _serialize(schemas.DeviceAssignmentDetail, crud.get_assignment_detail(db, inventory["assignment"]))
+
+    assert count_queries.count == 1
+    assert detail["user"]["username"] == "bob"
+    assert detail["created_by_user"]["username"] == "alice"
+    assert detail["device"]["serial_number"].startswith("SN-")
+
+
+def test_purchase_detail_is_two_queries(db, inventory, count_queries):
+    detail = _serialize(schemas.PurchaseDetail, crud.get_purchase_detail(db, inventory["purchase"]))
+
+    assert count_queries.count == 2
+    assert len(detail["devices"]) == 50
+    assert not any(" notes" in statement or "atera_link" in statement for statement in count_queries.statements)
+
+
+def test_user_detail_is_two_queries(db, inventory, count_queries):
+    detail = _serialize(schemas.UserDetail, crud.get_user_detail(db, inventory["user"]))
+
+    assert count_queries.count == 2
+    assert len(detail["active_assignments"]) == 3
+    assert all(assignment["actual_return_date"] is None for assignment in detail["active_assignments"])
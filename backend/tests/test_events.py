@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.core import events
+from app.core.events import EventBroker, EventBus, EventHub, PostgresNotifyBroker, create_broker
+
+
+class IncompleteBroker(EventBroker):
+    async def start(self, deliver, missed):
+        pass
+
+
+class FlakyBroker(EventBroker):
+    """Fails to start the first `failures` times, then delivers events in the process."""
+
+    def __init__(self, failures=2):
+        self.failures = failures
+        self.attempts = 0
+        self._deliver = None
+
+    async def start(self, deliver, missed):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("broker unavailable")
+        self._deliver = deliver
+
+    async def publish(self, event):
+        self._deliver(event)
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(events, "RETRY_MIN_SECONDS", 0.01)
+    monkeypatch.setattr(events, "RETRY_MAX_SECONDS", 0.02)
+
+
+def test_gap_tells_subscribers_to_reset_then_resumes():
+    hub = EventHub(16)
+    hub.publish({"type": "device.created"})
+    hub.mark_gap()
+    hub.publish({"type": "device.updated"})
+
+    assert hub.since(0) is None
+    assert hub.since(1) is None
+    assert [event["type"] for _, event in hub.since(2)] == ["device.updated"]
+    assert hub.since(hub.last_id) == []
+    assert hub.stats()["gaps"] == 1
+
+
+def test_broker_must_implement_the_interface():
+    with pytest.raises(TypeError):
+        IncompleteBroker()
+    with pytest.raises(TypeError):
+        create_broker(f"{__name__}:IncompleteBroker")
+
+    assert isinstance(create_broker(f"{__name__}:FlakyBroker"), FlakyBroker)
+
+
+def test_bus_retries_a_broker_that_fails_to_start(fast_retries):
+    async def run():
+        bus = EventBus(FlakyBroker(failures=2), 16)
+        await bus.start()
+        # Until the broker starts, events stay within the worker
+        assert not bus.connected
+        bus.publish({"type": "device.created"})
+        await asyncio.sleep(0)
+        assert [event["type"] for _, event in bus.hub.since(0)] == ["device.created"]
+
+        for _ in range(100):
+            if bus.connected:
+                break
+            await asyncio.sleep(0.01)
+        stats = bus.stats()
+        bus.publish({"type": "device.updated"})
+        for _ in range(10):
+            await asyncio.sleep(0)
+        position = bus.hub.last_id
+        await bus.stop()
+        return bus, stats, position
+
+    bus, stats, position = asyncio.run(run())
+
+    assert bus.broker.attempts == 3
+    assert stats["broker"] == {"type": "FlakyBroker", "started": True, "connected": True}
+    # The start marked a gap, since other workers' events were never received
+    assert stats["gaps"] == 1
+    assert bus.hub.since(position - 1)[-1][1]["type"] == "device.updated"
+
+
+def test_postgres_broker_survives_an_unreachable_database(fast_retries):
+    pytest.importorskip("asyncpg")
+
+    async def run():
+        broker = PostgresNotifyBroker("postgresql://nobody@127.0.0.1:1/none")
+        delivered = []
+        await broker.start(delivered.append, lambda: None)
+        await broker.publish({"type": "device.created"})
+        await asyncio.sleep(0.05)
+        status = broker.status()
+        await broker.stop()
+        return delivered, status
+
+    delivered, status = asyncio.run(run())
+
+    assert delivered == [{"type": "device.created"}]
+    assert status["connected"] is False
+    assert status["last_error"] is not None
+
+
+def test_broker_state_is_reported(client):
+    stats = client.get("/diagnostics/events").json()
+    ready = client.get("/readyz")
+
+    assert stats["broker"]["type"] == "InMemoryBroker"
+    assert stats["broker"]["connected"] is True
+    assert ready.status_code == 200
+    assert ready.json() == {"status": "ready", "events": "connected"}
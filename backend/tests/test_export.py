@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app import crud, models, schemas
+from app.crud import assignment as assignment_crud, device as device_crud
+from app.utils import export
+
+
+@pytest.fixture
+def inventory(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    purchase = models.Purchase(
+        purchase_order="PO-1", purchase_date=date(2024, 1, 15), total_amount=Decimal("999.50")
+    )
+    bob = models.User(first_name="Bob", last_name="User", username="bob", email="bob@example.com")
+    db.add_all([laptop, purchase, bob])
+    db.commit()
+    for i in range(7):
+        crud.create_device(db, schemas.DeviceCreate(
+            device_type_id=laptop.device_type_id,
+            serial_number=f"SN-{i}",
+            device_name=f"Laptop, \"{i}\"" if i % 2 else None,
+            purchase_id=purchase.purchase_id,
+            purchase_date=date(2024, 1, 15),
+            is_retired=i == 6,
+        ))
+    crud.create_assignments(db, schemas.DeviceBatchCheckout(user_id=bob.user_id, device_ids=[1, 2, 3]))
+    # A timestamp with microseconds, as PostgreSQL keeps them
+    db.query(models.Device).filter(models.Device.device_id == 1).update(
+        {"last_modified_date": datetime(2024, 2, 1, 9, 30, 0, 123456)}
+    )
+    db.commit()
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    # Several database batches and flushed chunks per export
+    monkeypatch.setattr(device_crud, "EXPORT_BATCH_SIZE", 3)
+    monkeypatch.setattr(assignment_crud, "EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(export, "FLUSH_BYTES", 256)
+
+
+def _as_csv_text(value):
+    # A JSON value as the CSV cell for it
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return json.dumps(value)
+    return str(value)
+
+
+def _export(client, path, format, **params):
+    response = client.get(path, params={"format": format, **params})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(export.EXPORT_FORMATS[format])
+    if format == "csv":
+        return list(csv.DictReader(io.StringIO(response.text)))
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.parametrize("path, key, count", [
+    ("/devices/export", "device_id", 7),
+    ("/users/export", "user_id", 1),
+    ("/assignments/export", "assignment_id", 3),
+])
+def test_csv_matches_ndjson(client, inventory, path, key, count):
+    ndjson = _export(client, path, "ndjson")
+    rows = _export(client, path, "csv")
+
+    assert sorted(row[key] for row in ndjson) == list(range(1, count + 1))
+    assert rows == [{name: _as_csv_text(value) for name, value in row.items()} for row in ndjson]
+
+
+def test_export_values_match_the_api(client, inventory):
+    listed = {device["device_id"]: device for device in client.get("/devices/").json()}
+    rows = _export(client, "/devices/export", "csv")
+
+    assert len(rows) == len(listed) == 7
+    for row in rows:
+        assert row == {name: _as_csv_text(value) for name, value in listed[int(row["device_id"])].items()}
+    first = rows[0]
+    assert first["last_modified_date"] == "2024-02-01T09:30:00.123456"
+    assert first["is_checked_out"] == "true"
+    assert first["is_retired"] == "false"
+    assert first["purchase_date"] == "2024-01-15"
+    assert first["device_name"] == ""
+    assert rows[1]["device_name"] == 'Laptop, "1"'
+
+
+def test_export_filters(client, inventory):
+    retired = _export(client, "/devices/export", "csv", is_retired="true")
+    active = _export(client, "/assignments/export", "ndjson", active_only="true")
+
+    assert [row["serial_number"] for row in retired] == ["SN-6"]
+    assert len(active) == 3
+
+
+def test_unknown_export_format_is_400(client):
+    assert client.get("/devices/export", params={"format": "xml"}).status_code == 400
@@ -0,0 +1,136 @@
+from datetime import date
+
+import pytest
+
+from app import crud, models
+
+START = date(2024, 3, 1)
+
+# Refresh cycle of each device type in months; None for a type that is never refreshed
+CYCLES = {"Laptop": 36, "Phone": 24, "Desk": None}
+
+# (device type, purchase date, retired) of each device
+DEVICES = [
+    ("Laptop", date(2021, 2, 28), False),   # due the month before the horizon: overdue
+    ("Laptop", date(2021, 3, 1), False),    # due in the first month
+    ("Laptop", date(2021, 3, 31), False),   # due in the first month, end of the purchase month
+    ("Laptop", date(2022, 2, 15), False),   # due in the last month of a year's horizon
+    ("Laptop", date(2022, 3, 1), False),    # due the month after it
+    ("Laptop", date(2021, 9, 15), True),    # retired, due in a month nothing else is
+    ("Laptop", None, False),                # no purchase date
+    ("Phone", date(2022, 6, 10), False),
+    ("Phone", date(2020, 1, 1), False),     # long overdue
+    ("Phone", date(2020, 5, 1), True),      # retired, long overdue
+    ("Desk", date(2010, 1, 1), False),      # a type without a refresh cycle
+]
+
+
+@pytest.fixture
+def fleet(db):
+    types = {
+        name: models.DeviceType(type_name=name, refresh_cycle_months=cycle) for name, cycle in CYCLES.items()
+    }
+    db.add_all(types.values())
+    for index, (type_name, purchased, retired) in enumerate(DEVICES):
+        db.add(models.Device(
+            device_type=types[type_name], serial_number=f"SN-{index}", purchase_date=purchased, is_retired=retired
+        ))
+    db.commit()
+    return {name: device_type.device_type_id for name, device_type in types.items()}
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def _brute_force(type_ids, start, months, include_overdue=True):
+    # (overdue, [count per month]) of each type with any device counted
+    first = _month_index(start)
+    series = {}
+    for type_name, purchased, retired in DEVICES:
+        cycle = CYCLES[type_name]
+        if retired or purchased is None or cycle is None:
+            continue
+        due = _month_index(purchased) + cycle
+        if due >= first + months or (due < first and not include_overdue):
+            continue
+        overdue, counts = series.setdefault(type_ids[type_name], (0, [0] * months))
+        if due < first:
+            overdue += 1
+        else:
+            counts[due - first] += 1
+        series[type_ids[type_name]] = (overdue, counts)
+    return series
+
+
+def _as_series(forecast):
+    return {
+        entry["device_type_id"]: (entry["overdue"], [point["count"] for point in entry["points"]])
+        for entry in forecast["series"]
+    }
+
+
+@pytest.mark.parametrize("start, months", [
+    (START, 12),
+    (START, 1),
+    (date(2024, 3, 17), 12),
+    (date(2025, 2, 1), 1),
+    (date(2025, 3, 1), 3),
+    (date(2019, 1, 1), 120),
+])
+@pytest.mark.parametrize("include_overdue", [True, False])
+def test_forecast_matches_a_device_count(db, fleet, start, months, include_overdue):
+    expected = _brute_force(fleet, start, months, include_overdue)
+
+    forecast = crud.get_refresh_forecast(db, start, months=months, include_overdue=include_overdue)
+
+    assert _as_series(forecast) == expected
+    assert forecast["overdue"] == sum(overdue for overdue, _ in expected.values())
+    assert [point["count"] for point in forecast["totals"]] == [
+        sum(counts[index] for _, counts in expected.values()) for index in range(months)
+    ]
+
+
+def test_horizon_boundaries(db, fleet):
+    laptop = _as_series(crud.get_refresh_forecast(db, START, months=12))[fleet["Laptop"]]
+
+    # Due the month before the horizon is overdue, due in its first month is not;
+    # due in the last month counts, and due the month after does not
+    assert laptop == (1, [2] + [0] * 10 + [1])
+    assert _as_series(crud.get_refresh_forecast(db, START, months=13))[fleet["Laptop"]] == (
+        1, [2] + [0] * 10 + [1, 1]
+    )
+    assert _as_series(crud.get_refresh_forecast(db, START, months=12, include_overdue=False))[fleet["Laptop"]] == (
+        0, [2] + [0] * 10 + [1]
+    )
+
+
+def test_retired_and_undated_devices_are_never_due(db, fleet):
+    # A horizon covering every due date counts each dated in-service device once
+    series = _as_series(crud.get_refresh_forecast(db, date(2020, 1, 1), months=crud.MAX_FORECAST_MONTHS))
+
+    assert sum(sum(counts) for _, counts in series.values()) == 7
+    assert sum(series[fleet["Laptop"]][1]) == 5
+    assert sum(series[fleet["Phone"]][1]) == 2
+    assert fleet["Desk"] not in series
+
+    # Only the retired laptop is due in September 2024
+    retired_month = crud.get_refresh_forecast(db, date(2024, 9, 1), months=1, include_overdue=False)
+    assert retired_month["series"] == []
+    assert retired_month["totals"] == [{"month": date(2024, 9, 1), "count": 0}]
+
+
+def test_type_filter_and_month_bounds(client, fleet):
+    response = client.get(
+        "/reports/refresh-forecast", params={"start": "2024-03-17", "device_type_id": fleet["Phone"]}
+    )
+
+    assert response.status_code == 200
+    forecast = response.json()
+    assert forecast["start"] == "2024-03-01"
+    assert [entry["type_name"] for entry in forecast["series"]] == ["Phone"]
+    assert forecast["overdue"] == 1
+    assert forecast["series"][0]["points"][3] == {"month": "2024-06-01", "count": 1}
+
+    for months in (0, crud.MAX_FORECAST_MONTHS + 1):
+        assert client.get("/reports/refresh-forecast", params={"months": months}).status_code == 400
@@ -0,0 +1,127 @@
+from datetime import date
+
+import pytest
+
+from app import crud, models
+
+TODAY = date(2024, 6, 30)
+
+
+@pytest.fixture
+def devices(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    bob = models.User(first_name="Bob", last_name="User", username="bob", email="bob@example.com")
+    alice = models.User(first_name="Alice", last_name="User", username="alice", email="alice@example.com")
+    db.add_all([laptop, bob, alice])
+
+    def add(serial_number, purchased, loans, **fields):
+        device = models.Device(device_type=laptop, serial_number=serial_number, purchase_date=purchased, **fields)
+        for user, checkout, returned in loans:
+            db.add(models.DeviceAssignment(
+                device=device, user=user, checkout_date=checkout, actual_return_date=returned
+            ))
+        db.add(device)
+        return device
+
+    added = {
+        "shelf": add("SN-shelf", date(2024, 1, 1), []),
+        "undated": add("SN-undated", None, [], is_retired=True),
+        "open": add("SN-open", date(2024, 1, 1), [
+            (bob, date(2024, 2, 1), date(2024, 3, 1)),
+            (alice, date(2024, 6, 10), None),
+        ], is_checked_out=True),
+        "out_today": add("SN-today", None, [(bob, TODAY, None)], is_checked_out=True),
+        "same_day": add("SN-same-day", date(2024, 6, 1), [
+            (bob, date(2024, 6, 5), date(2024, 6, 5)),
+            (bob, date(2024, 6, 5), date(2024, 6, 5)),
+        ]),
+    }
+    db.commit()
+    return {name: device.device_id for name, device in added.items()}
+
+
+def _stats(db, device_id):
+    stats = crud.get_device_usage_stats(db, device_id, today=TODAY)
+    assert stats is not None
+    return stats
+
+
+def test_never_assigned(db, devices):
+    stats = _stats(db, devices["shelf"])
+
+    assert stats["loans"] == stats["holders"] == stats["days_checked_out"] == 0
+    assert stats["average_loan_days"] is None
+    assert stats["days_idle_between_loans"] == 0
+    assert stats["last_return_date"] is None
+    # Idle, and in service, since purchase
+    assert stats["days_idle"] == 181
+    assert stats["utilization"] == 0.0
+
+
+def test_never_assigned_without_a_purchase_date(db, devices):
+    stats = _stats(db, devices["undated"])
+
+    assert stats["loans"] == stats["days_checked_out"] == 0
+    assert stats["days_idle"] is None
+    assert stats["utilization"] is None
+
+
+def test_open_loan(db, devices):
+    stats = _stats(db, devices["open"])
+
+    assert stats["loans"] == stats["holders"] == 2
+    # 29 days returned, and the open loan runs to today
+    assert stats["days_checked_out"] == 29 + 20
+    assert stats["average_loan_days"] == 29.0
+    assert stats["days_idle_between_loans"] == 101
+    assert stats["last_return_date"] == date(2024, 3, 1)
+    # Out on loan, so not idle
+    assert stats["days_idle"] == 0
+    assert stats["utilization"] == round(49 / 181, 3)
+
+
+def test_open_loan_from_today(db, devices):
+    stats = _stats(db, devices["out_today"])
+
+    assert stats["loans"] == 1
+    assert stats["days_checked_out"] == 0
+    assert stats["average_loan_days"] is None
+    assert stats["last_return_date"] is None
+    assert stats["days_idle"] == 0
+    # In service since the first checkout, which is today
+    assert stats["utilization"] is None
+
+
+def test_same_day_checkout_and_return(db, devices):
+    stats = _stats(db, devices["same_day"])
+
+    assert stats["loans"] == 2
+    assert stats["holders"] == 1
+    assert stats["days_checked_out"] == 0
+    assert stats["average_loan_days"] == 0.0
+    assert stats["days_idle_between_loans"] == 0
+    assert stats["last_return_date"] == date(2024, 6, 5)
+    assert stats["days_idle"] == 25
+    assert stats["utilization"] == 0.0
+
+
+def test_bulk_stats_match_single_device_stats(db, devices):
+    everything = crud.get_devices_usage_stats(db, today=TODAY)
+
+    assert everything == [_stats(db, row["device_id"]) for row in everything]
+    assert sorted(row["device_id"] for row in everything) == sorted(devices.values())
+    # Least used first, then by device
+    assert [row["device_id"] for row in everything][-1] == devices["open"]
+    assert [row["device_id"] for row in crud.get_devices_usage_stats(db, is_retired=True, today=TODAY)] == [
+        devices["undated"]
+    ]
+    assert len(crud.get_devices_usage_stats(db, is_retired=False, today=TODAY)) == 4
+
+
+def test_history_of_a_device_never_assigned(client, devices):
+    response = client.get(f"/devices/{devices['shelf']}/history")
+
+    assert response.status_code == 200
+    assert response.json()["stats"]["loans"] == 0
+    assert response.json()["assignments"] == []
+    assert client.get("/devices/999/history").status_code == 404
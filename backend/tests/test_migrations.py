@@ -0,0 +1,90 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import MetaData, inspect
+
+from app import commands, crud, models
+from app.database import Base, SessionLocal, engine
+
+# The tables and indexes create_all built before migrations were introduced
+BASELINE_TABLES = ["users", "device_types", "purchases", "devices", "device_assignments"]
+BASELINE_INDEXES = {
+    "ix_users_user_id", "ix_users_username",
+    "ix_device_types_device_type_id", "ix_device_types_type_name",
+    "ix_purchases_purchase_id", "ix_purchases_purchase_order",
+    "ix_devices_device_id", "ix_devices_serial_number",
+    "ix_device_assignments_assignment_id",
+}
+
+
+@pytest.fixture
+def empty_database():
+    yield
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS alembic_version")
+    Base.metadata.drop_all(bind=engine)
+
+
+def _create_baseline_schema():
+    # A separate MetaData, so none of the later tables, indexes or search DDL come along
+    baseline = MetaData()
+    for name in BASELINE_TABLES:
+        table = Base.metadata.tables[name].to_metadata(baseline)
+        for index in list(table.indexes):
+            if index.name not in BASELINE_INDEXES:
+                table.indexes.discard(index)
+    baseline.create_all(bind=engine)
+
+
+def _include_name(name, type_, parent_names):
+    # As in alembic/env.py, plus the migration history table
+    if type_ == "table":
+        return name is None or ("_fts" not in name and name != "alembic_version")
+    return True
+
+
+def _schema_differences():
+    with engine.connect() as connection:
+        context = MigrationContext.configure(
+            connection, opts={"compare_type": True, "include_name": _include_name}
+        )
+        return compare_metadata(context, Base.metadata)
+
+
+def test_migrate_builds_the_models_schema(empty_database):
+    commands.main(["migrate"])
+
+    assert _schema_differences() == []
+    assert {"devices_fts", "users_fts"} <= set(inspect(engine).get_table_names())
+
+
+def test_migrate_upgrades_a_database_created_before_migrations(empty_database):
+    _create_baseline_schema()
+    db = SessionLocal()
+    try:
+        laptop = models.DeviceType(type_name="Laptop")
+        db.add_all([
+            laptop,
+            models.Device(device_type=laptop, serial_number="SN-ABC-1"),
+            models.Device(device_type=laptop, serial_number="SN-XYZ-2", is_retired=True),
+        ])
+        db.commit()
+        laptop_id = laptop.device_type_id
+    finally:
+        db.close()
+
+    commands.main(["migrate"])
+
+    assert _schema_differences() == []
+    db = SessionLocal()
+    try:
+        counters = {
+            (row.is_checked_out, row.is_retired): row.device_count
+            for row in db.query(models.DeviceStatusCounter).filter_by(device_type_id=laptop_id)
+        }
+        # Rows from before the search tables are indexed when they are created
+        found = crud.get_devices(db, search="abc")
+    finally:
+        db.close()
+    assert counters == {(False, False): 1, (False, True): 1}
+    assert [device.serial_number for device in found] == ["SN-ABC-1"]
@@ -0,0 +1,101 @@
+from datetime import date
+
+import pytest
+
+from app import crud, models
+from app.crud.pagination import encode_cursor
+
+
+def _walk(fetch, cursor_of, limit=3):
+    """Reads a listing page by page through its cursors, returning every row in order."""
+    rows, cursor = [], None
+    while True:
+        page = fetch(cursor=cursor, limit=limit)
+        rows.extend(page)
+        if len(page) < limit:
+            return rows
+        cursor = cursor_of(page[-1])
+
+
+@pytest.fixture
+def people(db):
+    # Repeated last names, and repeated first names within them, so pages split on the user_id tie-break
+    users = [
+        models.User(first_name=first, last_name=last, username=f"user{i}", email=f"user{i}@example.com")
+        for i, (last, first) in enumerate(
+            [("Smith", "Ann")] * 4 + [("Smith", "Bob")] * 3 + [("Jones", "Ann")] * 3 + [("Adams", "Cy")]
+        )
+    ]
+    db.add_all(users)
+    db.commit()
+    return users
+
+
+def test_user_cursor_walk_has_no_gaps_or_duplicates(db, people):
+    rows = _walk(lambda **kwargs: crud.get_users(db, **kwargs), crud.get_user_cursor)
+
+    keys = [(user.last_name, user.first_name, user.user_id) for user in rows]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(people)
+
+
+def test_assignment_cursor_walk_splits_same_checkout_date(db, people):
+    laptop = models.DeviceType(type_name="Laptop")
+    devices = [models.Device(device_type=laptop, serial_number=f"SN-{i}") for i in range(10)]
+    db.add_all([laptop, *devices])
+    db.flush()
+    # Eight checkouts on one day and two on another, newest first in the listing
+    db.add_all([
+        models.DeviceAssignment(
+            device=device, user=people[0],
+            checkout_date=date(2024, 5, 1) if i < 8 else date(2024, 4, 1)
+        )
+        for i, device in enumerate(devices)
+    ])
+    db.commit()
+
+    rows = _walk(lambda **kwargs: crud.get_assignments(db, **kwargs), crud.get_assignment_cursor)
+
+    keys = [(assignment.checkout_date, assignment.assignment_id) for assignment in rows]
+    assert keys == sorted(keys, reverse=True)
+    assert len(set(keys)) == 10
+
+
+def test_purchase_cursor_walk_puts_undated_purchases_last(db):
+    dates = [date(2024, 3, 1), None, date(2024, 1, 1), date(2024, 3, 1), None, date(2024, 3, 1), None, None]
+    db.add_all([models.Purchase(purchase_order=f"PO-{i}", purchase_date=day) for i, day in enumerate(dates)])
+    db.commit()
+
+    rows = _walk(lambda **kwargs: crud.get_purchases(db, **kwargs), crud.get_purchase_cursor)
+
+    assert len({purchase.purchase_id for purchase in rows}) == len(dates)
+    dated = [purchase for purchase in rows if purchase.purchase_date is not None]
+    undated = [purchase for purchase in rows if purchase.purchase_date is None]
+    assert rows == dated + undated
+    assert [(p.purchase_date, p.purchase_id) for p in dated] == sorted(
+        [(p.purchase_date, p.purchase_id) for p in dated], reverse=True
+    )
+    assert [p.purchase_id for p in undated] == sorted([p.purchase_id for p in undated], reverse=True)
+
+
+def test_cursor_walk_through_the_api(client, people):
+    seen, cursor = [], None
+    while True:
+        response = client.get("/users/", params={"limit": 4, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen.extend(user["user_id"] for user in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(user.user_id for user in people)
+    assert len(seen) == len(set(seen))
+
+
+@pytest.mark.parametrize("path", ["/devices/", "/users/", "/purchases/", "/assignments/"])
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor("x", "y")])
+def test_invalid_cursor_is_400(client, path, cursor):
+    response = client.get(path, params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
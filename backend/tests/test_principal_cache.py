@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import crud, models, schemas
+from app.core.security import create_access_token
+from app.database import SessionLocal, dispose_engines
+from app.utils.dependencies import get_current_user
+
+
+@pytest.fixture
+def bob(db):
+    bob = models.User(first_name="Bob", last_name="User", username="bob", email="bob@example.com", is_admin=True)
+    db.add(bob)
+    db.commit()
+    return bob.user_id
+
+
+def _authenticate(*tokens):
+    """Runs get_current_user for each token in turn on one event loop, returning principals or 401s."""
+    async def run():
+        results = []
+        try:
+            for token in tokens:
+                try:
+                    results.append(await get_current_user(token))
+                except HTTPException as exc:
+                    results.append(exc.status_code)
+        finally:
+            await dispose_engines()
+        return results
+    return asyncio.run(run())
+
+
+def _update(user_id, **fields):
+    with SessionLocal() as other:
+        crud.update_user(other, user_id, schemas.UserUpdate(**fields))
+
+
+def test_update_evicts_cached_principal(bob):
+    token = create_access_token({"sub": "bob"})
+    (principal,) = _authenticate(token)
+    assert principal.is_admin
+
+    _update(bob, is_admin=False)
+
+    (principal,) = _authenticate(token)
+    assert not principal.is_admin
+
+
+def test_principal_loaded_before_an_update_is_not_cached(bob, monkeypatch):
+    token = create_access_token({"sub": "bob"})
+    load_principal = crud.aio.get_principal
+
+    async def load_then_deactivate(db, username):
+        principal = await load_principal(db, username=username)
+        # The user is deactivated, and their entries evicted, before this request caches what it read
+        _update(bob, is_active=False)
+        monkeypatch.setattr(crud.aio, "get_principal", load_principal)
+        return principal
+    monkeypatch.setattr(crud.aio, "get_principal", load_then_deactivate)
+
+    in_flight, after = _authenticate(token, token)
+
+    # The request that raced the update still sees the old row; the next one does not
+    assert in_flight.is_active
+    assert after == 401
+    assert crud.get_principal_cache_stats()["stale_sets"] == 1
+
+
+def test_principal_loaded_before_a_rename_is_not_cached(bob, monkeypatch):
+    token = create_access_token({"sub": "bob"})
+    load_principal = crud.aio.get_principal
+
+    async def load_then_rename(db, username):
+        principal = await load_principal(db, username=username)
+        _update(bob, username="robert")
+        monkeypatch.setattr(crud.aio, "get_principal", load_principal)
+        return principal
+    monkeypatch.setattr(crud.aio, "get_principal", load_then_rename)
+
+    in_flight, after = _authenticate(token, token)
+
+    assert in_flight.username == "bob"
+    assert after == 401
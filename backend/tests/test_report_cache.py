@@ -0,0 +1,68 @@
+from app import crud, models, schemas
+from app.core.cache import TTLCache
+from app.crud.reports import cached_report, invalidate_reports
+
+
+def _add_device(db, device_type_id, serial_number):
+    return crud.create_device(db, schemas.DeviceCreate(device_type_id=device_type_id, serial_number=serial_number))
+
+
+def _available(db):
+    return next(row["count"] for row in crud.get_device_status_report(db) if row["status"] == "Available")
+
+
+def test_write_evicts_cached_report(db, count_queries):
+    laptop = models.DeviceType(type_name="Laptop")
+    db.add(laptop)
+    db.commit()
+    _add_device(db, laptop.device_type_id, "SN-1")
+
+    assert _available(db) == 1
+    queries = count_queries.count
+    assert _available(db) == 1
+    assert count_queries.count == queries
+
+    _add_device(db, laptop.device_type_id, "SN-2")
+
+    assert _available(db) == 2
+
+
+def test_report_computed_across_a_write_is_not_cached(db):
+    computed = []
+
+    @cached_report
+    def counting_report(db):
+        computed.append(len(computed) + 1)
+        if len(computed) == 1:
+            # A write commits and invalidates the report while this result is computed
+            invalidate_reports(counting_report)
+        return computed[-1]
+
+    assert counting_report(db) == 1
+    # The first result was computed before the write, so it was not stored
+    assert counting_report(db) == 2
+    assert counting_report(db) == 2
+
+
+def test_set_with_stale_version_is_dropped():
+    cache = TTLCache(maxsize=10, ttl=60)
+    version = cache.version("report")
+    cache.invalidate(lambda key: True, groups=["report"])
+    cache.set("key", "stale", group="report", version=version)
+    cache.set("other", "fresh", group="other", version=cache.version("other"))
+
+    assert cache.get("key") is None
+    assert cache.get("other") == "fresh"
+    assert cache.stats()["stale_sets"] == 1
+
+
+def test_cache_stats_are_under_diagnostics(client):
+    before = client.get("/diagnostics/report-cache").json()
+    client.get("/reports/device-status")
+    client.get("/reports/device-status")
+
+    stats = client.get("/diagnostics/report-cache").json()
+
+    assert stats["hits"] - before["hits"] == 1
+    assert stats["misses"] - before["misses"] == 1
+    assert client.get("/reports/cache-stats").status_code == 404
@@ -0,0 +1,101 @@
+import pytest
+from sqlalchemy import inspect, text
+
+from app import crud, models
+from app.database import engine
+
+
+@pytest.fixture
+def laptop(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    db.add(laptop)
+    db.commit()
+    return laptop.device_type_id
+
+
+def _add_device(client, device_type_id, serial_number, **fields):
+    response = client.post(
+        "/devices/", json={"device_type_id": device_type_id, "serial_number": serial_number, **fields}
+    )
+    assert response.status_code == 200
+    return response.json()["device_id"]
+
+
+def _search(client, path, term, key):
+    response = client.get(path, params={"search": term})
+    assert response.status_code == 200
+    return [row[key] for row in response.json()]
+
+
+def test_create_all_builds_the_fts_tables_and_triggers(db):
+    with engine.connect() as connection:
+        triggers = set(connection.scalars(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")))
+
+    assert {"devices_fts", "users_fts"} <= set(inspect(engine).get_table_names())
+    assert {f"{table}_fts_{suffix}" for table in ("devices", "users") for suffix in ("ai", "ad", "au")} \
+        <= triggers
+
+
+@pytest.mark.parametrize("term, operator", [("latitude", "MATCH"), ("LAT", "MATCH"), ("la", "LIKE")])
+def test_long_terms_use_fts_and_short_terms_fall_back(db, laptop, count_queries, term, operator):
+    db.add(models.Device(device_type_id=laptop, serial_number="SN-1", model="Latitude 5440"))
+    db.commit()
+    count_queries.statements.clear()
+
+    found = crud.get_devices(db, search=term)
+
+    assert [device.serial_number for device in found] == ["SN-1"]
+    assert operator in count_queries.statements[-1]
+
+
+@pytest.mark.parametrize("term", ["itud", "it"])
+def test_search_matches_substrings_in_any_column(client, laptop, term):
+    inside_model = _add_device(client, laptop, "SN-1", model="Latitude 5440")
+    inside_name = _add_device(client, laptop, "SN-2", device_name="Attitude test rig")
+    _add_device(client, laptop, "SN-3", model="ThinkPad")
+
+    assert sorted(_search(client, "/devices/", term, "device_id")) == [inside_model, inside_name]
+
+
+@pytest.mark.parametrize("term", ["dell", "de"])
+def test_search_ranks_both_paths_best_first(client, laptop, term):
+    # The term in one column of the first device and in two columns of the second
+    one_column = _add_device(client, laptop, "SN-1", model="Dell Latitude")
+    two_columns = _add_device(client, laptop, "SN-2", device_name="Dell desk laptop", model="Dell Precision")
+
+    assert _search(client, "/devices/", term, "device_id") == [two_columns, one_column]
+
+
+@pytest.mark.parametrize("old_term, new_term", [("alpha", "omega"), ("al", "om")])
+def test_search_follows_inserts_and_updates(client, laptop, old_term, new_term):
+    device_id = _add_device(client, laptop, "SN-1", device_name="alpha")
+    assert _search(client, "/devices/", old_term, "device_id") == [device_id]
+
+    response = client.put(f"/devices/{device_id}", json={"device_name": "omega"})
+
+    assert response.status_code == 200
+    assert _search(client, "/devices/", old_term, "device_id") == []
+    assert _search(client, "/devices/", new_term, "device_id") == [device_id]
+
+
+def test_short_term_wildcards_are_literal(client, laptop):
+    percent = _add_device(client, laptop, "SN-100%")
+    _add_device(client, laptop, "SN-1000")
+
+    assert _search(client, "/devices/", "%", "device_id") == [percent]
+    assert _search(client, "/devices/", "_", "device_id") == []
+
+
+@pytest.mark.parametrize("term", ["smith", "sm"])
+def test_user_search(client, term):
+    for username, last_name in [("asmith", "Smith"), ("bjones", "Jones")]:
+        response = client.post("/users/", json={
+            "first_name": "Ann", "last_name": last_name, "username": username, "email": f"{username}@example.com"
+        })
+        assert response.status_code == 200
+
+    assert _search(client, "/users/", term, "username") == ["asmith"]
+
+    user_id = client.get("/users/", params={"search": "jones"}).json()[0]["user_id"]
+    assert client.put(f"/users/{user_id}", json={"last_name": "Smithers"}).status_code == 200
+    assert _search(client, "/users/", term, "username") == ["asmith", "bjones"]
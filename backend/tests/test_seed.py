@@ -0,0 +1,47 @@
+import random
+from datetime import date
+
+import pytest
+from sqlalchemy import func
+
+from app import models
+from app.database import engine
+from app.utils.seed import SeedScale, _device_history, seed_database
+
+
+def test_seeded_devices_keep_the_assignment_invariants(db, device_counts):
+    counts = seed_database(engine, SeedScale(devices=400, users=20, assignments=4000, purchases=10), seed=7)
+    assert counts["devices"] == 400
+
+    assignment = models.DeviceAssignment
+    open_loans = dict(
+        db.query(assignment.device_id, func.count())
+        .filter(assignment.actual_return_date == None)
+        .group_by(assignment.device_id)
+    )
+    devices = db.query(models.Device.device_id, models.Device.is_checked_out, models.Device.is_retired).all()
+
+    assert any(device.is_retired for device in devices)
+    # At most one open loan per device, on exactly the checked-out devices, none retired
+    assert set(open_loans.values()) == {1}
+    assert {device.device_id for device in devices if device.is_checked_out} == set(open_loans)
+    assert not any(device.is_retired and device.is_checked_out for device in devices)
+    # Every loan is returned on or after its checkout
+    assert db.query(assignment).filter(assignment.actual_return_date < assignment.checkout_date).count() == 0
+    counters, by_status = device_counts()
+    assert counters == by_status
+
+
+@pytest.mark.parametrize("retired", [True, False])
+def test_retired_devices_have_no_open_loan(retired):
+    # More loans than days, so the history runs up to today
+    today = date(2024, 6, 30)
+    for seed in range(20):
+        history = _device_history(random.Random(seed), 1, date(2024, 6, 1), today, 60, 10, retired)
+
+        assert history[-1]["checkout_date"] < today
+        assert all(loan["actual_return_date"] is None or loan["actual_return_date"] <= today for loan in history)
+        if retired:
+            assert all(loan["actual_return_date"] is not None for loan in history)
+        else:
+            assert history[-1]["actual_return_date"] is None
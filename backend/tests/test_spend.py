@@ -0,0 +1,99 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import crud, models, schemas
+
+
+def _rollups(db):
+    return {
+        (row.vendor, row.month): (row.purchase_count, Decimal(row.total_amount).quantize(Decimal("0.01")), row.device_count)
+        for row in db.query(models.PurchaseSpendRollup)
+        if row.purchase_count or row.device_count
+    }
+
+
+def _assert_rollups_match_rebuild(db):
+    maintained = _rollups(db)
+    crud.rebuild_purchase_spend_rollups(db)
+    assert maintained == _rollups(db)
+    return maintained
+
+
+@pytest.fixture
+def laptop(db):
+    laptop = models.DeviceType(type_name="Laptop")
+    db.add(laptop)
+    db.commit()
+    return laptop.device_type_id
+
+
+def _purchase(db, order, vendor, day, amount):
+    return crud.create_purchase(db, schemas.PurchaseCreate(
+        purchase_order=order, vendor=vendor, purchase_date=day, total_amount=Decimal(amount)
+    )).purchase_id
+
+
+def _device(db, device_type_id, serial_number, purchase_id=None):
+    return crud.create_device(db, schemas.DeviceCreate(
+        device_type_id=device_type_id, serial_number=serial_number, purchase_id=purchase_id
+    )).device_id
+
+
+def test_spend_report_keeps_money_exact(client, db, laptop):
+    purchase_id = _purchase(db, "PO-1", "Dell", date(2024, 3, 5), "1000.50")
+    _purchase(db, "PO-2", "Dell", date(2024, 3, 20), "0.25")
+    for i in range(3):
+        _device(db, laptop, f"SN-{i}", purchase_id)
+
+    response = client.get("/reports/spend", params={"by": "vendor"})
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["rows"] == [
+        {"vendor": "Dell", "purchases": 2, "total_amount": "1000.75", "devices": 3, "cost_per_device": "333.58"}
+    ]
+    assert report["total"]["total_amount"] == "1000.75"
+
+
+def test_purchase_writes_maintain_rollups(db, laptop):
+    first = _purchase(db, "PO-1", "Dell", date(2024, 1, 10), "100.00")
+    second = _purchase(db, "PO-2", "HP", date(2024, 2, 10), "50.00")
+    _purchase(db, "PO-3", "HP", None, "999.00")
+    _device(db, laptop, "SN-1", first)
+    _device(db, laptop, "SN-2", first)
+
+    assert _assert_rollups_match_rebuild(db) == {
+        ("Dell", date(2024, 1, 1)): (1, Decimal("100.00"), 2),
+        ("HP", date(2024, 2, 1)): (1, Decimal("50.00"), 0),
+    }
+
+    # Moving the purchase to another vendor and month carries its devices along
+    crud.update_purchase(db, first, schemas.PurchaseUpdate(vendor="Lenovo", purchase_date=date(2024, 3, 31)))
+    crud.update_purchase(db, second, schemas.PurchaseUpdate(total_amount=Decimal("75.10")))
+
+    assert _assert_rollups_match_rebuild(db) == {
+        ("Lenovo", date(2024, 3, 1)): (1, Decimal("100.00"), 2),
+        ("HP", date(2024, 2, 1)): (1, Decimal("75.10"), 0),
+    }
+
+
+def test_device_purchase_changes_maintain_rollups(db, laptop):
+    first = _purchase(db, "PO-1", "Dell", date(2024, 1, 10), "100.00")
+    second = _purchase(db, "PO-2", "HP", date(2024, 2, 10), "50.00")
+    device_id = _device(db, laptop, "SN-1", first)
+    _device(db, laptop, "SN-2")
+
+    crud.update_device(db, device_id, schemas.DeviceUpdate(purchase_id=second))
+    assert _assert_rollups_match_rebuild(db)[("HP", date(2024, 2, 1))] == (1, Decimal("50.00"), 1)
+
+    result = crud.bulk_create_devices(db, [
+        (1, {"serial_number": "SN-3", "device_type_id": laptop, "purchase_id": first}, None),
+        (2, {"serial_number": "SN-4", "device_type_id": laptop, "purchase_id": first}, None),
+    ])
+    assert result["created"] == 2
+    assert _assert_rollups_match_rebuild(db) == {
+        ("Dell", date(2024, 1, 1)): (1, Decimal("100.00"), 2),
+        ("HP", date(2024, 2, 1)): (1, Decimal("50.00"), 1),
+    }
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app import crud, models
+
+START = date(2024, 3, 10)
+END = date(2024, 3, 20)
+
+# (device type, checkout date, return date) of each loan, one device per loan
+LOANS = [
+    ("Laptop", date(2024, 3, 1), None),                  # open, out before the range
+    ("Laptop", date(2024, 3, 5), date(2024, 3, 10)),     # returned on the first day
+    ("Laptop", date(2024, 3, 5), date(2024, 3, 11)),     # out before, returned the next day
+    ("Laptop", date(2024, 3, 10), date(2024, 3, 20)),    # out on the first day, returned on the last
+    ("Laptop", date(2024, 3, 20), None),                 # out on the last day
+    ("Laptop", date(2024, 3, 15), date(2024, 3, 15)),    # returned the day it went out
+    ("Laptop", date(2024, 3, 12), date(2024, 3, 25)),    # returned after the range
+    ("Laptop", date(2024, 3, 21), None),                 # out after the range
+    ("Laptop", date(2024, 2, 1), date(2024, 3, 1)),      # returned before the range
+    ("Monitor", date(2024, 3, 14), date(2024, 3, 14)),   # only a same-day loan
+    ("Monitor", date(2024, 3, 18), date(2024, 3, 19)),
+    ("Headset", date(2024, 3, 12), date(2024, 3, 12)),   # never out overnight
+]
+
+
+@pytest.fixture
+def loans(db):
+    types = {name: models.DeviceType(type_name=name) for name in {loan[0] for loan in LOANS}}
+    user = models.User(first_name="Bob", last_name="User", username="bob", email="bob@example.com")
+    db.add_all([*types.values(), user])
+    for index, (type_name, checkout, returned) in enumerate(LOANS):
+        device = models.Device(device_type=types[type_name], serial_number=f"SN-{index}")
+        db.add(models.DeviceAssignment(
+            device=device, user=user, checkout_date=checkout, actual_return_date=returned
+        ))
+    db.commit()
+    return {name: device_type.device_type_id for name, device_type in types.items()}
+
+
+def _brute_force(type_ids, start, end):
+    # Counts every loan on every day: out from its checkout, in again on its return date
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    series = {
+        type_ids[type_name]: [
+            sum(
+                1 for name, checkout, returned in LOANS
+                if name == type_name and checkout <= day and (returned is None or returned > day)
+            )
+            for day in days
+        ]
+        for type_name in type_ids
+    }
+    return {type_id: counts for type_id, counts in series.items() if any(counts)}
+
+
+@pytest.mark.parametrize("start, end", [
+    (START, END),
+    (START, START),
+    (END, END),
+    (date(2024, 1, 1), date(2024, 4, 30)),
+    (date(2024, 3, 21), date(2024, 3, 31)),
+])
+def test_sweep_and_sql_match_a_daily_count(db, loans, start, end):
+    expected = _brute_force(loans, start, end)
+
+    assert crud.get_utilization_series_sweep(db, start, end) == expected
+    assert crud.get_utilization_series_sql(db, start, end) == expected
+
+
+def test_range_edges(db, loans):
+    laptop = crud.get_utilization_series_sweep(db, START, END)[loans["Laptop"]]
+
+    # First day: the open loan, the loan returned the next day and the one out that day;
+    # the loan returned that day is back. Last day: the loan returned that day is back,
+    # and the loan out that day counts.
+    assert laptop[0] == 3
+    assert laptop[-1] == 3
+    assert laptop == [3, 2, 3, 3, 3, 3, 3, 3, 3, 3, 3]
+
+
+def test_type_filter(db, loans):
+    monitor = loans["Monitor"]
+    expected = {monitor: _brute_force(loans, START, END)[monitor]}
+
+    for series in (crud.get_utilization_series_sweep, crud.get_utilization_series_sql):
+        assert series(db, START, END, device_type_id=monitor) == expected